@@ -4,13 +4,28 @@ import re
 import time
 import uuid
 import sqlite3
-from datetime import datetime
+import zlib
+from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Callable, Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Callable, Optional, List, Dict, Any, Iterable, Iterator, Tuple, Union
 
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+# autogen/OpenAI (e model_tiers/usage_meter, que dependem deles) são importados
+# no DailyOpsRunner: as stores e o agendador sobem sem eles na partida da UI
+from ops_plan_parser import (
+    PLAN_CATEGORIES,
+    PlanDiff,
+    PlanTask,
+    diff_plans,
+    extract_json_plan,
+    format_plan,
+    parse_ops_plan,
+    strip_json_plan,
+)
+
+if TYPE_CHECKING:
+    from autogen_core.models import ChatCompletionClient
+    from usage_meter import UsageMeter
 
 
 # =========================================================
@@ -19,6 +34,12 @@ from autogen_ext.models.openai import OpenAIChatCompletionClient
 @dataclass(frozen=True)
 class DailyOpsConfig:
     model: str = "gpt-4o-mini"
+    # Modelo forte: só no pedido seguinte a uma resposta cujo plano não parseou (None desliga)
+    strong_model: Optional[str] = "gpt-4o"
+    # Modo estruturado: o agente anexa o plano em JSON, validado uma vez e guardado como PlanTask
+    structured_plan: bool = False
+    # Agendamento local: horários calculados por schedule_day; o modelo escreve só a prosa
+    local_schedule: bool = False
     max_tool_iterations: int = 2
     max_context_tasks: int = 40
 
@@ -26,33 +47,82 @@ class DailyOpsConfig:
 # Persistência com SQLite (Substituindo JSON)
 # =========================================================
 
+# Índices FTS5 de conteúdo externo, mantidos por triggers:
+# fonte → (tabela fts, tabela de origem, coluna rowid, colunas indexadas)
+SEARCH_SOURCES: Dict[str, Tuple[str, str, str, Tuple[str, ...]]] = {
+    "task": ("tasks_fts", "tasks", "rowid", ("title", "notes")),
+    "chat": ("chat_fts", "chat_history", "id", ("content",)),
+    "distraction": ("distractions_fts", "distractions", "id", ("content",)),
+}
+# No arquivo o chat fica comprimido; seu índice é contentless e preenchido na arquivação
+ARCHIVE_SEARCH_SOURCES = {k: SEARCH_SOURCES[k] for k in ("task", "distraction")}
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+
+TASKS_DDL = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id TEXT PRIMARY KEY,
+        title TEXT,
+        notes TEXT,
+        quadrant TEXT,
+        period TEXT,
+        status TEXT,
+        active INTEGER DEFAULT 1,
+        is_recurring INTEGER DEFAULT 0,
+        created_at REAL,
+        day_date TEXT
+    )
+"""
+
+
 class DatabaseManager:
     def __init__(self, vault_dir: Path) -> None:
         self.db_path = (vault_dir / "ops_agent_vault.db").absolute()
+        # Dias além do horizonte de retenção (VaultRetention)
+        self.archive_path = (vault_dir / "ops_agent_archive.db").absolute()
         vault_dir.mkdir(parents=True, exist_ok=True)
         print(f"[*] Iniciando Banco de Dados em: {self.db_path}")
         self._init_db()
 
-    def _get_connection(self):
-        return sqlite3.connect(self.db_path, timeout=10)
+    def _get_connection(self, with_archive: bool = False):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if with_archive and self.has_archive():
+            conn.execute("ATTACH DATABASE ? AS archive", (str(self.archive_path),))
+        return conn
+
+    def has_archive(self) -> bool:
+        return self.archive_path.exists()
+
+    def schemas(self) -> List[str]:
+        """Esquemas a consultar numa conexão with_archive=True: main e, havendo arquivo, archive."""
+        return ["main", "archive"] if self.has_archive() else ["main"]
 
     def _init_db(self):
         with self._get_connection() as conn:
+            # Só vale para bancos novos; os antigos são convertidos pelo VaultRetention (VACUUM único)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
             # Tabela de Tarefas
+            conn.execute(TASKS_DDL)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_day ON tasks (day_date)")
+            # Concorrência otimista: cada UPDATE exige a versão lida e a incrementa
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+            if "row_version" not in columns:
+                conn.execute("ALTER TABLE tasks ADD COLUMN row_version INTEGER DEFAULT 1")
+            # Log de mudanças em tasks, lido pelos outros clientes do vault (TaskChangeFeed)
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id TEXT PRIMARY KEY,
-                    title TEXT,
-                    notes TEXT,
-                    quadrant TEXT,
-                    period TEXT,
-                    status TEXT,
-                    active INTEGER DEFAULT 1,
-                    is_recurring INTEGER DEFAULT 0,
-                    created_at REAL,
-                    day_date TEXT
+                CREATE TABLE IF NOT EXISTS task_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id TEXT,
+                    day_date TEXT,
+                    op TEXT,
+                    changed_at REAL
                 )
             """)
+            for op, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS tasks_log_{op.lower()} AFTER {op} ON tasks BEGIN "
+                    f"INSERT INTO task_changes (task_id, day_date, op, changed_at) "
+                    f"VALUES ({row}.id, {row}.day_date, '{op.lower()}', (julianday('now') - 2440587.5) * 86400.0); END"
+                )
             # Tabela de Chat
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS chat_history (
@@ -63,6 +133,37 @@ class DatabaseManager:
                     day_date TEXT
                 )
             """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_day ON chat_history (day_date)")
+            # Versões do plano (uma por resposta com plano) e suas linhas tipadas
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_versions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    day_date TEXT,
+                    created_at REAL,
+                    source_message_id INTEGER,
+                    task_count INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_versions_day ON plan_versions (day_date, id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    version_id INTEGER,
+                    day_date TEXT,
+                    position INTEGER,
+                    start TEXT,
+                    end TEXT,
+                    category TEXT,
+                    title TEXT,
+                    priority TEXT
+                )
+            """)
+            # Bancos criados antes do versionamento não têm version_id
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(plan_tasks)")}
+            if "version_id" not in columns:
+                conn.execute("ALTER TABLE plan_tasks ADD COLUMN version_id INTEGER")
+            conn.execute("DROP INDEX IF EXISTS idx_plan_tasks_day")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_tasks_version ON plan_tasks (version_id, position)")
             # Tabela de Distrações (Dominó)
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS distractions (
@@ -72,13 +173,111 @@ class DatabaseManager:
                     day_date TEXT
                 )
             """)
+            self.fts_enabled = self._init_search(conn, SEARCH_SOURCES)
             conn.commit()
 
+    def _init_archive(self) -> None:
+        """Cria (se preciso) o banco de arquivo: mesmas tabelas, chat com conteúdo zlib."""
+        conn = sqlite3.connect(self.archive_path, timeout=10)
+        try:
+            with conn:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute(TASKS_DDL)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_day ON tasks (day_date)")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS chat_history (
+                        id INTEGER PRIMARY KEY,
+                        role TEXT,
+                        content BLOB,
+                        timestamp REAL,
+                        day_date TEXT
+                    )
+                """)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS distractions (
+                        id INTEGER PRIMARY KEY,
+                        content TEXT,
+                        processed INTEGER DEFAULT 1,
+                        day_date TEXT
+                    )
+                """)
+                if self._init_search(conn, ARCHIVE_SEARCH_SOURCES):
+                    conn.execute(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS chat_fts USING fts5(content, content='', tokenize='{FTS_TOKENIZE}')"
+                    )
+        finally:
+            conn.close()
+
+    def _init_search(self, conn: sqlite3.Connection, sources: Dict[str, Tuple[str, str, str, Tuple[str, ...]]]) -> bool:
+        """Cria os índices FTS5 e os triggers de sincronia; vaults antigos são indexados uma vez (rebuild)."""
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        try:
+            for fts, table, rowid, cols in sources.values():
+                col_list = ", ".join(cols)
+                new_vals = ", ".join(f"new.{c}" for c in cols)
+                old_vals = ", ".join(f"old.{c}" for c in cols)
+                conn.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({col_list}, content='{table}', "
+                    f"content_rowid='{rowid}', tokenize='{FTS_TOKENIZE}')"
+                )
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.{rowid}, {new_vals}); END"
+                )
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.{rowid}, {old_vals}); END"
+                )
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col_list} ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.{rowid}, {old_vals}); "
+                    f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.{rowid}, {new_vals}); END"
+                )
+                if fts not in existing:
+                    conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        except sqlite3.OperationalError as e:
+            # SQLite compilado sem FTS5: o resto do vault funciona, só a busca fica indisponível
+            print(f"[*] Busca desativada (FTS5 indisponível): {e}")
+            return False
+        return True
+
+
+class SharedDatabaseManager(DatabaseManager):
+    """
+    Vault servido por uma única conexão, reaproveitada em todas as chamadas das stores.
+
+    Para servidores: evita abrir/fechar o arquivo (e refazer o ATTACH) a cada
+    requisição. A conexão não tem trava própria; use-a sempre da mesma thread
+    (ex.: um executor de um worker só). VaultRetention e TaskChangeFeed fecham
+    ou seguram a conexão: ficam com o DatabaseManager comum, no processo da UI.
+    """
+
+    def __init__(self, vault_dir: Path) -> None:
+        self._conn: Optional[sqlite3.Connection] = None
+        self._attached = False
+        super().__init__(vault_dir)
+
+    def _get_connection(self, with_archive: bool = False):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        # Cada store escolhe a própria row_factory; a da chamada anterior não vaza
+        self._conn.row_factory = None
+        if with_archive and not self._attached and self.has_archive():
+            self._conn.execute("ATTACH DATABASE ? AS archive", (str(self.archive_path),))
+            self._attached = True
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._attached = False
+
 
 # =========================================================
 # Modelo de Tarefa
 # =========================================================
-@dataclass
+@dataclass(slots=True)
 class TaskItem:
     id: str
     title: str
@@ -89,6 +288,7 @@ class TaskItem:
     active: bool = True        # Define se a tarefa entra no plano
     is_recurring: bool = False  # Recorrente ou Única
     created_at: float = 0.0
+    row_version: int = 1       # Versão da linha no banco (concorrência otimista)
 
     @staticmethod
     def create(title: str, notes: str = "", quadrant: str = "Q2", period: str = "FLEXÍVEL", is_recurring: bool = False) -> "TaskItem":
@@ -105,9 +305,205 @@ class TaskItem:
         )
 
 
+# Campos editáveis da tarefa (colunas do UPDATE e do merge de mudanças remotas)
+TASK_COLUMNS = ("title", "notes", "quadrant", "period", "status", "active", "is_recurring")
+
+QUADRANT_ORDER = {"Q1": 0, "Q2": 1, "Q3": 2, "Q4": 3}
+# Valores aceitos pelos campos de vocabulário fechado (os mesmos menus da UI)
+TASK_VOCABULARY: Dict[str, Tuple[str, ...]] = {
+    "quadrant": ("Q1", "Q2", "Q3", "Q4"),
+    "period": ("FLEXÍVEL", "MANHÃ", "TARDE", "NOITE"),
+    "status": ("TODO", "DOING", "DONE"),
+}
+Q1_OVERLOAD_LIMIT = 5
+
+# Tipos de TaskEvent
+TASK_ADDED = "added"
+TASK_UPDATED = "updated"
+TASK_REMOVED = "removed"
+TASKS_RESET = "reset"
+
+
+@dataclass(frozen=True, slots=True)
+class TaskEvent:
+    kind: str
+    task: Optional[TaskItem] = None
+    changes: Tuple[str, ...] = ()  # campos alterados (TASK_UPDATED)
+    remote: bool = False  # veio de outro cliente do vault (já está no banco)
+
+
+class TaskRepository:
+    """
+    Tarefas do dia em memória, com índices por quadrante/status/período/ativa.
+
+    Toda mutação passa por add/update/remove/reset, que mantêm os índices e o
+    contador de Q1 em aberto e publicam um TaskEvent para os assinantes (UI,
+    contexto do agente). As visões ordenadas ficam em cache até o próximo evento.
+    """
+
+    INDEXED = ("quadrant", "status", "period", "active")
+
+    def __init__(self, tasks: Iterable[TaskItem] = ()) -> None:
+        self._by_id: Dict[str, TaskItem] = {}
+        self._index: Dict[str, Dict[Any, set]] = {field: {} for field in self.INDEXED}
+        self._open_q1 = 0
+        self._sorted: Optional[List[TaskItem]] = None
+        self._listeners: List[Callable[[TaskEvent], None]] = []
+        self._load(tasks)
+
+    # --- leitura ---
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[TaskItem]:
+        return iter(list(self._by_id.values()))
+
+    def __contains__(self, task: TaskItem) -> bool:
+        return self._by_id.get(task.id) is task
+
+    def get(self, task_id: str) -> Optional[TaskItem]:
+        return self._by_id.get(task_id)
+
+    def all(self) -> List[TaskItem]:
+        return list(self._by_id.values())
+
+    def count(self, field: str, value: Any) -> int:
+        return len(self._index[field].get(value, ()))
+
+    def where(self, **criteria: Any) -> List[TaskItem]:
+        """Tarefas que batem com todos os critérios (campos de INDEXED), pela interseção dos índices."""
+        ids: Optional[set] = None
+        for field, value in criteria.items():
+            bucket = self._index[field].get(value, set())
+            ids = set(bucket) if ids is None else ids & bucket
+        if ids is None:
+            return self.all()
+        return [t for t in self._by_id.values() if t.id in ids]
+
+    @property
+    def open_q1(self) -> int:
+        return self._open_q1
+
+    def sorted(self) -> List[TaskItem]:
+        """Pendentes antes das concluídas, depois quadrante e criação."""
+        if self._sorted is None:
+            self._sorted = sorted(
+                self._by_id.values(),
+                key=lambda t: (t.status == "DONE", QUADRANT_ORDER.get(t.quadrant, 9), t.created_at),
+            )
+        return self._sorted
+
+    def active_sorted(self) -> List[TaskItem]:
+        active = self._index["active"].get(True, set())
+        return [t for t in self.sorted() if t.id in active]
+
+    # --- assinatura ---
+    def subscribe(self, listener: Callable[[TaskEvent], None]) -> Callable[[], None]:
+        """Registra um ouvinte de TaskEvent; devolve a função que cancela a assinatura."""
+        self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def _emit(self, event: TaskEvent) -> None:
+        self._sorted = None
+        for listener in list(self._listeners):
+            listener(event)
+
+    # --- escrita ---
+    def add(self, task: TaskItem, remote: bool = False) -> TaskItem:
+        self._index_task(task)
+        self._emit(TaskEvent(TASK_ADDED, task, remote=remote))
+        return task
+
+    def update(self, task: TaskItem, **changes: Any) -> Tuple[str, ...]:
+        """
+        Aplica `changes` na tarefa e reindexa; sem evento se nada mudou.
+        Uma referência antiga (tarefa recarregada) é resolvida pelo id; tarefa que saiu do repositório é ignorada.
+        """
+        current = self._by_id.get(task.id)
+        if current is None:
+            return ()
+        return self._apply(current, changes, remote=False)
+
+    def merge(self, current: TaskItem) -> None:
+        """Aplica a linha atual do banco vinda de outro cliente, se for mais nova que a local."""
+        local = self._by_id.get(current.id)
+        if local is None:
+            self.add(current, remote=True)
+            return
+        if current.row_version <= local.row_version:
+            return
+        local.row_version = current.row_version
+        self._apply(local, {f: getattr(current, f) for f in TASK_COLUMNS}, remote=True)
+
+    def _apply(self, task: TaskItem, changes: Dict[str, Any], remote: bool) -> Tuple[str, ...]:
+        changed = tuple(field for field, value in changes.items() if getattr(task, field) != value)
+        if not changed:
+            return changed
+        self._unindex_task(task)
+        for field in changed:
+            setattr(task, field, changes[field])
+        self._index_task(task)
+        self._emit(TaskEvent(TASK_UPDATED, task, changed, remote=remote))
+        return changed
+
+    def remove(self, task: TaskItem, remote: bool = False) -> None:
+        current = self._by_id.get(task.id)
+        if current is None:
+            return
+        self._unindex_task(current)
+        self._emit(TaskEvent(TASK_REMOVED, current, remote=remote))
+
+    def reset(self, tasks: Iterable[TaskItem]) -> None:
+        """Troca o conjunto inteiro (carga do dia, troca de vault) com um único evento."""
+        self._load(tasks)
+        self._emit(TaskEvent(TASKS_RESET))
+
+    def _load(self, tasks: Iterable[TaskItem]) -> None:
+        self._by_id.clear()
+        for field in self.INDEXED:
+            self._index[field].clear()
+        self._open_q1 = 0
+        for task in tasks:
+            self._index_task(task)
+
+    def _index_task(self, task: TaskItem) -> None:
+        # Mesmo id já indexado (add repetido, carga com duplicata): substitui sem contar duas vezes
+        previous = self._by_id.get(task.id)
+        if previous is not None:
+            self._unindex_task(previous)
+        self._by_id[task.id] = task
+        for field in self.INDEXED:
+            self._index[field].setdefault(getattr(task, field), set()).add(task.id)
+        if task.quadrant == "Q1" and task.status != "DONE":
+            self._open_q1 += 1
+
+    def _unindex_task(self, task: TaskItem) -> None:
+        del self._by_id[task.id]
+        for field in self.INDEXED:
+            bucket = self._index[field].get(getattr(task, field))
+            if bucket is not None:
+                bucket.discard(task.id)
+        if task.quadrant == "Q1" and task.status != "DONE":
+            self._open_q1 -= 1
+
+
 # =========================================================
 # Persistência simples (JSON por dia)
 # =========================================================
+class StaleTaskError(RuntimeError):
+    """A tarefa mudou (ou sumiu) no banco desde a versão lida por este cliente."""
+
+    def __init__(self, task_id: str) -> None:
+        super().__init__(f"Tarefa {task_id} foi alterada por outro cliente.")
+        self.task_id = task_id
+
+
+
 class TaskStore:
     def __init__(self, db_manager: DatabaseManager) -> None:
         self.db = db_manager
@@ -133,35 +529,91 @@ class TaskStore:
     
     def _fetch_tasks_by_date(self, date_str: str) -> List[TaskItem]:
         tasks = []
-        with self.db._get_connection() as conn:
+        with self.db._get_connection(with_archive=True) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.execute("SELECT * FROM tasks WHERE day_date = ?", (date_str,))
-            for row in cursor:
-                # row.keys() para checar se a coluna existe e evitar erros em migrações
-                keys = row.keys()
-                tasks.append(TaskItem(
-                    id=row["id"],
-                    title=row["title"],
-                    notes=row["notes"],
-                    quadrant=row["quadrant"],
-                    period=row["period"],
-                    status=row["status"],
-                    active=bool(row["active"]) if "active" in keys else True,
-                    is_recurring=bool(row["is_recurring"]) if "is_recurring" in keys else False,
-                    created_at=row["created_at"]
-                ))
+            # Dias antigos podem estar no arquivo (VaultRetention); cada dia fica inteiro em um só lugar
+            for schema in self.db.schemas():
+                rows = conn.execute(f"SELECT * FROM {schema}.tasks WHERE day_date = ?", (date_str,)).fetchall()
+                if rows:
+                    break
+            tasks = [self._row_to_task(row) for row in rows]
         return tasks
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> TaskItem:
+        # row.keys() para checar se a coluna existe e evitar erros em migrações
+        keys = row.keys()
+        return TaskItem(
+            id=row["id"],
+            title=row["title"],
+            notes=row["notes"],
+            quadrant=row["quadrant"],
+            period=row["period"],
+            status=row["status"],
+            active=bool(row["active"]) if "active" in keys else True,
+            is_recurring=bool(row["is_recurring"]) if "is_recurring" in keys else False,
+            created_at=row["created_at"],
+            row_version=row["row_version"] if "row_version" in keys and row["row_version"] is not None else 1,
+        )
+
+    def fetch(self, task_ids: Iterable[str]) -> Dict[str, TaskItem]:
+        """Linhas atuais das tarefas pedidas (as apagadas ficam de fora)."""
+        ids = list(task_ids)
+        if not ids:
+            return {}
+        with self.db._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"SELECT * FROM tasks WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()
+        return {row["id"]: self._row_to_task(row) for row in rows}
+
+    # --- Escrita por linha (concorrência otimista) ---
+    def insert(self, task: TaskItem) -> None:
+        with self.db._get_connection() as conn:
+            conn.execute(
+                "INSERT INTO tasks (id, title, notes, quadrant, period, status, active, is_recurring, created_at, day_date, row_version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task.id, task.title, task.notes, task.quadrant, task.period, task.status,
+                 int(task.active), int(task.is_recurring), task.created_at, self._today_str(), task.row_version),
+            )
+            conn.commit()
+
+    def update(self, task: TaskItem) -> None:
+        """Grava a tarefa se o banco ainda está na versão lida; senão StaleTaskError."""
+        with self.db._get_connection() as conn:
+            cursor = conn.execute(
+                f"UPDATE tasks SET {', '.join(f'{c} = ?' for c in TASK_COLUMNS)}, row_version = row_version + 1 "
+                "WHERE id = ? AND row_version = ?",
+                (*(getattr(task, c) for c in TASK_COLUMNS), task.id, task.row_version),
+            )
+            conn.commit()
+        if cursor.rowcount == 0:
+            raise StaleTaskError(task.id)
+        task.row_version += 1
+
+    def delete(self, task: TaskItem) -> None:
+        with self.db._get_connection() as conn:
+            cursor = conn.execute("DELETE FROM tasks WHERE id = ? AND row_version = ?", (task.id, task.row_version))
+            # Já apagada por outro cliente: o resultado é o mesmo
+            exists = cursor.rowcount == 0 and conn.execute("SELECT 1 FROM tasks WHERE id = ?", (task.id,)).fetchone()
+            conn.commit()
+        if exists:
+            raise StaleTaskError(task.id)
     
     def _rollover_tasks(self, today_str: str) -> List[TaskItem]:
         """Busca o último dia com tarefas e decide o que sobrevive."""
-        with self.db._get_connection() as conn:
-            # Pega a data mais recente antes de hoje
+        with self.db._get_connection(with_archive=True) as conn:
+            # Pega a data mais recente antes de hoje (no banco ou, após longa ausência, no arquivo)
+            schemas = self.db.schemas()
             last_date_row = conn.execute(
-                "SELECT day_date FROM tasks WHERE day_date < ? ORDER BY day_date DESC LIMIT 1", 
-                (today_str,)
+                "SELECT MAX(day_date) FROM ("
+                + " UNION ALL ".join(f"SELECT MAX(day_date) AS day_date FROM {s}.tasks WHERE day_date < ?" for s in schemas)
+                + ")",
+                (today_str,) * len(schemas),
             ).fetchone()
             
-            if not last_date_row:
+            if not last_date_row or not last_date_row[0]:
                 return []
             
             last_date = last_date_row[0]
@@ -201,14 +653,67 @@ class TaskStore:
             conn.execute("DELETE FROM tasks WHERE day_date = ?", (today,))
             for t in tasks:
                 conn.execute("""
-                    INSERT INTO tasks (id, title, notes, quadrant, period, status, active, is_recurring, created_at, day_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO tasks (id, title, notes, quadrant, period, status, active, is_recurring, created_at, day_date, row_version)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (t.id, t.title, t.notes, t.quadrant, t.period, t.status, 
-                      int(t.active), int(t.is_recurring), t.created_at, today))
+                      int(t.active), int(t.is_recurring), t.created_at, today, t.row_version))
             conn.commit()
             print(f"[*] Salvas {len(tasks)} tarefas para o dia {today}")
 
 
+@dataclass(frozen=True)
+class TaskChange:
+    op: str  # insert / update / delete (a última operação da tarefa no lote)
+    task_id: str
+    task: Optional[TaskItem]  # linha atual; None se apagada
+
+
+class TaskChangeFeed:
+    """
+    Mudanças nas tarefas de hoje feitas por outros clientes do vault.
+
+    poll() é barato quando nada mudou: só um PRAGMA data_version numa conexão
+    mantida aberta. Havendo commit, lê o task_changes a partir do último seq
+    visto e busca só as linhas alteradas. Use a partir de uma única thread.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, store: TaskStore) -> None:
+        self.db = db_manager
+        self.store = store
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        # Posição inicial: crie o feed antes de carregar as tarefas para não perder nada no meio
+        with self.db._get_connection() as conn:
+            self._seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM task_changes").fetchone()[0]
+
+    def poll(self) -> List[TaskChange]:
+        if self._conn is None:
+            self._conn = self.db._get_connection()
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return []
+        self._data_version = version
+
+        rows = self._conn.execute(
+            "SELECT seq, task_id, day_date, op FROM task_changes WHERE seq > ? ORDER BY seq", (self._seq,)
+        ).fetchall()
+        if not rows:
+            return []
+        self._seq = rows[-1][0]
+        today = self.store._today_str()
+        last_op: Dict[str, str] = {}
+        for _seq, task_id, day_date, op in rows:
+            if day_date == today:
+                last_op[task_id] = op
+        current = self.store.fetch(task_id for task_id, op in last_op.items() if op != "delete")
+        return [TaskChange(op, task_id, current.get(task_id)) for task_id, op in last_op.items()]
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
 class DistractionStore:
     def __init__(self, db_manager: DatabaseManager) -> None:
         self.db = db_manager
@@ -230,6 +735,13 @@ class DistractionStore:
             conn.commit()
 
 
+def _chat_text(content: Any) -> str:
+    """Conteúdo do chat como texto; no arquivo ele fica comprimido (zlib)."""
+    if isinstance(content, bytes):
+        return zlib.decompress(content).decode("utf-8")
+    return content or ""
+
+
 class ChatStore:
     def __init__(self, db_manager: DatabaseManager) -> None:
         self.db = db_manager
@@ -240,24 +752,52 @@ class ChatStore:
         with self.db._get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.execute(
-                "SELECT role, content FROM chat_history WHERE day_date = ? ORDER BY timestamp ASC", 
+                "SELECT role, content FROM chat_history WHERE day_date = ? ORDER BY timestamp ASC, id ASC", 
                 (today,)
             )
             for row in cursor:
                 messages.append({"role": row["role"], "content": row["content"]})
         return messages
 
-    def save(self, messages: List[Dict[str, str]]) -> None:
+    def save(self, messages: List[Dict[str, str]]) -> List[int]:
+        """
+        Persiste o histórico do dia e devolve os ids das mensagens, na ordem.
+        O histórico só cresce, então apenas as mensagens novas são inseridas e
+        os ids já gravados (referenciados por plan_versions) não mudam.
+        """
         today = datetime.now().strftime("%Y-%m-%d")
         with self.db._get_connection() as conn:
-            # Evitar duplicados: limpa o chat do dia antes de salvar o histórico atualizado
-            conn.execute("DELETE FROM chat_history WHERE day_date = ?", (today,))
-            for msg in messages:
-                conn.execute("""
+            stored = conn.execute(
+                "SELECT id, role, content FROM chat_history WHERE day_date = ? ORDER BY timestamp ASC, id ASC",
+                (today,),
+            ).fetchall()
+            is_prefix = len(stored) <= len(messages) and all(
+                role == msg["role"] and content == msg["content"]
+                for (_, role, content), msg in zip(stored, messages)
+            )
+            if is_prefix:
+                ids = [row[0] for row in stored]
+                new_messages = messages[len(stored):]
+            else:
+                # Histórico reescrito (ex.: limpo e recomeçado): regrava o dia
+                conn.execute("DELETE FROM chat_history WHERE day_date = ?", (today,))
+                ids, new_messages = [], messages
+            for msg in new_messages:
+                cursor = conn.execute("""
                     INSERT INTO chat_history (role, content, timestamp, day_date)
                     VALUES (?, ?, ?, ?)
                 """, (msg["role"], msg["content"], time.time(), today))
+                ids.append(cursor.lastrowid)
             conn.commit()
+        return ids
+
+    def get(self, message_id: int) -> Optional[Dict[str, str]]:
+        with self.db._get_connection(with_archive=True) as conn:
+            row = conn.execute("SELECT role, content FROM main.chat_history WHERE id = ?", (message_id,)).fetchone()
+            if row is None and self.db.has_archive():
+                # Mensagens arquivadas mantêm o id; o conteúdo está comprimido
+                row = conn.execute("SELECT role, content FROM archive.chat_history WHERE id = ?", (message_id,)).fetchone()
+        return {"role": row[0], "content": _chat_text(row[1])} if row else None
 
     def clear(self) -> None:
         """Apaga o histórico de chat do dia atual no banco."""
@@ -267,6 +807,316 @@ class ChatStore:
             conn.commit()
 
 
+@dataclass
+class SearchHit:
+    source: str  # chave de SEARCH_SOURCES
+    ref_id: str  # id da tarefa / mensagem / distração
+    day_date: str
+    snippet: str
+    rank: float  # bm25: menor é mais relevante
+
+
+def fts_query(text: str) -> str:
+    """Texto livre → consulta FTS5: cada termo entre aspas, com prefixo, todos obrigatórios."""
+    return " ".join(f'"{term}"*' for term in re.findall(r"\w+", text))
+
+
+def _text_snippet(text: str, query: str, width: int = 60) -> str:
+    """Trecho em volta do primeiro termo encontrado, no formato do snippet() do FTS5."""
+    folded = text.casefold()
+    for term in re.findall(r"\w+", query.casefold()):
+        pos = folded.find(term)
+        if pos >= 0:
+            end = pos + len(term)
+            start = max(0, pos - width // 2)
+            prefix = "…" if start else ""
+            suffix = "…" if end + width // 2 < len(text) else ""
+            return f"{prefix}{text[start:pos]}[{text[pos:end]}]{text[end:end + width // 2]}{suffix}"
+    return text[:width] + ("…" if len(text) > width else "")
+
+
+class SearchStore:
+    """Busca textual no vault (tarefas, chat e distrações) pelos índices FTS5."""
+
+    def __init__(self, db_manager: DatabaseManager) -> None:
+        self.db = db_manager
+
+    def search(self, query: str, limit: int = 50, sources: Optional[Iterable[str]] = None) -> List[SearchHit]:
+        if not self.db.fts_enabled:
+            raise RuntimeError("Busca indisponível: o SQLite desta instalação não tem FTS5.")
+        match = fts_query(query)
+        if not match:
+            return []
+
+        selects: List[str] = []
+        params: List[Any] = []
+        for schema in self.db.schemas():
+            for source in sources or SEARCH_SOURCES:
+                fts, table, rowid, _cols = SEARCH_SOURCES[source]
+                # Chat arquivado: índice contentless, o trecho sai do conteúdo descomprimido
+                snippet = "t.content" if schema == "archive" and source == "chat" else f"snippet({fts}, -1, '[', ']', '…', 12)"
+                selects.append(
+                    f"SELECT '{source}', t.id, t.day_date, {snippet}, bm25({fts}) "
+                    f"FROM {schema}.{fts} JOIN {schema}.{table} t ON t.{rowid} = {fts}.rowid WHERE {fts} MATCH ?"
+                )
+                params.append(match)
+        sql = " UNION ALL ".join(selects) + " ORDER BY 5, 3 DESC LIMIT ?"
+        with self.db._get_connection(with_archive=True) as conn:
+            rows = conn.execute(sql, (*params, limit)).fetchall()
+        return [
+            SearchHit(
+                source,
+                str(ref),
+                day or "",
+                _text_snippet(_chat_text(snippet), query) if isinstance(snippet, bytes) else snippet or "",
+                rank,
+            )
+            for source, ref, day, snippet, rank in rows
+        ]
+
+
+def benchmark_search(years: int = 5, tasks_per_day: int = 15, messages_per_day: int = 8, repeats: int = 20) -> Dict[str, float]:
+    """Tempo médio (ms) de SearchStore.search num vault sintético de `years` anos."""
+    import tempfile
+
+    words = ("relatório", "reunião", "academia", "revisão", "cliente", "orçamento", "estudo", "deploy", "leitura", "compras")
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="ops_search_bench_") as tmp:
+        db = DatabaseManager(Path(tmp))
+        day0 = datetime(2020, 1, 1)
+        with db._get_connection() as conn:
+            for d in range(years * 365):
+                day = (day0 + timedelta(days=d)).strftime("%Y-%m-%d")
+                conn.executemany(
+                    "INSERT INTO tasks (id, title, notes, quadrant, period, status, created_at, day_date) "
+                    "VALUES (?, ?, ?, 'Q2', 'FLEXÍVEL', 'TODO', 0, ?)",
+                    [(f"{d}-{i}", f"{words[(d + i) % 10]} {i}", f"notas {words[i % 10]}", day) for i in range(tasks_per_day)],
+                )
+                conn.executemany(
+                    "INSERT INTO chat_history (role, content, timestamp, day_date) VALUES (?, ?, 0, ?)",
+                    [("assistant", f"2) Plano\n- 09:00-10:00 [FOCO] {words[(d * i) % 10]} dia {d}", day) for i in range(messages_per_day)],
+                )
+            conn.commit()
+        store = SearchStore(db)
+        for query in ("revisao", "orçamento cliente", "dep", "inexistente"):
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                hits = store.search(query)
+            results[query] = (time.perf_counter() - t0) * 1000 / repeats
+            print(f"{query!r:<22} {results[query]:.2f} ms ({len(hits)} resultados)")
+    return results
+
+
+class VaultRetention:
+    """
+    Retenção do vault: dias anteriores a `horizon_days` saem do banco ativo.
+
+    Tarefas e distrações processadas são movidas para ops_agent_archive.db e o
+    texto do chat vai comprimido (zlib); TaskStore, ChatStore.get e SearchStore
+    continuam lendo o arquivo. Depois o espaço liberado volta ao disco em
+    passos de incremental_vacuum, sem travar o banco por muito tempo.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, horizon_days: int = 90, vacuum_pages: int = 256) -> None:
+        self.db = db_manager
+        self.horizon_days = horizon_days
+        self.vacuum_pages = vacuum_pages
+
+    def cutoff(self) -> str:
+        return (datetime.now() - timedelta(days=self.horizon_days)).strftime("%Y-%m-%d")
+
+    def archive(self) -> Dict[str, int]:
+        """Move os dias antigos para o arquivo numa transação; devolve linhas movidas por tabela."""
+        cutoff = self.cutoff()
+        moved = {"tasks": 0, "chat_history": 0, "distractions": 0}
+        with self.db._get_connection() as conn:
+            # O log de mudanças só serve aos clientes abertos; um dia basta
+            conn.execute("DELETE FROM task_changes WHERE changed_at < ?", (time.time() - 86400,))
+            conn.commit()
+            pending = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM tasks WHERE day_date < ?)"
+                " + (SELECT COUNT(*) FROM chat_history WHERE day_date < ?)"
+                " + (SELECT COUNT(*) FROM distractions WHERE day_date < ? AND processed = 1)",
+                (cutoff, cutoff, cutoff),
+            ).fetchone()[0]
+        if not pending:
+            return moved
+
+        self.db._init_archive()
+        conn = self.db._get_connection(with_archive=True)
+        try:
+            with conn:
+                moved["tasks"] = conn.execute(
+                    "INSERT OR IGNORE INTO archive.tasks SELECT id, title, notes, quadrant, period, status, active, "
+                    "is_recurring, created_at, day_date FROM main.tasks WHERE day_date < ?",
+                    (cutoff,),
+                ).rowcount
+                conn.execute("DELETE FROM main.tasks WHERE day_date < ?", (cutoff,))
+
+                chat = conn.execute(
+                    "SELECT id, role, content, timestamp, day_date FROM main.chat_history WHERE day_date < ?", (cutoff,)
+                ).fetchall()
+                conn.executemany(
+                    "INSERT INTO archive.chat_history (id, role, content, timestamp, day_date) VALUES (?, ?, ?, ?, ?)",
+                    [(i, role, zlib.compress((content or "").encode("utf-8")), ts, day) for i, role, content, ts, day in chat],
+                )
+                if self.db.fts_enabled:
+                    conn.executemany(
+                        "INSERT INTO archive.chat_fts (rowid, content) VALUES (?, ?)",
+                        [(i, content or "") for i, _role, content, _ts, _day in chat],
+                    )
+                conn.execute("DELETE FROM main.chat_history WHERE day_date < ?", (cutoff,))
+                moved["chat_history"] = len(chat)
+
+                moved["distractions"] = conn.execute(
+                    "INSERT INTO archive.distractions (id, content, processed, day_date) "
+                    "SELECT id, content, processed, day_date FROM main.distractions WHERE day_date < ? AND processed = 1",
+                    (cutoff,),
+                ).rowcount
+                conn.execute("DELETE FROM main.distractions WHERE day_date < ? AND processed = 1", (cutoff,))
+        finally:
+            conn.close()
+        return moved
+
+    def vacuum(self, max_steps: Optional[int] = None, pause: float = 0.05) -> int:
+        """Devolve páginas livres ao disco em passos curtos; devolve o nº de páginas liberadas."""
+        conn = sqlite3.connect(self.db.db_path, timeout=10, isolation_level=None)
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                # Banco criado antes da retenção: conversão única para o modo incremental
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                return 0
+            freed = 0
+            steps = 0
+            while max_steps is None or steps < max_steps:
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if not free:
+                    break
+                # executescript roda o PRAGMA até o fim; execute() pararia no primeiro passo (1 página)
+                conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+                freed += free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+                steps += 1
+                time.sleep(pause)  # deixa a UI gravar entre um passo e outro
+            return freed
+        finally:
+            conn.close()
+
+    def run(self) -> str:
+        moved = self.archive()
+        freed = self.vacuum()
+        if not any(moved.values()) and not freed:
+            return ""
+        return (
+            f"Retenção ({self.horizon_days} dias): arquivadas {moved['tasks']} tarefas, "
+            f"{moved['chat_history']} mensagens e {moved['distractions']} distrações; {freed} páginas liberadas."
+        )
+
+
+@dataclass
+class PlanVersion:
+    id: int
+    day_date: str
+    created_at: float
+    source_message_id: Optional[int]
+    tasks: List[PlanTask]
+
+
+class PlanStore:
+    """
+    Versões do plano por dia, em linhas tipadas (PlanTask).
+
+    Cada resposta do agente com plano vira uma versão ligada à mensagem de
+    origem; plano vigente, histórico e diffs são leituras pelo índice de dia.
+    """
+
+    def __init__(self, db_manager: DatabaseManager) -> None:
+        self.db = db_manager
+
+    def save_version(self, tasks: List[PlanTask], source_message_id: Optional[int] = None) -> int:
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self.db._get_connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO plan_versions (day_date, created_at, source_message_id, task_count) VALUES (?, ?, ?, ?)",
+                (today, time.time(), source_message_id, len(tasks)),
+            )
+            version_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO plan_tasks (version_id, day_date, position, start, end, category, title, priority) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(version_id, today, i, t.start, t.end, t.category, t.title, t.priority) for i, t in enumerate(tasks)],
+            )
+            conn.commit()
+        return version_id
+
+    def _load(self, conn, where: str, params: tuple) -> List[PlanVersion]:
+        rows = conn.execute(
+            "SELECT v.id, v.day_date, v.created_at, v.source_message_id, "
+            "t.start, t.end, t.title, t.priority, t.category "
+            "FROM plan_versions v LEFT JOIN plan_tasks t ON t.version_id = v.id "
+            f"WHERE {where} ORDER BY v.id, t.position",
+            params,
+        ).fetchall()
+        versions: Dict[int, PlanVersion] = {}
+        for vid, day, created_at, source_id, *task in rows:
+            version = versions.get(vid)
+            if version is None:
+                version = versions[vid] = PlanVersion(vid, day, created_at, source_id, [])
+            if task[0] is not None:
+                version.tasks.append(PlanTask(*task))
+        return list(versions.values())
+
+    def latest(self, day: Optional[str] = None) -> Optional[PlanVersion]:
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        with self.db._get_connection() as conn:
+            found = self._load(
+                conn,
+                "v.id = (SELECT id FROM plan_versions WHERE day_date = ? ORDER BY id DESC LIMIT 1)",
+                (day,),
+            )
+        return found[0] if found else None
+
+    def load_today(self) -> List[PlanTask]:
+        latest = self.latest()
+        return latest.tasks if latest else []
+
+    def history(self, day: Optional[str] = None) -> List[PlanVersion]:
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        with self.db._get_connection() as conn:
+            return self._load(conn, "v.day_date = ?", (day,))
+
+    def diff_latest(self, day: Optional[str] = None) -> Optional[PlanDiff]:
+        """Diff entre as duas últimas versões do dia (None se houver menos de duas)."""
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        with self.db._get_connection() as conn:
+            versions = self._load(
+                conn,
+                "v.id IN (SELECT id FROM plan_versions WHERE day_date = ? ORDER BY id DESC LIMIT 2)",
+                (day,),
+            )
+        if len(versions) < 2:
+            return None
+        return diff_plans(versions[0].tasks, versions[1].tasks)
+
+
+def current_plan(
+    chat_store: ChatStore, plan_store: PlanStore, chat_history: List[Dict[str, str]]
+) -> Tuple[List[PlanTask], str]:
+    """Plano vigente do dia e o texto da resposta que o gerou (o `last_plan` do agente)."""
+    latest = plan_store.latest()
+    source = chat_store.get(latest.source_message_id) if latest and latest.source_message_id else None
+    if source is not None:
+        return latest.tasks, source["content"]
+    last_output = ""
+    if latest is None:
+        # Dias anteriores ao versionamento: último texto do assistente
+        for msg in reversed(chat_history):
+            if msg.get("role") == "assistant":
+                last_output = msg.get("content", "")
+                break
+    return (latest.tasks if latest else []), last_output
+
+
 # =========================================================
 # Diretriz do Agente (Produtividade + insights)
 # =========================================================
@@ -323,10 +1173,13 @@ Notei muitas tarefas pequenas. Cuidado com o "Dominó Mental": não deixe uma ab
 """
 
 
-def check_identity_overload(tasks: List[TaskItem]) -> str:
+def check_identity_overload(tasks: Union[TaskRepository, List[TaskItem]]) -> str:
     """Filtro de Identidade e alerta de excesso de Q1 (incêndios demais)."""
-    q1_tasks = [t for t in tasks if getattr(t, "quadrant", "Q2") == "Q1" and t.status != "DONE"]
-    if len(q1_tasks) > 5:
+    if isinstance(tasks, TaskRepository):
+        open_q1 = tasks.open_q1  # contador mantido pelo repositório
+    else:
+        open_q1 = sum(1 for t in tasks if getattr(t, "quadrant", "Q2") == "Q1" and t.status != "DONE")
+    if open_q1 > Q1_OVERLOAD_LIMIT:
         return (
             "\n⚠️ ALERTA NINJA: Você tem mais de 5 tarefas no Quadrante Q1. Parece que está tentando apagar incêndios demais. "
             "Escolha o incêndio que, se resolvido, reduz ou elimina vários outros."
@@ -334,16 +1187,239 @@ def check_identity_overload(tasks: List[TaskItem]) -> str:
     return ""
 
 
+# =========================================================
+# Agendador local (regras do OPS_SYSTEM, sem modelo)
+# =========================================================
+@dataclass(frozen=True)
+class ScheduleRules:
+    day_start: str = "06:00"
+    day_end: str = "23:00"
+    # Janela de INÍCIO de cada período (a tarefa pode terminar depois)
+    periods: Tuple[Tuple[str, str, str], ...] = (
+        ("MANHÃ", "06:00", "12:00"),
+        ("TARDE", "12:00", "18:00"),
+        ("NOITE", "18:00", "23:00"),
+    )
+    # Duração, categoria e prioridade padrão por quadrante
+    blocks: Tuple[Tuple[str, int, str, str], ...] = (
+        ("Q1", 90, "TRABALHO FOCADO", "P1"),
+        ("Q2", 60, "TRABALHO FOCADO", "P2"),
+        ("Q3", 30, "TRABALHO SUPERFICIAL", "P2"),
+        ("Q4", 15, "TRABALHO SUPERFICIAL", "P3"),
+    )
+    power_up_after_min: int = 90     # [POWER UP] assim que o trabalho contínuo atinge 90 min...
+    power_up_max_min: int = 120      # ...e nunca deixando passar de 120 min
+    power_up_len: int = 15
+    buffer_len: int = 15             # [BUFFER] entre dois blocos de trabalho focado
+    slot_min: int = 5                # início arredondado para múltiplos de 5 min
+
+
+@dataclass
+class ScheduleResult:
+    plan: List[PlanTask]
+    overflow: List[TaskItem]   # tarefas que não couberam até o fim do dia / período
+
+
+def _to_min(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def _to_hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def schedule_day(
+    tasks: Iterable[TaskItem],
+    now: Optional[datetime] = None,
+    rules: ScheduleRules = ScheduleRules(),
+) -> ScheduleResult:
+    """
+    Monta o Plano do dia localmente a partir de quadrante/período/status.
+
+    Greedy determinístico em O(n log n): uma fila por período, cada uma em
+    ordem de quadrante e criação; a cada passo entra a tarefa mais prioritária
+    entre as filas cujo período admite o horário corrente. [POWER UP] e
+    [BUFFER] são inseridos pelas regras do OPS_SYSTEM.
+    """
+    now = now or datetime.now()
+    step = rules.slot_min
+    cursor = max(_to_min(rules.day_start), -(-(now.hour * 60 + now.minute) // step) * step)
+    day_end = _to_min(rules.day_end)
+    windows = {name: (_to_min(a), _to_min(b)) for name, a, b in rules.periods}
+    blocks = {q: (length, category, prio) for q, length, category, prio in rules.blocks}
+    quadrant_order = {q: i for i, (q, *_rest) in enumerate(rules.blocks)}
+
+    pending = sorted(
+        (t for t in tasks if t.active and t.status != "DONE"),
+        key=lambda t: (quadrant_order.get(t.quadrant, len(quadrant_order)), t.created_at),
+    )
+    queues: Dict[str, List[TaskItem]] = {}
+    for t in pending:
+        queues.setdefault(t.period if t.period in windows else "FLEXÍVEL", []).append(t)
+    heads = {name: 0 for name in queues}
+
+    def window(name: str) -> Tuple[int, int]:
+        return windows.get(name, (_to_min(rules.day_start), day_end))
+
+    plan: List[PlanTask] = []
+    overflow: List[TaskItem] = []
+    worked = 0                 # minutos de trabalho desde o último [POWER UP]
+    last_focused = False
+
+    def add(length: int, title: str, category: str, priority: str) -> None:
+        nonlocal cursor
+        plan.append(PlanTask(_to_hhmm(cursor), _to_hhmm(cursor + length), title, priority, category))
+        cursor += length
+
+    def advance(name: str) -> None:
+        heads[name] += 1
+        if heads[name] == len(queues[name]):
+            del heads[name]
+
+    while True:
+        # Períodos já encerrados não aceitam mais tarefas
+        for name in list(heads):
+            if cursor >= min(window(name)[1], day_end):
+                overflow.extend(queues[name][heads[name]:])
+                del heads[name]
+        if not heads or cursor >= day_end:
+            break
+
+        open_now = [n for n in heads if window(n)[0] <= cursor]
+        if not open_now:
+            # Nada pode começar agora: pula para a abertura do próximo período
+            cursor = min(window(n)[0] for n in heads)
+            worked, last_focused = 0, False
+            continue
+
+        # Mesma prioridade: a tarefa presa a um período vai antes da flexível (que cabe em qualquer lugar)
+        name = min(open_now, key=lambda n: (
+            quadrant_order.get(queues[n][heads[n]].quadrant, len(quadrant_order)),
+            n not in windows,
+            queues[n][heads[n]].created_at,
+        ))
+        task = queues[name][heads[name]]
+        length, category, priority = blocks.get(task.quadrant, blocks["Q2"])
+        focused = category == "TRABALHO FOCADO"
+
+        power_up = bool(worked) and worked + length > rules.power_up_max_min
+        buffer = not power_up and focused and last_focused
+        pause = rules.power_up_len if power_up else rules.buffer_len if buffer else 0
+        if cursor + pause + length > day_end:
+            # Não termina até o fim do dia: fica de fora (uma tarefa mais curta ainda pode caber)
+            overflow.append(task)
+            advance(name)
+            continue
+        if power_up:
+            add(rules.power_up_len, "Recarga: respiração, hidratação e alongamento", "POWER UP", "P1")
+            worked, last_focused = 0, False
+        elif buffer:
+            add(rules.buffer_len, "Margem de segurança", "BUFFER", "P3")
+
+        add(length, task.title, category, priority)
+        advance(name)
+        worked += length
+        last_focused = focused
+        more_now = any(window(n)[0] <= cursor < window(n)[1] for n in heads)
+        if worked >= rules.power_up_after_min and more_now and cursor + rules.power_up_len <= day_end:
+            add(rules.power_up_len, "Recarga: respiração, hidratação e alongamento", "POWER UP", "P1")
+            worked, last_focused = 0, False
+
+    return ScheduleResult(plan, overflow)
+
+
+def schedule_violations(plan: List[PlanTask], rules: ScheduleRules = ScheduleRules()) -> List[str]:
+    """Confere um plano contra as regras do OPS_SYSTEM (serve para o plano local e para o do modelo)."""
+    problems: List[str] = []
+    day_end = _to_min(rules.day_end)
+    worked, previous_end, previous_focused = 0, None, False
+    for t in plan:
+        start, end = _to_min(t.start), _to_min(t.end)
+        if end <= start:
+            problems.append(f"{t.start}–{t.end} {t.title}: fim antes do início")
+        if end >= 24 * 60:
+            problems.append(f"{t.start}–{t.end} {t.title}: horário inválido (24:00 ou depois)")
+        elif end > day_end:
+            problems.append(f"{t.start}–{t.end} {t.title}: termina depois de {rules.day_end}")
+        if previous_end is not None and start < previous_end:
+            problems.append(f"{t.start} {t.title}: sobrepõe o bloco anterior")
+        if previous_end is not None and start > previous_end:
+            worked, previous_focused = 0, False  # intervalo livre também recarrega
+        if t.category == "POWER UP":
+            worked = 0
+        elif t.category != "BUFFER":
+            worked += end - start
+            if worked > rules.power_up_max_min:
+                problems.append(f"{t.start} {t.title}: mais de {rules.power_up_max_min} min sem [POWER UP]")
+        focused = t.category == "TRABALHO FOCADO"
+        if focused and previous_focused:
+            problems.append(f"{t.start} {t.title}: dois blocos focados sem [BUFFER]")
+        previous_focused = focused
+        previous_end = end
+    return problems
+
+
+# Anexado ao prompt no modo estruturado
+OPS_JSON_ADDENDUM = (
+    "\n\nFORMATO ESTRUTURADO: depois da resposta, repita o Plano em um bloco de código json no formato "
+    '{"plan": [{"start": "HH:MM", "end": "HH:MM", "category": "<CATEGORIA>", "title": "...", "priority": "P1"}]}. '
+    f"Categorias válidas: {', '.join(PLAN_CATEGORIES)}. Use exatamente os mesmos blocos do Plano em texto."
+)
+
+
 # =========================================================
 # Runner stateful (mantém conversa)
 # =========================================================
 class DailyOpsRunner:
-    def __init__(self, config: DailyOpsConfig, history: Optional[List[Dict[str, str]]] = None) -> None:
+    def __init__(
+        self,
+        config: DailyOpsConfig,
+        history: Optional[List[Dict[str, str]]] = None,
+        meter: Optional["UsageMeter"] = None,
+        model_client: Optional["ChatCompletionClient"] = None,
+        strong_client: Optional["ChatCompletionClient"] = None,
+    ) -> None:
+        from autogen_agentchat.agents import AssistantAgent
+        from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+        from model_tiers import TieredClient
+        from usage_meter import MeteredChatCompletionClient, get_usage_meter
+
         self.config = config
-        self._model_client = OpenAIChatCompletionClient(model=config.model)
+        # Clientes recebidos de fora (CLI/daemon com vários vaults) são compartilhados e fechados por quem os criou
+        self._owned_clients: List["ChatCompletionClient"] = []
+        if model_client is None:
+            model_client = OpenAIChatCompletionClient(model=config.model)
+            self._owned_clients.append(model_client)
+        self._model_client = model_client
+        # Cada pedido vira uma run no medidor compartilhado com o dev team
+        self._meter = meter or get_usage_meter()
+        agent_client = MeteredChatCompletionClient(self._model_client, self._meter, "ops_agent", model=config.model)
+        # Replanejamentos e atualizações de status ficam no modelo rápido
+        self._strong_client = None
+        self._tiers: Optional[TieredClient] = None
+        if config.strong_model and config.strong_model != config.model:
+            if strong_client is None:
+                strong_client = OpenAIChatCompletionClient(model=config.strong_model)
+                self._owned_clients.append(strong_client)
+            self._strong_client = strong_client
+            self._tiers = TieredClient(
+                agent_client,
+                MeteredChatCompletionClient(self._strong_client, self._meter, "ops_agent", model=config.strong_model),
+            )
+            agent_client = self._tiers
+        self.last_tier = ""
+        self._escalate_next = False
+        # Plano da última resposta, já validado (JSON no modo estruturado, texto como fallback)
+        self.last_plan_tasks: List[PlanTask] = []
+        # Linhas de tarefas do contexto, invalidadas pelos eventos do TaskRepository
+        self._task_source: Optional[TaskRepository] = None
+        self._task_unsubscribe: Optional[Callable[[], None]] = None
+        self._task_lines: Optional[List[str]] = None
         self._agent = AssistantAgent(
             name="ops_agent",
-            model_client=self._model_client,
+            model_client=agent_client,
             system_message=OPS_SYSTEM,
             model_client_stream=True,
             max_tool_iterations=config.max_tool_iterations,
@@ -352,31 +1428,66 @@ class DailyOpsRunner:
         self.history: List[Dict[str, str]] = history or []
         self._lock = asyncio.Lock()
 
-    def _build_context(self, tasks: List[TaskItem], last_plan: str = "") -> str:
-        agora = datetime.now()
-        
+    def _on_task_event(self, event: TaskEvent) -> None:
+        self._task_lines = None
+
+    def _render_task_lines(self, tasks: Union[TaskRepository, List[TaskItem]]) -> List[str]:
+        if isinstance(tasks, TaskRepository):
+            # Visão ativa/ordenada vem pronta dos índices; o texto fica em cache até o próximo evento
+            if tasks is not self._task_source:
+                if self._task_unsubscribe is not None:
+                    self._task_unsubscribe()
+                self._task_source = tasks
+                self._task_unsubscribe = tasks.subscribe(self._on_task_event)
+                self._task_lines = None
+            if self._task_lines is None:
+                self._task_lines = self._format_task_lines(tasks.active_sorted())
+            return self._task_lines
+
         # FILTRO CRÍTICO: Só envia para o agente o que está ATIVO (checkbox marcado)
         tarefas_ativas = [t for t in tasks if getattr(t, "active", True)]
-        
-        if not tarefas_ativas:
-            return "O usuário não selecionou nenhuma tarefa como 'ativa' para hoje ainda."
-        
         # Ordenação para o prompt
-        quadrant_order = {"Q1": 0, "Q2": 1, "Q3": 2, "Q4": 3}
         tasks_sorted = sorted(
             tarefas_ativas,
             key=lambda t: (
                 t.status == "DONE",  # TODO/DOING primeiro
-                quadrant_order.get(getattr(t, "quadrant", "Q2"), 9),
+                QUADRANT_ORDER.get(getattr(t, "quadrant", "Q2"), 9),
                 t.created_at,
             ),
-        )[: self.config.max_context_tasks]
-        
+        )
+        return self._format_task_lines(tasks_sorted)
+
+    def _format_task_lines(self, tasks_sorted: List[TaskItem]) -> List[str]:
+        lines: List[str] = []
+        for t in tasks_sorted[: self.config.max_context_tasks]:
+            status = "✅" if t.status == "DONE" else "•"
+            quadrant = getattr(t, "quadrant", "Q2")
+            # Se for flexível, avisamos explicitamente ao agente
+            period_raw = getattr(t, "period", "FLEXÍVEL")
+            period = period_raw if period_raw != "FLEXÍVEL" else "QUALQUER MOMENTO (FLEXÍVEL)"
+            notes_part = f" (Notas: {t.notes})" if t.notes else ""
+            lines.append(f"  {status} [{quadrant}] ({period}) {t.title}{notes_part}")
+        return lines
+
+    def _build_context(
+        self,
+        tasks: Union[TaskRepository, List[TaskItem]],
+        last_plan: str = "",
+        plan_tasks: Optional[List[PlanTask]] = None,
+    ) -> str:
+        agora = datetime.now()
+
+        task_lines = self._render_task_lines(tasks)
+        if not task_lines:
+            return "O usuário não selecionou nenhuma tarefa como 'ativa' para hoje ainda."
+
         lines: List[str] = []
         lines.append(f"HORA ATUAL: {agora.strftime('%H:%M')}")
         
-        # Se houver um plano anterior, injetamos ele como a "verdade atual"
-        if last_plan:
+        # Plano tipado (já validado) dispensa recortar o texto da última resposta
+        if plan_tasks:
+            last_plan = format_plan(plan_tasks)
+        elif last_plan:
             # LIMPEZA: Se o last_plan já contém "=== CRONOGRAMA VIGENTE ===", 
             # pegamos apenas a parte do Plano para não empilhar lixo.
             if "2) Plano" in last_plan or "2) Cronograma" in last_plan:
@@ -384,31 +1495,24 @@ class DailyOpsRunner:
                 match = re.search(r"2\)\s*(?:Plano|Cronograma).*", last_plan, re.S | re.I)
                 if match:
                     last_plan = match.group(0)
-            
+        # Se houver um plano anterior, injetamos ele como a "verdade atual"
+        if last_plan:
             lines.append("\n=== CRONOGRAMA VIGENTE (Última versão) ===")
             lines.append(last_plan)
             lines.append("===========================================\n")
         
         lines.append("ESTADO ATUAL DAS TAREFAS:")
-        
-        for t in tasks_sorted:
-            status = "✅" if t.status == "DONE" else "•"
-            quadrant = getattr(t, "quadrant", "Q2")
-            # Se for flexível, avisamos explicitamente ao agente
-            period_raw = getattr(t, "period", "FLEXÍVEL")
-            period = period_raw if period_raw != "FLEXÍVEL" else "QUALQUER MOMENTO (FLEXÍVEL)"
-            notes_part = f" (Notas: {t.notes})" if t.notes else ""
-            lines.append(f"  {status} [{quadrant}] ({period}) {t.title}{notes_part}")
-        
+        lines.extend(task_lines)
         return "\n".join(lines)
 
     async def ask_stream(
         self,
         user_message: str,
-        tasks: List[TaskItem],
+        tasks: Union[TaskRepository, List[TaskItem]],
         on_chunk: Callable[[str], None],  # Parâmetro obrigatório vem antes
         last_plan: str = "",             # Parâmetros com default vêm depois
         on_final: Optional[Callable[[str], None]] = None,
+        plan_tasks: Optional[List[PlanTask]] = None,
     ) -> None:
         """
         Chama o agente em streaming e faz callback com chunks.
@@ -416,7 +1520,7 @@ class DailyOpsRunner:
         """
         async with self._lock:
             # Agora o contexto leva o plano anterior
-            tasks_ctx = self._build_context(tasks, last_plan)
+            tasks_ctx = self._build_context(tasks, last_plan, plan_tasks)
 
             prompt = (
                 "CONTEXTO DO SISTEMA:\n"
@@ -427,22 +1531,86 @@ class DailyOpsRunner:
                 "Ajuste apenas os horários necessários para acomodar a nova solicitação ou mudanças de status. "
                 "Não remova tarefas que ainda não foram concluídas, a menos que solicitado."
             )
+            local_plan = None
+            if self.config.local_schedule:
+                local_plan = schedule_day(tasks).plan
+                prompt += (
+                    "\n\nCRONOGRAMA CALCULADO (regras já aplicadas; copie o Plano exatamente, sem alterar horários, "
+                    "e escreva apenas as seções 1, 3 e 4):\n" + format_plan(local_plan)
+                )
+            elif self.config.structured_plan:
+                prompt += OPS_JSON_ADDENDUM
+
+            # Só o gatilho heurístico sobe de modelo: a resposta anterior não trouxe plano legível
+            if self._tiers is not None and self._escalate_next:
+                self._tiers.escalate()
+            self._escalate_next = False
+
+            # O bloco ```json é só para o parser: não vai para a tela nem para o histórico
+            structured = local_plan is None and self.config.structured_plan
+            run_id = self._meter.start_run("daily_ops", user_message.strip())
+            from autogen_agentchat.messages import BaseChatMessage, ModelClientStreamingChunkEvent  # já carregado pelo AssistantAgent
 
             full = ""
-            async for item in self._agent.run_stream(task=prompt):
-                # Os eventos de streaming carregam "content" nos chunks finais e/ou intermediários
-                text = getattr(item, "content", None)
-                if not text:
-                    continue
-                full += text
-                on_chunk(text)
+            shown = 0
+            streamed = False
+            stop_reason = "cancelled"
+            try:
+                async for item in self._agent.run_stream(task=prompt):
+                    # Só o que o ops_agent produz: o run_stream ecoa antes a própria task (o prompt inteiro)
+                    if getattr(item, "source", None) != self._agent.name:
+                        continue
+                    if isinstance(item, ModelClientStreamingChunkEvent):
+                        streamed = True
+                    elif isinstance(item, BaseChatMessage):
+                        # A mensagem final repete os chunks já recebidos; só conta se nada veio em streaming
+                        already, streamed = streamed, False
+                        if already:
+                            continue
+                    else:
+                        continue  # eventos de ferramenta/pensamento
+                    text = item.content
+                    if not isinstance(text, str) or not text:
+                        continue
+                    full += text
+                    if not structured:
+                        on_chunk(text)
+                        continue
+                    visible = strip_json_plan(full, final=False)
+                    if len(visible) > shown:
+                        on_chunk(visible[shown:])
+                        shown = len(visible)
+                # Fim do stream: libera o que ficou retido como possível começo de cerca
+                rest = strip_json_plan(full)[shown:] if structured else ""
+                if rest:
+                    on_chunk(rest)
+                stop_reason = "done"
+            finally:
+                self._meter.finish_run(run_id, {"user": 1, "ops_agent": 1 if full else 0}, stop_reason)
+                if self._tiers is not None:
+                    self.last_tier = self._tiers.last_tier
+                    self._tiers.reset()
+
+            # Validação única do plano: agenda local > JSON do modo estruturado > texto
+            plan = local_plan
+            if plan is None and self.config.structured_plan:
+                plan = extract_json_plan(full)
+            self.last_plan_tasks = plan if plan is not None else parse_ops_plan(full)
+
+            # Sem plano legível o próximo pedido sobe de modelo
+            if self._tiers is not None and not self.last_plan_tasks:
+                from model_tiers import STRONG  # já carregado junto com o TieredClient
+
+                self._escalate_next = self.last_tier != STRONG
+
+            reply = strip_json_plan(full) if structured else full
 
             # Atualiza histórico interno
             self.history.append({"role": "user", "content": user_message})
-            self.history.append({"role": "assistant", "content": full})
+            self.history.append({"role": "assistant", "content": reply})
 
             if on_final is not None:
-                on_final(full)
+                on_final(reply)
 
     def clear_history(self) -> None:
         """Limpa a memória de curto prazo do agente."""
@@ -451,4 +1619,9 @@ class DailyOpsRunner:
         # aqui garante que nas próximas chamadas o prompt seja 'limpo'.
 
     async def close(self) -> None:
-        await self._model_client.close()
+        if self._task_unsubscribe is not None:
+            self._task_unsubscribe()
+            self._task_unsubscribe = None
+        for client in self._owned_clients:
+            await client.close()
+        self._owned_clients = []
@@ -1,25 +1,64 @@
 import asyncio
+import importlib
 import queue
+import sqlite3
 import threading
+import time
 import tkinter as tk
 from dataclasses import dataclass
 from pathlib import Path
 from tkinter import filedialog, messagebox
 
-from gcal_sync import sync_ops_plan
-
 from day_ops_core import (
     DailyOpsRunner,
     DailyOpsConfig,
     DatabaseManager,
     TaskStore,
     TaskItem,
+    TaskEvent,
+    TaskRepository,
+    TASK_ADDED,
+    TASK_REMOVED,
+    TASK_UPDATED,
     DistractionStore,
     ChatStore,
+    PlanStore,
+    SearchStore,
+    StaleTaskError,
+    TaskChangeFeed,
+    VaultRetention,
     check_identity_overload,
+    current_plan,
+    schedule_day,
+)
+from ops_plan_parser import format_plan, parse_ops_plan
+
+# Fora do caminho de partida: importados no primeiro uso e pré-carregados
+# em background depois do primeiro frame (ver startup_bench.py)
+HEAVY_MODULES = (
+    "autogen_agentchat.agents",
+    "autogen_ext.models.openai",
+    "usage_meter",
+    "model_tiers",
+    "gcal_sync",
 )
 
 
+# Dias mantidos no banco ativo; os anteriores vão para o arquivo
+RETENTION_DAYS = 90
+# Intervalo de checagem de mudanças feitas por outros clientes do vault
+CHANGE_POLL_MS = 1000
+
+
+def preload_heavy_modules() -> None:
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            # Dependência opcional ausente (ex.: libs do Google) só falha no uso
+            print(f"[*] Pré-carga de {name} falhou: {e}")
+
+
 # =========================================================
 # Tema cyberpunk (KISS)
 # =========================================================
@@ -45,7 +84,10 @@ class UIState:
 
 
 class DailyOpsUI:
-    def __init__(self, root: tk.Tk) -> None:
+    def __init__(self, root: tk.Tk, started_at: float | None = None) -> None:
+        # Partida em etapas: a casca da janela sai já; banco, tarefas, histórico e
+        # modelo carregam em background e vão preenchendo a UI
+        self._boot_t0 = started_at if started_at is not None else time.perf_counter()
         self.root = root
         self.root.title("OPS_AGENT // Daily Control Panel")
         self.root.geometry("1200x720")
@@ -55,33 +97,126 @@ class DailyOpsUI:
         self.state = UIState(vault_dir=Path.home() / ".ops_agent")
         self.state.vault_dir.mkdir(parents=True, exist_ok=True)
 
-        # 2. Inicialização do Banco e Stores
-        self.db_manager = DatabaseManager(self.state.vault_dir)
-        self.store = TaskStore(self.db_manager)
-        self.distraction_store = DistractionStore(self.db_manager)
-        self.chat_store = ChatStore(self.db_manager)
-
-        # 3. Carregar Estado
-        chat_history = self.chat_store.load()
-        self.tasks = self.store.load_today()
-
-        # Recupera o último plano do histórico para permitir sync imediato
+        # 2. Estado vazio até a carga em background (stores criadas na etapa de tarefas)
+        self.tasks = TaskRepository()
+        self.plan_tasks = []
         self.last_agent_output = ""
-        for msg in reversed(chat_history):
-            if msg.get("role") == "assistant":
-                self.last_agent_output = msg.get("content", "")
-                break
 
-        # 4. Runner da IA
-        self.runner = DailyOpsRunner(DailyOpsConfig(model="gpt-4o-mini"), history=chat_history)
+        # 3. Runner da IA: criado na última etapa da partida (ou no primeiro uso)
+        self._chat_history: list = []
+        self._runner: DailyOpsRunner | None = None
+        self._runner_lock = threading.Lock()
 
         self.ui_queue: "queue.Queue[tuple[str, str]]" = queue.Queue()
         self.selected_task: TaskItem | None = None
+        self._refresh_after_id: str | None = None
+        self.task_feed: TaskChangeFeed | None = None
+        self._overload_warned = False
+        # Controles que dependem das stores / do histórico; liberados por etapa
+        self._task_controls: list = []
+        self._chat_controls: list = []
         self._build_layout()
+        self._set_state(self._task_controls + self._chat_controls, "disabled")
 
+        # Lista e alerta de Q1 reagem aos eventos do repositório, sem reescanear a cada refresh
+        self.tasks.subscribe(self._on_task_event)
         self._refresh_task_list()
-        self._load_chat_history_to_ui(chat_history)
         self._ui_pump()
+        # after_idle → after(0): roda depois dos handlers de desenho, já com a janela na tela
+        self.root.after_idle(lambda: self.root.after(0, self._on_first_frame))
+
+    @property
+    def runner(self) -> DailyOpsRunner:
+        with self._runner_lock:
+            if self._runner is None:
+                self._runner = DailyOpsRunner(
+                    DailyOpsConfig(model="gpt-4o-mini", structured_plan=True), history=self._chat_history
+                )
+            return self._runner
+
+    # ---------------- Boot ----------------
+    def _boot_ms(self) -> float:
+        return (time.perf_counter() - self._boot_t0) * 1000
+
+    def _set_state(self, widgets: list, state: str) -> None:
+        for widget in widgets:
+            widget.config(state=state)
+
+    def _on_first_frame(self) -> None:
+        ms = self._boot_ms()
+        print(f"[BOOT] primeiro frame interativo em {ms:.0f} ms")
+        self._log("SYSTEM", f"[BOOT] primeiro frame interativo em {ms:.0f} ms. Carregando tarefas e histórico...")
+        threading.Thread(target=self._boot_worker, daemon=True).start()
+
+    def _boot_worker(self) -> None:
+        try:
+            # Etapa 1: banco e tarefas do dia (inclui o rollover na virada)
+            db_manager, stores, feed = self._open_vault(self.state.vault_dir)
+            tasks = stores[0].load_today()
+            self.root.after(0, lambda: self._boot_tasks_ready(db_manager, stores, feed, tasks))
+
+            # Etapa 2: plano vigente e histórico do chat
+            chat_store, plan_store = stores[2], stores[3]
+            chat_history = chat_store.load()
+            plan_tasks, last_output = current_plan(chat_store, plan_store, chat_history)
+            self._chat_history = chat_history
+            self.root.after(0, lambda: self._boot_chat_ready(chat_history, plan_tasks, last_output))
+        except Exception as e:
+            err = str(e)
+            self.root.after(0, lambda: self._log("SYSTEM", f"[BOOT] Falha ao carregar o vault: {err}"))
+            return
+
+        # Etapa 3: módulos pesados e cliente de modelo
+        preload_heavy_modules()
+        try:
+            self.runner
+        except Exception as e:
+            err = str(e)
+            self.root.after(0, lambda: self._log("SYSTEM", f"Runner da IA indisponível: {err}"))
+            return
+        self.root.after(0, lambda: self._log("SYSTEM", f"[BOOT] modelo pronto em {self._boot_ms():.0f} ms"))
+
+        # Etapa 4: retenção (arquivo + incremental vacuum), fora do caminho interativo
+        try:
+            summary = VaultRetention(db_manager, horizon_days=RETENTION_DAYS).run()
+        except sqlite3.Error as e:
+            summary = f"Retenção adiada: {e}"
+        if summary:
+            self.root.after(0, lambda: self._log("SYSTEM", summary))
+
+    @staticmethod
+    def _open_vault(vault_dir: Path) -> tuple:
+        db_manager = DatabaseManager(vault_dir)
+        stores = (
+            TaskStore(db_manager),
+            DistractionStore(db_manager),
+            ChatStore(db_manager),
+            PlanStore(db_manager),
+        )
+        # Feed criado antes do load_today: mudanças de outros clientes durante a carga não se perdem
+        return db_manager, stores, TaskChangeFeed(db_manager, stores[0])
+
+    def _use_vault(self, db_manager: DatabaseManager, stores: tuple, feed: TaskChangeFeed, tasks: list) -> None:
+        if self.task_feed is not None:
+            self.task_feed.close()
+        self.db_manager = db_manager
+        self.store, self.distraction_store, self.chat_store, self.plan_store = stores
+        self.search_store = SearchStore(db_manager)
+        self.task_feed = feed
+        self.tasks.reset(tasks)  # o evento redesenha a lista e confere o Q1
+
+    def _boot_tasks_ready(self, db_manager: DatabaseManager, stores: tuple, feed: TaskChangeFeed, tasks: list) -> None:
+        self._use_vault(db_manager, stores, feed, tasks)
+        self._set_state(self._task_controls, "normal")
+        self._log("SYSTEM", f"[BOOT] {len(tasks)} tarefas em {self._boot_ms():.0f} ms")
+        self.root.after(CHANGE_POLL_MS, self._poll_task_changes)
+
+    def _boot_chat_ready(self, chat_history: list, plan_tasks: list, last_output: str) -> None:
+        self.plan_tasks = plan_tasks
+        self.last_agent_output = last_output
+        self._load_chat_history_to_ui(chat_history)
+        self._set_state(self._chat_controls, "normal")
+        self._log("SYSTEM", f"[BOOT] histórico ({len(chat_history)} mensagens) em {self._boot_ms():.0f} ms")
 
 
     # ---------------- UI Layout ----------------
@@ -112,7 +247,7 @@ class DailyOpsUI:
         )
         self.sync_btn.pack(side="right", padx=(0, 8))
                 
-        tk.Button(
+        vault_btn = tk.Button(
             top,
             text="Selecionar Vault",
             command=self._select_vault,
@@ -122,7 +257,34 @@ class DailyOpsUI:
             activeforeground=THEME["bg"],
             relief="flat",
             font=THEME["font"],
-        ).pack(side="right")
+        )
+        vault_btn.pack(side="right")
+
+        # Busca no vault (tarefas, chat e distrações de todos os dias)
+        search_btn = tk.Button(
+            top,
+            text="Buscar",
+            command=self._search,
+            bg=THEME["panel2"],
+            fg=THEME["text"],
+            activebackground=THEME["neon"],
+            activeforeground=THEME["bg"],
+            relief="flat",
+            font=THEME["font"],
+        )
+        search_btn.pack(side="right", padx=(4, 12))
+        self.search_entry = tk.Entry(
+            top,
+            bg=THEME["panel2"],
+            fg=THEME["text"],
+            insertbackground=THEME["neon"],
+            font=THEME["font"],
+            relief="flat",
+            width=24,
+        )
+        self.search_entry.pack(side="right")
+        self.search_entry.bind("<Return>", lambda e: self._search())
+        self._task_controls += [self.sync_btn, vault_btn, self.search_entry, search_btn]
 
         main = tk.Frame(self.root, bg=THEME["bg"])
         main.pack(fill="both", expand=True, padx=10, pady=10)
@@ -193,7 +355,7 @@ class DailyOpsUI:
         self.quick_entry.pack(side="left", fill="x", expand=True, padx=(0, 2))
         self.quick_entry.bind("<Return>", lambda e: self._quick_add())
 
-        tk.Button(
+        quick_add_btn = tk.Button(
             row1,
             text="+",
             command=self._quick_add,
@@ -202,7 +364,9 @@ class DailyOpsUI:
             relief="flat",
             font=THEME["font_big"],
             padx=12,
-        ).pack(side="right", padx=2)
+        )
+        quick_add_btn.pack(side="right", padx=2)
+        self._task_controls += [self.quick_entry, quick_add_btn]
 
         # Linha 2: Notas, Quadrante, Período e Recorrência
         row2 = tk.Frame(quick_add_container, bg=THEME["panel2"])
@@ -257,11 +421,16 @@ class DailyOpsUI:
         btns = tk.Frame(left, bg=THEME["panel"])
         btns.pack(fill="x", padx=10, pady=(0, 10))
 
-        self._btn(btns, "Add", self._add_task).pack(side="left")
-        self._btn(btns, "Edit", self._edit_task).pack(side="left", padx=6)
-        self._btn(btns, "Done", self._mark_done).pack(side="left", padx=6)
-        self._btn(btns, "Delete", self._delete_task).pack(side="left", padx=6)
-        self._btn(btns, "Dominó!", self._capture_distraction).pack(side="left", padx=6)
+        for label, cmd in (
+            ("Add", self._add_task),
+            ("Edit", self._edit_task),
+            ("Done", self._mark_done),
+            ("Delete", self._delete_task),
+            ("Dominó!", self._capture_distraction),
+        ):
+            b = self._btn(btns, label, cmd)
+            b.pack(side="left", padx=0 if label == "Add" else 6)
+            self._task_controls.append(b)
 
         # LEGENDA DOS CHECKBOXES
         legend_frame = tk.Frame(left, bg=THEME["panel"], pady=5)
@@ -303,18 +472,19 @@ class DailyOpsUI:
         quick = tk.Frame(right, bg=THEME["panel"])
         quick.pack(fill="x", padx=10, pady=(0, 6))
 
-        self._btn(quick, "Planejar meu dia", lambda: self._send("Planeje meu dia com base nas tarefas.")).pack(
-            side="left"
-        )
-        self._btn(quick, "Próxima ação", lambda: self._send("Qual a próxima ação mais inteligente agora?")).pack(
-            side="left", padx=6
-        )
-        self._btn(quick, "Reduzir escopo", lambda: self._send("Estou sobrecarregado. Reduza para o mínimo viável."))\
-            .pack(side="left", padx=6)
-        self._btn(quick, "Desligamento", self._shut_down_ritual).pack(side="left", padx=6)
-        
-        # NOVO BOTÃO: Limpar Chat
-        self._btn(quick, "Limpar Chat", self._clear_chat_ui).pack(side="left", padx=6)
+        for label, cmd in (
+            ("Planejar meu dia", lambda: self._send("Planeje meu dia com base nas tarefas.")),
+            ("Próxima ação", lambda: self._send("Qual a próxima ação mais inteligente agora?")),
+            ("Reduzir escopo", lambda: self._send("Estou sobrecarregado. Reduza para o mínimo viável.")),
+            ("Plano local", self._local_plan),
+            ("Relatório", self._productivity_report),
+            ("Desligamento", self._shut_down_ritual),
+            # NOVO BOTÃO: Limpar Chat
+            ("Limpar Chat", self._clear_chat_ui),
+        ):
+            b = self._btn(quick, label, cmd)
+            b.pack(side="left", padx=0 if label == "Planejar meu dia" else 6)
+            self._chat_controls.append(b)
 
         bottom = tk.Frame(right, bg=THEME["panel"])
         bottom.pack(fill="x", padx=10, pady=(0, 10))
@@ -343,6 +513,7 @@ class DailyOpsUI:
             width=10,
         )
         self.send_btn.pack(side="right")
+        self._chat_controls += [self.entry, self.send_btn]
 
         self._log("SYSTEM", "OPS_AGENT online. Adicione tarefas e mande mensagens.")
 
@@ -392,14 +563,67 @@ class DailyOpsUI:
         if not folder:
             return
         self.state.vault_dir = Path(folder)
-        self.store = TaskStore(self.state.vault_dir)
-        self.tasks = self.store.load_today()
+        db_manager, stores, feed = self._open_vault(self.state.vault_dir)
+        self._use_vault(db_manager, stores, feed, stores[0].load_today())
         self.vault_label.config(text=f"Vault: {self.state.vault_dir}")
-        self._refresh_task_list()
         self._log("SYSTEM", f"Vault alterado para: {self.state.vault_dir}")
 
     # ---------------- Tasks ----------------
+    def _on_task_event(self, event: TaskEvent) -> None:
+        # Seleção removida ou substituída (exclusão remota, recarga, troca de vault) deixa de valer
+        if self.selected_task is not None and self.tasks.get(self.selected_task.id) is not self.selected_task:
+            self.selected_task = None
+        if not event.remote:
+            self._persist_task_event(event)
+        # Delay pequeno agrupa mutações seguidas e deixa o usuário ver o check antes de redesenhar
+        if self._refresh_after_id is None:
+            self._refresh_after_id = self.root.after(100, self._refresh_task_list)
+        if event.kind != TASK_UPDATED or {"quadrant", "status"} & set(event.changes):
+            self._check_overload()
+
+    def _persist_task_event(self, event: TaskEvent) -> None:
+        """Grava só a linha alterada; conflito com outro cliente recarrega a versão do banco."""
+        try:
+            if event.kind == TASK_ADDED:
+                self.store.insert(event.task)
+            elif event.kind == TASK_UPDATED:
+                self.store.update(event.task)
+            elif event.kind == TASK_REMOVED:
+                self.store.delete(event.task)
+        except StaleTaskError as e:
+            task_id = e.task_id
+            self._log("SYSTEM", f"{e} Recarregando a versão atual.")
+            self.root.after(0, lambda: self._reload_tasks([task_id]))
+
+    def _reload_tasks(self, task_ids: list) -> None:
+        current = self.store.fetch(task_ids)
+        for task_id in task_ids:
+            if task_id in current:
+                # A versão do banco é mais nova que a local: a edição local é descartada
+                self.tasks.merge(current[task_id])
+            elif self.tasks.get(task_id) is not None:
+                self.tasks.remove(self.tasks.get(task_id), remote=True)
+
+    def _poll_task_changes(self) -> None:
+        try:
+            for change in self.task_feed.poll():
+                local = self.tasks.get(change.task_id)
+                if change.task is not None:
+                    self.tasks.merge(change.task)
+                elif local is not None:
+                    self.tasks.remove(local, remote=True)
+        except sqlite3.Error as e:
+            print(f"[*] Falha ao checar mudanças do vault: {e}")
+        self.root.after(CHANGE_POLL_MS, self._poll_task_changes)
+
+    def _check_overload(self) -> None:
+        warning = check_identity_overload(self.tasks)
+        if warning and not self._overload_warned:
+            self._log("SYSTEM", warning)
+        self._overload_warned = bool(warning)
+
     def _refresh_task_list(self) -> None:
+        self._refresh_after_id = None
         # Limpa o frame atual
         for widget in self.task_inner_frame.winfo_children():
             widget.destroy()
@@ -407,14 +631,8 @@ class DailyOpsUI:
         # IMPORTANTE: Guardar as variáveis para evitar Garbage Collection
         self.check_vars = []
 
-        # Ordenação: Ativas primeiro, depois por quadrante
-        quadrant_order = {"Q1": 0, "Q2": 1, "Q3": 2, "Q4": 3}
-        sorted_tasks = sorted(
-            self.tasks,
-            key=lambda t: (t.status == "DONE", quadrant_order.get(t.quadrant, 9))
-        )
-
-        for task in sorted_tasks:
+        # Ordenação: pendentes primeiro, depois por quadrante (visão em cache do repositório)
+        for task in self.tasks.sorted():
             row = tk.Frame(self.task_inner_frame, bg=THEME["panel2"], pady=2)
             row.pack(fill="x", expand=True)
 
@@ -467,39 +685,24 @@ class DailyOpsUI:
         self.task_inner_frame.update_idletasks()
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
 
-        warning = check_identity_overload(self.tasks)
-        if warning:
-            self._log("SYSTEM", warning)
-
     def _toggle_active(self, task: TaskItem, var: tk.BooleanVar):
-        task.active = var.get()
+        changes = {"active": var.get()}
         # Se eu ativo uma tarefa que estava concluída, mudo o status dela para TODO
-        if task.active and task.status == "DONE":
-            task.status = "TODO"
-        
-        self.store.save_today(self.tasks)
-        # Delay pequeno para o usuário ver o check antes de atualizar a lista toda
-        self.root.after(100, self._refresh_task_list)
+        if changes["active"] and task.status == "DONE":
+            changes["status"] = "TODO"
+
+        self.tasks.update(task, **changes)
 
     def _toggle_done(self, task: TaskItem, var: tk.BooleanVar):
         val = var.get()
-        task.status = "DONE" if val else "TODO"
-        
-        # Se marquei como DONE, desativo do planejamento automaticamente
-        if val:
-            task.active = False
-        else:
-            # Se desmarquei o DONE, ativo para o planejamento
-            task.active = True
-            
-        self.store.save_today(self.tasks)
-        self.root.after(100, self._refresh_task_list)
+        # Se marquei como DONE, desativo do planejamento automaticamente;
+        # se desmarquei o DONE, ativo para o planejamento
+        self.tasks.update(task, status="DONE" if val else "TODO", active=not val)
 
     def _select_task_for_edit(self, task: TaskItem):
         # Como não temos mais o Listbox, usamos o clique no texto para abrir o editor
         self.selected_task = task
-        idx = self.tasks.index(task)
-        self._task_editor(title="Editar tarefa", task=task, index=idx)
+        self._task_editor(title="Editar tarefa", task=task)
 
     def _add_task(self) -> None:
         self._task_editor(title="Nova tarefa")
@@ -508,26 +711,20 @@ class DailyOpsUI:
         if not self.selected_task:
             messagebox.showinfo("Ops", "Clique em uma tarefa para selecioná-la e depois em 'Edit'.")
             return
-        idx = self.tasks.index(self.selected_task)
-        self._task_editor(title="Editar tarefa", task=self.selected_task, index=idx)
+        self._task_editor(title="Editar tarefa", task=self.selected_task)
 
     def _delete_task(self) -> None:
         if not self.selected_task:
             messagebox.showinfo("Ops", "Clique em uma tarefa para selecioná-la e depois em 'Delete'.")
             return
         self.tasks.remove(self.selected_task)
-        self.store.save_today(self.tasks)
         self.selected_task = None
-        self._refresh_task_list()
 
     def _mark_done(self) -> None:
         if not self.selected_task:
             messagebox.showinfo("Ops", "Clique em uma tarefa para selecioná-la e depois em 'Done'.")
             return
-        self.selected_task.status = "DONE"
-        self.selected_task.active = False
-        self.store.save_today(self.tasks)
-        self._refresh_task_list()
+        self.tasks.update(self.selected_task, status="DONE", active=False)
 
     def _quick_add(self) -> None:
         """Adição rápida de tarefas sem abrir popups."""
@@ -553,9 +750,7 @@ class DailyOpsUI:
             is_recurring=is_recurring
         )
         
-        self.tasks.append(new_task)
-        self.store.save_today(self.tasks)
-        self._refresh_task_list()
+        self.tasks.add(new_task)
 
         # Limpeza e Reset
         self.quick_entry.delete(0, "end")
@@ -564,6 +759,40 @@ class DailyOpsUI:
         self.quick_recur_var.set(False)
         self.quick_entry.focus_set()
 
+    # --- Busca no vault ---
+    def _search(self) -> None:
+        query = self.search_entry.get().strip()
+        if not query:
+            return
+        try:
+            hits = self.search_store.search(query)
+        except Exception as e:
+            messagebox.showerror("Busca", str(e))
+            return
+
+        win = tk.Toplevel(self.root)
+        win.title(f"Busca // {query}")
+        win.configure(bg=THEME["panel"])
+        win.geometry("640x420")
+
+        txt_area = tk.Text(
+            win,
+            bg=THEME["panel2"],
+            fg=THEME["text"],
+            font=THEME["font"],
+            wrap="word",
+            relief="flat",
+        )
+        txt_area.pack(fill="both", expand=True, padx=10, pady=10)
+
+        labels = {"task": "TAREFA", "chat": "CHAT", "distraction": "DISTRAÇÃO"}
+        if not hits:
+            txt_area.insert("end", "Nada encontrado.\n")
+        for hit in hits:
+            snippet = " ".join(hit.snippet.split())
+            txt_area.insert("end", f"{hit.day_date}  [{labels.get(hit.source, hit.source)}] {snippet}\n")
+        txt_area.configure(state="disabled")
+
     # --- Dominó Mental: captura de distrações ---
     def _capture_distraction(self) -> None:
         win = tk.Toplevel(self.root)
@@ -657,7 +886,7 @@ class DailyOpsUI:
             font=THEME["font_big"],
         ).pack(pady=10)
 
-    def _task_editor(self, title: str, task: TaskItem | None = None, index: int | None = None) -> None:
+    def _task_editor(self, title: str, task: TaskItem | None = None) -> None:
         win = tk.Toplevel(self.root)
         win.title(title)
         win.configure(bg=THEME["panel"])
@@ -749,15 +978,23 @@ class DailyOpsUI:
                 return
 
             if task:
-                # Editando existente
-                task.title = t_val
-                task.notes = e_notes.get().strip()
-                task.quadrant = q_var.get()
-                task.period = p_var.get()
-                task.is_recurring = r_var.get()
+                # Editando existente: busca pelo id (a tarefa pode ter sido recarregada ou removida com o editor aberto)
+                current = self.tasks.get(task.id)
+                if current is None:
+                    self._log("SYSTEM", f"'{task.title}' foi removida em outro cliente; edição descartada.")
+                    win.destroy()
+                    return
+                self.tasks.update(
+                    current,
+                    title=t_val,
+                    notes=e_notes.get().strip(),
+                    quadrant=q_var.get(),
+                    period=p_var.get(),
+                    is_recurring=r_var.get(),
+                )
             else:
                 # Nova tarefa
-                self.tasks.append(
+                self.tasks.add(
                     TaskItem.create(
                         title=t_val,
                         notes=e_notes.get().strip(),
@@ -767,8 +1004,6 @@ class DailyOpsUI:
                     )
                 )
 
-            self.store.save_today(self.tasks)
-            self._refresh_task_list()
             win.destroy()
 
         tk.Button(
@@ -804,7 +1039,14 @@ class DailyOpsUI:
 
         def on_final(full: str):
             # Salva histórico assim que o agente terminar de responder
-            self.chat_store.save(self.runner.history)
+            message_ids = self.chat_store.save(self.runner.history)
+            # Resposta sem plano (ex.: só uma dúvida) mantém a versão vigente
+            if self.runner.last_plan_tasks:
+                self.plan_store.save_version(self.runner.last_plan_tasks, message_ids[-1] if message_ids else None)
+                self.plan_tasks = list(self.runner.last_plan_tasks)
+                diff = self.plan_store.diff_latest()
+                if diff is not None and not diff.empty:
+                    self.ui_queue.put(("plan_diff", diff.summary()))
             self.ui_queue.put(("final", full))
 
         self.ui_queue.put(("begin", ""))
@@ -816,6 +1058,7 @@ class DailyOpsUI:
             on_chunk=on_chunk,           # Passando explicitamente
             last_plan=self.last_agent_output,  # Agora o plano anterior vai no prompt
             on_final=on_final,
+            plan_tasks=self.plan_tasks,
         )
 
     def _clear_chat_ui(self) -> None:
@@ -845,6 +1088,8 @@ class DailyOpsUI:
                     self.chat.insert("end", payload)
                     self.chat.see("end")
                     self.chat.configure(state="disabled")
+                elif kind == "plan_diff":
+                    self._log("SYSTEM", f"Plano atualizado ({payload} blocos).")
                 elif kind == "final":
                     self.last_agent_output = payload
                     self.send_btn.config(state="normal")
@@ -854,28 +1099,51 @@ class DailyOpsUI:
             pass
         self.root.after(30, self._ui_pump)
 
+    def _local_plan(self) -> None:
+        """Recalcula o cronograma localmente (sem modelo) e grava como nova versão do plano."""
+        result = schedule_day(self.tasks)
+        if not result.plan:
+            self._log("SYSTEM", "Nenhuma tarefa ativa pendente para agendar.")
+            return
+        self.plan_store.save_version(result.plan)
+        self.plan_tasks = result.plan
+        msg = format_plan(result.plan)
+        if result.overflow:
+            msg += f"\n(fora do dia: {', '.join(t.title for t in result.overflow)})"
+        self._log("SYSTEM", msg)
+
+    def _productivity_report(self) -> None:
+        """Métricas do histórico inteiro do vault (NumPy, carregado só aqui)."""
+        def worker() -> None:
+            try:
+                from ops_analytics import productivity_report
+
+                report = productivity_report(self.db_manager)
+            except Exception as e:
+                report = f"Relatório indisponível: {e}"
+            self.root.after(0, lambda: self._log("SYSTEM", report))
+
+        self._log("SYSTEM", "Analisando o histórico do vault...")
+        threading.Thread(target=worker, daemon=True).start()
+
     def _sync_gcal(self) -> None:
         self.sync_btn.config(state="disabled")
-        
-        if not self.last_agent_output.strip():
+
+        # Sem versão salva (ex.: resposta anterior ao PlanStore), tenta o texto da última resposta
+        plan = list(self.plan_tasks) or parse_ops_plan(self.last_agent_output)
+        if not plan:
             self._log("SYSTEM", "Nenhum plano na memória. Gere um plano ou envie uma mensagem.")
             self.sync_btn.config(state="normal")
             return
 
         def worker():
             try:
-                from ops_plan_parser import parse_ops_plan
-                # Teste prévio do parser
-                preview = parse_ops_plan(self.last_agent_output)
-                if not preview:
-                    self._log("SYSTEM", "Falha: O parser não encontrou linhas de horário no formato '- HH:MM–HH:MM'.")
-                    self.root.after(0, lambda: self.sync_btn.config(state="normal"))
-                    return
+                self._log("SYSTEM", f"Sincronizando {len(plan)} tarefas com GCal...")
 
-                self._log("SYSTEM", f"Sincronizando {len(preview)} tarefas com GCal...")
-                
-                result = sync_ops_plan(
-                    raw_text=self.last_agent_output,
+                from gcal_sync import sync_plan_tasks
+
+                result = sync_plan_tasks(
+                    tasks=plan,
                     vault_dir=self.state.vault_dir,
                 )
 
@@ -900,8 +1168,9 @@ class DailyOpsUI:
 
 
 def main():
+    started_at = time.perf_counter()
     root = tk.Tk()
-    app = DailyOpsUI(root)
+    app = DailyOpsUI(root, started_at=started_at)
     root.mainloop()
 
 
@@ -0,0 +1,175 @@
+"""
+Benchmark roteirizado do dev team: chamadas de modelo, tokens e mensagens por missão.
+
+Cada agente de modelo recebe um cliente roteirizado (respostas fixas, sem
+rede) e o tester usa o executor local, então mede só a orquestração:
+terminação e roteamento. Uso: python dev_team_bench.py
+"""
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_core.models import CreateResult, RequestUsage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from dev_team_core import PLANNER_SYSTEM, CODER_SYSTEM, REVIEWER_SYSTEM, AgentSet, DevTeamConfig, DevTeamRunner
+from dev_team_routing import ROUND_ROBIN, SELECTOR
+from dev_team_runtime import DevTeamRuntime
+from executor_pool import ExecutorPool
+from usage_meter import DelegatingChatCompletionClient, MeteredChatCompletionClient, UsageMeter
+
+PLAN = "1. Criar o módulo. 2. Executar os testes."
+FAILING_CODE = "```sh\npython3 -c 'import modulo_inexistente'\n```"
+FIXED_CODE = "```sh\nmkdir -p \"app\" && cat <<'EOF' > \"app/main.py\"\nprint('ok')\nEOF\npython3 app/main.py\n```"
+PASSING_CODE = (
+    "```sh\n"
+    "mkdir -p \"app\" && cat <<'EOF' > \"app/test_soma.py\"\n"
+    "import unittest\n\n"
+    "class T(unittest.TestCase):\n"
+    "    def test_soma(self):\n"
+    "        self.assertEqual(1 + 1, 2)\n"
+    "EOF\n"
+    "cd app && python3 -m unittest -v\n"
+    "```"
+)
+FIX_REQUEST = "A execução falhou. CODER, corrija."
+APPROVAL = "Arquivos conferidos. AUTOGEN_OK_9F1C"
+
+# (texto da última mensagem, nº da chamada deste agente) → resposta
+Respond = Callable[[str, int], str]
+
+
+def _execution_ok(last: str) -> bool:
+    return "exit code" not in last.lower() and "BLOQUEADO" not in last
+
+
+def _reviewer(last: str, n: int) -> str:
+    return APPROVAL if _execution_ok(last) else FIX_REQUEST
+
+
+SCENARIOS: Dict[str, Dict[str, Respond]] = {
+    # O coder repete o mesmo erro: sem terminação adaptativa vai até max_messages
+    "erro_repetido": {
+        "planner": lambda last, n: PLAN,
+        "coder": lambda last, n: FAILING_CODE,
+        "reviewer": _reviewer,
+    },
+    # Falha uma vez e corrige: o round-robin replaneja e revisa a falha antes da correção
+    "erro_e_correcao": {
+        "planner": lambda last, n: PLAN,
+        "coder": lambda last, n: FAILING_CODE if n == 0 else FIXED_CODE,
+        "reviewer": _reviewer,
+    },
+    # A suíte passa na primeira execução
+    "testes_passam": {
+        "planner": lambda last, n: PLAN,
+        "coder": lambda last, n: PASSING_CODE,
+        "reviewer": _reviewer,
+    },
+}
+
+MODES: Dict[str, DevTeamConfig] = {
+    "baseline": DevTeamConfig(use_docker=False, routing=ROUND_ROBIN, max_stalled_turns=0, stop_on_tests_pass=False),
+    "adaptive": DevTeamConfig(use_docker=False, routing=ROUND_ROBIN),
+    "selector": DevTeamConfig(use_docker=False, routing=SELECTOR),
+}
+
+
+class ScriptedClient(DelegatingChatCompletionClient):
+    """Cliente de modelo que responde por roteiro; tokens estimados por tamanho de texto."""
+
+    def __init__(self, respond: Respond) -> None:
+        super().__init__(ReplayChatCompletionClient(["-"]))  # model_info/capabilities
+        self._respond = respond
+        self.calls = 0
+
+    async def create(self, messages, *args, **kwargs):
+        last = str(getattr(messages[-1], "content", "")) if messages else ""
+        text = self._respond(last, self.calls)
+        self.calls += 1
+        prompt_chars = sum(len(str(getattr(m, "content", ""))) for m in messages)
+        return CreateResult(
+            finish_reason="stop",
+            content=text,
+            usage=RequestUsage(prompt_tokens=prompt_chars // 4, completion_tokens=len(text) // 4),
+            cached=False,
+        )
+
+
+class _ScriptedRuntime(DevTeamRuntime):
+    def __init__(self, scenario: Dict[str, Respond], **kwargs) -> None:
+        super().__init__(client_factory=lambda model: ScriptedClient(lambda last, n: ""), **kwargs)
+        self._scenario = scenario
+
+    async def acquire_agents(self, model: str, fast_model: Optional[str] = None, fast_roles: Tuple[str, ...] = ()) -> AgentSet:
+        def client(role: str):
+            return MeteredChatCompletionClient(ScriptedClient(self._scenario[role]), self.meter, role, model="scripted")
+
+        return AgentSet(
+            model,
+            AssistantAgent("planner", client("planner"), system_message=PLANNER_SYSTEM),
+            AssistantAgent("coder", client("coder"), system_message=CODER_SYSTEM),
+            AssistantAgent("reviewer", client("reviewer"), system_message=REVIEWER_SYSTEM),
+        )
+
+
+@dataclass
+class BenchResult:
+    scenario: str
+    mode: str
+    model_calls: int
+    tokens: int
+    messages: int
+    stop_reason: str
+    seconds: float
+
+
+def run_scenario(name: str, config: DevTeamConfig, mode: str) -> BenchResult:
+    with tempfile.TemporaryDirectory(prefix="dev_team_bench_") as tmp:
+        meter = UsageMeter(Path(tmp) / "usage.db")
+        workspace = Path(tmp) / "workspace"
+        workspace.mkdir()
+        runtime = _ScriptedRuntime(SCENARIOS[name], executor_pool=ExecutorPool(), meter=meter).start()
+        logs: List[str] = []
+        runner = DevTeamRunner(config, logs.append, runtime=runtime)
+        t0 = time.perf_counter()
+        try:
+            runtime.submit(runner.run(f"bench {name}", workspace)).result()
+        finally:
+            runtime.shutdown()
+        elapsed = time.perf_counter() - t0
+
+        run_id = next(iter(meter.summary()["per_run"]), "")
+        usage = meter.run_usage(run_id)
+        stop = next((l[len("[STOP] "):] for l in logs if l.startswith("[STOP] ")), "")
+        return BenchResult(
+            scenario=name,
+            mode=mode,
+            model_calls=usage["calls"],
+            tokens=usage["prompt_tokens"] + usage["completion_tokens"],
+            messages=sum(meter.run_messages(run_id).values()),
+            stop_reason=stop,
+            seconds=elapsed,
+        )
+
+
+def main(max_messages: int = 20) -> List[BenchResult]:
+    results = []
+    for name in SCENARIOS:
+        for mode, config in MODES.items():
+            results.append(run_scenario(name, replace(config, max_messages=max_messages), mode))
+
+    print(f"{'cenário':<17}{'modo':<10}{'chamadas':>9}{'tokens':>8}{'msgs':>6}{'tempo':>8}  motivo")
+    for r in results:
+        print(
+            f"{r.scenario:<17}{r.mode:<10}{r.model_calls:>9}{r.tokens:>8}{r.messages:>6}"
+            f"{r.seconds:>7.1f}s  {r.stop_reason[:60]}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,57 @@
 import asyncio
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
 from autogen_agentchat.agents import AssistantAgent, CodeExecutorAgent
-from autogen_agentchat.teams import RoundRobinGroupChat
+from autogen_agentchat.base import Response, TaskResult
+from autogen_agentchat.messages import BaseChatMessage
+from autogen_agentchat.teams import RoundRobinGroupChat, SelectorGroupChat
 from autogen_agentchat.conditions import (
     TextMentionTermination,
     MaxMessageTermination,
     ExternalTermination,
+    TimeoutTermination,
+    TokenUsageTermination,
 )
 from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
-from autogen_ext.code_executors.local import LocalCommandLineCodeExecutor
+
+from dev_team_routing import ROUND_ROBIN, SELECTOR, make_selector
+from dev_team_termination import TESTS_PASSED, MissionProgress, NoProgressTermination, TestsPassedTermination
+from executor_pool import DEFAULT_DOCKER_IMAGE, ExecutorPool, get_executor_pool
+from model_tiers import TieredClient
+from mission_store import DONE, FAILED, STOPPED, MissionRecord, MissionStore, TranscriptEntry
+from file_materializer import FileMaterializer
+from shell_guard import DENY, ExecutionBudget, GuardedCodeExecutor, scan
+from usage_meter import MeteredChatCompletionClient, UsageMeter, get_usage_meter
+from workspace_index import WorkspaceIndex
+
+if TYPE_CHECKING:
+    from dev_team_runtime import DevTeamRuntime
 
 @dataclass(frozen=True)
 class DevTeamConfig:
     model: str = "gpt-4o"
     use_docker: bool = True
     max_messages: int = 20
+    docker_image: str = DEFAULT_DOCKER_IMAGE
+    budget: ExecutionBudget = ExecutionBudget()
+    # Terminação adaptativa (0/None desliga cada critério)
+    max_stalled_turns: int = 3             # turnos do tester sem progresso
+    max_tokens: Optional[int] = None       # orçamento de tokens por missão
+    max_wall_seconds: Optional[float] = None
+    stop_on_tests_pass: bool = True        # sucesso antecipado quando a suíte passa
+    # Roteamento: SELECTOR escolhe o próximo agente por regras locais; ROUND_ROBIN é o ciclo fixo
+    routing: str = SELECTOR
+    routing_model_fallback: bool = False   # casos ambíguos decididos pelo modelo
+    # Tiering: com fast_model, estes papéis rodam no modelo rápido e `model` fica para escalonamento
+    fast_model: Optional[str] = None
+    fast_roles: Tuple[str, ...] = ("planner", "coder", "reviewer")
 
 def safe_approval_func(code: str) -> bool:
-    code = (code or "").lower()
-    deny = ["rm -rf /", "mkfs", "format "]
-    return not any(p in code for p in deny)
+    return scan(code).verdict != DENY
 
 # Diretrizes focadas em SH (mais compatível com executores)
 ENGINEERING_DIRECTIVES = r"""
@@ -50,65 +78,389 @@ Se o código for executado sem erros, diga: 'EXECUÇÃO BEM SUCEDIDA'."""
 
 REVIEWER_SYSTEM = """Você é o REVIEWER. 
 Verifique se os arquivos foram criados e se o código está correto.
+Após cada execução o TESTER anexa um bloco 'ALTERAÇÕES NO WORKSPACE' com os arquivos
+criados (+), alterados (~) e removidos (-). Use esse resumo para confirmar os arquivos;
+não peça comandos cat/ls só para verificar se eles existem.
 Se estiver tudo ok, finalize com a palavra: AUTOGEN_OK_9F1C"""
 
-_AGENT_BUFFERS = {}
 
-def _format_stream_item(item) -> str:
-    if not hasattr(item, "content"): return ""
-    agent = getattr(item, "source", None) or getattr(item, "name", None) or "team"
-    text = item.content or ""
-    buf = _AGENT_BUFFERS.setdefault(agent, "")
-    buf += text
-    if text.endswith(("\n", "```")) or len(buf) > 300:
-        _AGENT_BUFFERS[agent] = ""
-        return f"\n=== {agent.upper()} ===\n{buf.strip()}\n"
-    _AGENT_BUFFERS[agent] = buf
-    return ""
+class WorkspaceAwareExecutorAgent(CodeExecutorAgent):
+    """Tester que anexa à própria resposta o diff do workspace causado pela execução."""
+
+    def __init__(self, *args, workspace_index: WorkspaceIndex, progress: Optional[MissionProgress] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._workspace_index = workspace_index
+        self._progress = progress
+
+    async def on_messages_stream(self, messages, cancellation_token):
+        async for item in super().on_messages_stream(messages, cancellation_token):
+            if isinstance(item, Response) and isinstance(getattr(item.chat_message, "content", None), str):
+                changes = await asyncio.to_thread(self._workspace_index.refresh)
+                if self._progress is not None:
+                    self._progress.record_turn(changes)
+                content = f"{item.chat_message.content}\n\n{changes.summary()}"
+                item = Response(
+                    chat_message=item.chat_message.model_copy(update={"content": content}),
+                    inner_messages=item.inner_messages,
+                )
+            yield item
+
+@dataclass(frozen=True)
+class LogRecord:
+    agent: str
+    timestamp: float
+    nbytes: int
+    text: str
+
+    def format(self) -> str:
+        return f"\n=== {self.agent.upper()} ===\n{self.text}\n"
+
+
+class StreamAggregator:
+    """
+    Agrega o stream de UMA run por agente e emite LogRecords completos.
+
+    Cada run tem o seu agregador (nada de estado global), então runs
+    concorrentes nunca misturam saída. O texto fica em listas de pedaços
+    (sem concatenação repetida) e é liberado em quebra de linha, fim de bloco
+    de código, limite de tamanho, troca de agente ou após `flush_interval`
+    segundos. close() garante a liberação final.
+    """
+
+    def __init__(self, on_record: Callable[[LogRecord], None], max_chars: int = 300, flush_interval: float = 1.0) -> None:
+        self._on_record = on_record
+        self._max_chars = max_chars
+        self._flush_interval = flush_interval
+        self._parts: Dict[str, List[str]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._since: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def feed(self, item) -> None:
+        if not hasattr(item, "content"): return
+        agent = getattr(item, "source", None) or getattr(item, "name", None) or "team"
+        text = item.content or ""
+        if not isinstance(text, str):
+            text = str(text)
+        if not text: return
+        with self._lock:
+            # Troca de agente: libera os outros antes para manter a ordem cronológica
+            for other in [a for a in self._parts if a != agent]:
+                self._flush_locked(other)
+            self._parts.setdefault(agent, []).append(text)
+            self._sizes[agent] = self._sizes.get(agent, 0) + len(text)
+            self._since.setdefault(agent, time.monotonic())
+            if text.endswith(("\n", "```")) or self._sizes[agent] > self._max_chars:
+                self._flush_locked(agent)
+
+    def flush_due(self) -> None:
+        """Libera buffers parados há mais de `flush_interval` segundos."""
+        cutoff = time.monotonic() - self._flush_interval
+        with self._lock:
+            for agent in [a for a, t in self._since.items() if t <= cutoff]:
+                self._flush_locked(agent)
+
+    def close(self) -> None:
+        with self._lock:
+            for agent in list(self._parts):
+                self._flush_locked(agent)
+
+    def _flush_locked(self, agent: str) -> None:
+        parts = self._parts.pop(agent, None)
+        self._sizes.pop(agent, None)
+        self._since.pop(agent, None)
+        if not parts: return
+        text = "".join(parts).strip()
+        if not text: return
+        self._on_record(LogRecord(agent, time.time(), len(text.encode("utf-8")), text))
+
+@dataclass
+class AgentSet:
+    """Agentes de modelo (planner/coder/reviewer) reaproveitados entre missões."""
+    model: str
+    planner: object
+    coder: object
+    reviewer: object
+    fast_model: str = ""
+    fast_roles: Tuple[str, ...] = ()
+    # Clientes em dois níveis por papel (vazio sem fast_model)
+    tiers: Dict[str, TieredClient] = field(default_factory=dict)
+
+    def all(self) -> List[object]:
+        return [self.planner, self.coder, self.reviewer]
+
+    def reset_tiers(self) -> None:
+        for tier in self.tiers.values():
+            tier.reset()
+
+
+def build_agents(
+    model_client,
+    meter: Optional[UsageMeter] = None,
+    model: str = "",
+    fast_client=None,
+    fast_model: str = "",
+    fast_roles: Tuple[str, ...] = (),
+) -> AgentSet:
+    """
+    Cria planner, coder e reviewer sobre um mesmo cliente de modelo.
+    Com `meter`, cada agente recebe um wrapper próprio que atribui a ele o consumo.
+    Com `fast_client`, os papéis em `fast_roles` usam o modelo rápido e só
+    escalam para `model_client` por gatilho (o plano inicial já sai no forte).
+    """
+    def metered(client, name: str, model_name: str):
+        if meter is None:
+            return client
+        return MeteredChatCompletionClient(client, meter, name, model=model_name)
+
+    tiers: Dict[str, TieredClient] = {}
+
+    def client_for(name: str):
+        strong = metered(model_client, name, model)
+        if fast_client is None or name not in fast_roles:
+            return strong
+        tiers[name] = TieredClient(
+            metered(fast_client, name, fast_model),
+            strong,
+            initial_strong_calls=1 if name == "planner" else 0,
+        )
+        return tiers[name]
+
+    planner = AssistantAgent("planner", client_for("planner"), system_message=PLANNER_SYSTEM)
+    coder = AssistantAgent("coder", client_for("coder"), system_message=CODER_SYSTEM)
+    reviewer = AssistantAgent("reviewer", client_for("reviewer"), system_message=REVIEWER_SYSTEM)
+    if fast_client is None:
+        return AgentSet(model, planner, coder, reviewer)
+    return AgentSet(model, planner, coder, reviewer, fast_model, tuple(fast_roles), tiers)
 
 class DevTeamRunner:
-    def __init__(self, config: DevTeamConfig, on_log: Callable[[str], None]) -> None:
+    def __init__(
+        self,
+        config: DevTeamConfig,
+        on_log: Callable[[str], None],
+        executor_pool: Optional[ExecutorPool] = None,
+        runtime: Optional["DevTeamRuntime"] = None,
+        on_record: Optional[Callable[[LogRecord], None]] = None,
+        meter: Optional[UsageMeter] = None,
+    ) -> None:
         self._config = config
         self._on_log = on_log
+        self._on_record = on_record
+        # Com runtime, cliente de modelo e agentes são reaproveitados entre missões
+        # (run() deve então ser agendado no loop do runtime: runtime.submit(runner.run(...)))
+        self._runtime = runtime
+        # Pool compartilhado entre runs: evita o cold start do container a cada missão
+        self._pool = executor_pool or (runtime.executor_pool if runtime else get_executor_pool())
+        self._meter = meter or (runtime.meter if runtime else get_usage_meter())
         self._external_stop = ExternalTermination()
         self._running = False
 
     def stop(self): self._external_stop.set()
 
+    def _emit(self, record: LogRecord) -> None:
+        if self._on_record is not None: self._on_record(record)
+        self._on_log(record.format())
+
+    @staticmethod
+    async def _flush_ticker(aggregator: StreamAggregator, interval: float = 0.5) -> None:
+        # Liberação por tempo mesmo quando o stream fica parado (modelo "pensando")
+        while True:
+            await asyncio.sleep(interval)
+            aggregator.flush_due()
+
     async def run(self, task: str, workspace: Path):
         if self._running: return
         self._running = True
-        
-        model_client = OpenAIChatCompletionClient(model=self._config.model)
+        try:
+            await self._run(task, workspace)
+        finally:
+            self._running = False
 
-        # Agentes
-        planner = AssistantAgent("planner", model_client, system_message=PLANNER_SYSTEM)
-        coder = AssistantAgent("coder", model_client, system_message=CODER_SYSTEM)
-        
-        # Executor
-        if self._config.use_docker:
-            executor = DockerCommandLineCodeExecutor(work_dir=str(workspace), bind_dir=str(workspace))
-            await executor.start()
+    async def resume(self, workspace: Path, mission_id: Optional[str] = None):
+        """Retoma a última missão interrompida do workspace (ou `mission_id`) a partir do estado salvo."""
+        if self._running: return
+        self._running = True
+        try:
+            store = MissionStore(workspace)
+            record = store.get(mission_id) if mission_id else store.latest_resumable()
+            if record is None:
+                self._on_log("[RESUME] Nenhuma missão interrompida neste workspace.")
+                return
+            await self._run(record.task, workspace, resume_from=record)
+        finally:
+            self._running = False
+
+    def _termination(self, progress: MissionProgress):
+        cfg = self._config
+        termination = TextMentionTermination("AUTOGEN_OK_9F1C") | MaxMessageTermination(cfg.max_messages) | self._external_stop
+        if cfg.max_stalled_turns:
+            termination = termination | NoProgressTermination(progress, cfg.max_stalled_turns)
+        if cfg.stop_on_tests_pass:
+            termination = termination | TestsPassedTermination(progress)
+        if cfg.max_tokens:
+            termination = termination | TokenUsageTermination(max_total_token=cfg.max_tokens)
+        if cfg.max_wall_seconds:
+            termination = termination | TimeoutTermination(cfg.max_wall_seconds)
+        return termination
+
+    def _escalate(self, agents: AgentSet, source: str, content: str, progress: MissionProgress) -> None:
+        """Gatilhos de escalonamento do coder para o modelo forte."""
+        tier = agents.tiers.get("coder")
+        if tier is None or tier.escalated:
+            return
+        if source == "reviewer" and "AUTOGEN_OK_9F1C" not in content:
+            reason = "reviewer rejeitou"
+        elif source == "tester" and progress.repeated_errors:
+            reason = "mesmo erro repetido"
         else:
-            executor = LocalCommandLineCodeExecutor(work_dir=str(workspace))
+            return
+        tier.escalate()
+        self._on_log(f"[TIER] coder → {agents.model} ({reason})")
 
-        # O Tester agora é configurado explicitamente para não pedir confirmação e agir sobre 'sh'
-        tester = CodeExecutorAgent(
-            "tester", 
-            executor, 
-            system_message=TESTER_SYSTEM
+    def _build_team(self, participants, termination, progress: MissionProgress, model_client):
+        cfg = self._config
+        if cfg.routing == ROUND_ROBIN:
+            return RoundRobinGroupChat(participants, termination_condition=termination)
+        if cfg.routing != SELECTOR:
+            raise ValueError(f"Roteamento desconhecido: {cfg.routing}")
+        if cfg.routing_model_fallback:
+            model_client = MeteredChatCompletionClient(model_client, self._meter, "selector", model=cfg.model)
+        # Sem fallback o selector_func sempre decide e o modelo nunca é chamado
+        return SelectorGroupChat(
+            participants,
+            model_client,
+            termination_condition=termination,
+            selector_func=make_selector(progress, cfg.routing_model_fallback),
         )
-        
-        reviewer = AssistantAgent("reviewer", model_client, system_message=REVIEWER_SYSTEM)
 
-        termination = TextMentionTermination("AUTOGEN_OK_9F1C") | MaxMessageTermination(self._config.max_messages) | self._external_stop
-        team = RoundRobinGroupChat([planner, coder, tester, reviewer], termination_condition=termination)
+    async def _run(self, task: str, workspace: Path, resume_from: Optional[MissionRecord] = None):
+        store = MissionStore(workspace)
+        mission_id = resume_from.id if resume_from else store.create(task, self._config.model)
+        # A missão é a run de medição (retomadas somam na mesma run)
+        self._meter.start_run("dev_team", task, run_id=mission_id)
+        message_counts: Dict[str, int] = {}
 
+        # Agentes
+        cfg = self._config
+        owned_clients = []
+        if self._runtime is not None:
+            agents = await self._runtime.acquire_agents(cfg.model, cfg.fast_model, cfg.fast_roles)
+            model_client = self._runtime.get_client(cfg.model)
+        else:
+            model_client = OpenAIChatCompletionClient(model=cfg.model)
+            fast_client = OpenAIChatCompletionClient(model=cfg.fast_model) if cfg.fast_model else None
+            owned_clients = [c for c in (model_client, fast_client) if c is not None]
+            agents = build_agents(model_client, self._meter, cfg.model, fast_client, cfg.fast_model or "", cfg.fast_roles)
+        planner, coder, reviewer = agents.planner, agents.coder, agents.reviewer
+
+        lease = None
+        team = None
+        status, stop_reason = STOPPED, ""
+        healthy = True
         try:
-            async for item in team.run_stream(task=task):
-                msg = _format_stream_item(item)
-                if msg: self._on_log(msg)
+            # Executor (emprestado do pool, já iniciado)
+            lease = await self._pool.acquire(workspace, self._config.use_docker, self._config.docker_image)
+            state = "warm" if lease.warm else "cold"
+            self._on_log(f"[EXECUTOR] {lease.kind} ({state}) pronto em {lease.ready_s:.2f}s")
+
+            # Snapshot inicial: cada execução do tester é comparada com o estado anterior
+            index = WorkspaceIndex(workspace)
+            await asyncio.to_thread(index.refresh)
+
+            # O Tester agora é configurado explicitamente para não pedir confirmação e agir sobre 'sh'
+            # Materialização: heredocs do CODER viram escritas atômicas em processo;
+            # só os comandos reais restantes vão ao executor (com orçamento de CPU/tempo/saída)
+            materializer = FileMaterializer(workspace)
+            progress = MissionProgress()
+            executor = GuardedCodeExecutor(lease.executor, materializer, self._config.budget, progress)
+            tester = WorkspaceAwareExecutorAgent(
+                "tester", 
+                executor, 
+                system_message=TESTER_SYSTEM,
+                workspace_index=index,
+                progress=progress,
+            )
+
+            termination = self._termination(progress)
+            team = self._build_team([planner, coder, tester, reviewer], termination, progress, model_client)
+
+            # Retomada: reconstrói o time a partir do estado salvo e continua de onde parou
+            run_task: Optional[str] = task
+            if resume_from is not None:
+                previous = store.transcript(mission_id)
+                # Sem estado (processo morto no meio): usa a transcrição como contexto
+                run_task = _continuation_task(task, previous)
+                if resume_from.team_state:
+                    try:
+                        await team.load_state(resume_from.team_state)
+                        run_task = None
+                    except Exception:
+                        pass  # estado de outro tipo de time (o roteamento mudou)
+                self._on_log(f"[RESUME] Missão {mission_id} retomada após {len(previous)} mensagens.")
+
+            aggregator = StreamAggregator(self._emit)
+            ticker = asyncio.create_task(self._flush_ticker(aggregator))
+            try:
+                async for item in team.run_stream(task=run_task):
+                    if isinstance(item, TaskResult):
+                        stop_reason = item.stop_reason or ""
+                        continue
+                    aggregator.feed(item)
+                    # Chunks de streaming e eventos de ferramenta/código só vão para a tela
+                    if not isinstance(item, BaseChatMessage):
+                        continue
+                    source = item.source
+                    message_counts[source] = message_counts.get(source, 0) + 1
+                    content = getattr(item, "content", None)
+                    if isinstance(content, str) and content:
+                        store.append(mission_id, source, content)
+                        self._escalate(agents, source, content, progress)
+            finally:
+                ticker.cancel()
+                aggregator.close()
+                self._on_log(
+                    f"[MATERIALIZE] {materializer.files_written} arquivos ({materializer.bytes_written} bytes) "
+                    f"escritos em processo; {executor.skipped_calls} execuções evitadas, "
+                    f"{executor.executor_calls} enviadas ao executor"
+                )
+            self._on_log(f"[STOP] {stop_reason or 'sem motivo'}")
+            if "AUTOGEN_OK_9F1C" in stop_reason or stop_reason.startswith(TESTS_PASSED):
+                status = DONE
+        except BaseException as e:
+            cancelled = isinstance(e, asyncio.CancelledError)
+            healthy = cancelled
+            status = STOPPED if cancelled else FAILED
+            stop_reason = stop_reason or ("cancelled" if cancelled else repr(e))
+            raise
         finally:
-            if self._config.use_docker: await executor.stop()
-            await model_client.close()
-            self._running = False
\ No newline at end of file
+            team_state = None
+            if team is not None:
+                try:
+                    team_state = await team.save_state()
+                except Exception:
+                    pass  # mantém o último estado salvo
+            store.finish(mission_id, status, stop_reason, team_state)
+            self._meter.finish_run(mission_id, message_counts, stop_reason)
+            usage = self._meter.run_usage(mission_id)
+            self._on_log(
+                f"[USAGE] {usage['calls']} chamadas de modelo, "
+                f"{usage['prompt_tokens']} tokens de prompt, {usage['completion_tokens']} de completion"
+            )
+            if lease is not None: await self._pool.release(lease, healthy=healthy)
+            if self._runtime is not None: await self._runtime.release_agents(agents)
+            for client in owned_clients: await client.close()
+
+
+# Tamanho máximo da transcrição reenviada quando não há estado salvo
+RESUME_CONTEXT_CHARS = 12000
+
+
+def _continuation_task(task: str, transcript: List[TranscriptEntry]) -> str:
+    history = "\n".join(f"[{e.source}] {e.content}" for e in transcript[1:])[-RESUME_CONTEXT_CHARS:]
+    return (
+        f"{task}\n\n"
+        "=== CONTINUAÇÃO: histórico da tentativa anterior ===\n"
+        f"{history}\n"
+        "=====================================================\n"
+        "Continue a partir daqui. Não refaça o que já foi concluído."
+    )
@@ -0,0 +1,53 @@
+from typing import Callable, Optional, Sequence
+
+from dev_team_termination import MissionProgress
+
+# Modos de roteamento do dev team (DevTeamConfig.routing)
+ROUND_ROBIN = "round_robin"
+SELECTOR = "selector"
+
+PARTICIPANTS = ("planner", "coder", "tester", "reviewer")
+
+
+def _last_turn(messages: Sequence):
+    """Última mensagem de um participante (ou da tarefa); ignora eventos internos."""
+    for m in reversed(messages):
+        source = getattr(m, "source", None)
+        if (source in PARTICIPANTS or source == "user") and isinstance(getattr(m, "content", None), str):
+            return m
+    return None
+
+
+def make_selector(progress: MissionProgress, model_fallback: bool = False) -> Callable[[Sequence], Optional[str]]:
+    """
+    selector_func do SelectorGroupChat com regras locais (sem chamada de modelo):
+
+      tarefa/retomada  → planner
+      planner          → coder
+      coder com código → tester
+      tester com erro  → coder      (não replaneja nem revisa uma execução que falhou)
+      tester ok        → reviewer
+      reviewer         → coder      (aprovação já encerra pela TextMentionTermination)
+
+    Casos ambíguos (coder sem código, tester sem execução) devolvem None quando
+    `model_fallback` está ligado, e o SelectorGroupChat escolhe pelo modelo;
+    sem fallback seguem uma regra fixa.
+    """
+
+    def select(messages: Sequence) -> Optional[str]:
+        last = _last_turn(messages)
+        if last is None or last.source == "user":
+            return "planner"
+        if last.source == "planner":
+            return "coder"
+        if last.source == "coder":
+            if "```" in last.content:
+                return "tester"
+            return None if model_fallback else "reviewer"
+        if last.source == "tester":
+            if progress.last_turn_ok is None:
+                return None if model_fallback else "coder"
+            return "reviewer" if progress.last_turn_ok else "coder"
+        return "coder"
+
+    return select
@@ -0,0 +1,207 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+from dev_team_core import AgentSet, build_agents
+from executor_pool import ExecutorPool, get_executor_pool
+from usage_meter import DelegatingChatCompletionClient, UsageMeter, get_usage_meter
+
+T = TypeVar("T")
+
+# Tempo que o shutdown espera as missões canceladas devolverem executores e agentes
+MISSION_CANCEL_TIMEOUT = 10.0
+
+# Missão dona da corrotina atual (herdado pelas tasks criadas dentro da run)
+current_mission: contextvars.ContextVar[str] = contextvars.ContextVar("current_mission", default="default")
+
+
+class FairSlots:
+    """
+    Limite global de chamadas de modelo simultâneas com divisão justa.
+
+    Cada missão tem sua própria fila de espera; quando um slot é liberado ele
+    vai para a próxima missão na ordem round-robin, então uma missão falante
+    não monopoliza o modelo. Deve ser usado sempre no mesmo event loop.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._in_use = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    async def acquire(self, owner: str) -> None:
+        if self._in_use < self.limit and not self._waiters:
+            self._in_use += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(owner, deque()).append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # recebeu o slot mas foi cancelado: repassa
+            else:
+                queue = self._waiters.get(owner)
+                if queue and fut in queue:
+                    queue.remove(fut)
+                    if not queue:
+                        del self._waiters[owner]
+            raise
+
+    def release(self) -> None:
+        # Entrega o slot direto ao próximo dono da fila (round-robin entre missões)
+        while self._waiters:
+            owner, queue = next(iter(self._waiters.items()))
+            fut = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(owner)
+            else:
+                del self._waiters[owner]
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._in_use -= 1
+
+    @asynccontextmanager
+    async def slot(self, owner: str):
+        await self.acquire(owner)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class SlotLimitedClient(DelegatingChatCompletionClient):
+    """Cliente de modelo que passa cada chamada pelo FairSlots da missão atual."""
+
+    def __init__(self, inner: ChatCompletionClient, slots: FairSlots) -> None:
+        super().__init__(inner)
+        self._slots = slots
+
+    async def create(self, *args, **kwargs):
+        async with self._slots.slot(current_mission.get()):
+            return await self._inner.create(*args, **kwargs)
+
+    async def create_stream(self, *args, **kwargs):
+        async with self._slots.slot(current_mission.get()):
+            async for chunk in self._inner.create_stream(*args, **kwargs):
+                yield chunk
+
+
+class DevTeamRuntime:
+    """
+    Serviço de longa duração para o DevTeamRunner.
+
+    Mantém um único event loop em uma thread própria, um cliente de modelo por
+    nome de modelo (a conexão HTTP/TLS é reaproveitada entre missões) e um
+    pool de conjuntos de agentes que são resetados e reutilizados em vez de
+    recriados a cada run. Ciclo de vida explícito: start() → submit()* → shutdown().
+    """
+
+    def __init__(
+        self,
+        executor_pool: Optional[ExecutorPool] = None,
+        client_factory: Optional[Callable[[str], object]] = None,
+        max_model_calls: Optional[int] = None,
+        meter: Optional[UsageMeter] = None,
+    ) -> None:
+        self.executor_pool = executor_pool or get_executor_pool()
+        # Consumo de tokens/latência por agente, compartilhado por todas as missões
+        self.meter = meter or get_usage_meter()
+        # Slots de chamada de modelo divididos de forma justa entre missões concorrentes
+        self.model_slots = FairSlots(max_model_calls) if max_model_calls else None
+        self._client_factory = client_factory or (lambda model: OpenAIChatCompletionClient(model=model))
+        self._clients: Dict[str, object] = {}
+        self._idle_agents: Dict[tuple, List[AgentSet]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    # ---------------- Ciclo de vida ----------------
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self) -> "DevTeamRuntime":
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run_loop, name="dev-team-runtime", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run_loop(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+        self._loop.close()
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """Agenda uma corrotina no loop do runtime (chamável de qualquer thread)."""
+        if not self.running:
+            raise RuntimeError("DevTeamRuntime não iniciado. Chame start() antes de submit().")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Cancela as missões em andamento, fecha clientes de modelo, para os executores e encerra o loop."""
+        if not self.running:
+            return
+        try:
+            self.submit(self._aclose()).result(timeout=timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    async def _aclose(self) -> None:
+        # Missões ainda rodando: o cancelamento faz o finally delas devolver lease e agentes
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending, timeout=MISSION_CANCEL_TIMEOUT)
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+        self._idle_agents.clear()
+        await self.executor_pool.close()
+
+    # ---------------- Recursos compartilhados ----------------
+    def get_client(self, model: str):
+        """Um cliente por modelo, criado sob demanda e reaproveitado."""
+        client = self._clients.get(model)
+        if client is None:
+            client = self._client_factory(model)
+            if self.model_slots is not None:
+                client = SlotLimitedClient(client, self.model_slots)
+            self._clients[model] = client
+        return client
+
+    async def acquire_agents(self, model: str, fast_model: Optional[str] = None, fast_roles: Tuple[str, ...] = ()) -> AgentSet:
+        key = (model, fast_model or "", tuple(fast_roles) if fast_model else ())
+        idle = self._idle_agents.get(key)
+        if idle:
+            return idle.pop()
+        fast_client = self.get_client(fast_model) if fast_model else None
+        return build_agents(self.get_client(model), self.meter, model, fast_client, fast_model or "", key[2])
+
+    async def release_agents(self, agents: AgentSet) -> None:
+        # Reset limpa o contexto da missão anterior; o agente em si é reaproveitado
+        for agent in agents.all():
+            await agent.on_reset(CancellationToken())
+        agents.reset_tiers()
+        key = (agents.model, agents.fast_model, agents.fast_roles)
+        self._idle_agents.setdefault(key, []).append(agents)
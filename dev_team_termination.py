@@ -0,0 +1,134 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from autogen_agentchat.base import TerminatedException, TerminationCondition
+from autogen_agentchat.messages import StopMessage
+
+from workspace_index import WorkspaceChanges
+
+# Prefixos dos motivos de parada (gravados em missions.stop_reason e runs.stop_reason)
+NO_PROGRESS = "NO_PROGRESS"
+TESTS_PASSED = "TESTS_PASSED"
+
+# Saída de runner de testes bem-sucedido (pytest / unittest)
+TESTS_PASSED_RE = re.compile(r"(=+ \d+ passed\b[^\n]*=+|^Ran \d+ tests? in [\d.]+s\s*\n+OK\b)", re.M)
+TESTS_FAILED_RE = re.compile(r"\b\d+ (failed|errors?)\b|^FAILED\b|^ERROR:", re.M)
+# Trecho volátil de mensagens de erro (endereços, tempos, números de linha)
+_VOLATILE_RE = re.compile(r"0x[0-9a-f]+|\d+(\.\d+)?s\b|line \d+", re.I)
+
+
+def _error_signature(output: str) -> str:
+    tail = _VOLATILE_RE.sub("#", output.strip()[-400:])
+    return hashlib.blake2b(tail.encode("utf-8", "replace"), digest_size=8).hexdigest()
+
+
+@dataclass
+class MissionProgress:
+    """
+    Sinais de progresso de uma missão, alimentados pelo tester.
+
+    O GuardedCodeExecutor registra o resultado de cada execução e o tester
+    registra o diff do workspace ao fim do turno. Um turno sem alteração no
+    workspace e sem execução bem-sucedida conta como turno parado.
+    """
+
+    executions: int = 0
+    failures: int = 0
+    stalled_turns: int = 0
+    repeated_errors: int = 0
+    tests_passed: bool = False
+    last_turn_ok: Optional[bool] = None    # None: o último turno do tester não executou nada
+    _turn_exit_code: Optional[int] = None
+    _last_error: str = ""
+
+    def record_execution(self, exit_code: int, output: str) -> None:
+        self.executions += 1
+        # Um turno pode ter vários blocos: vale o pior resultado
+        if self._turn_exit_code is None or exit_code != 0:
+            self._turn_exit_code = exit_code
+        if exit_code != 0:
+            self.failures += 1
+            signature = _error_signature(output)
+            self.repeated_errors = self.repeated_errors + 1 if signature == self._last_error else 0
+            self._last_error = signature
+        elif TESTS_PASSED_RE.search(output) and not TESTS_FAILED_RE.search(output):
+            self.tests_passed = True
+
+    def record_turn(self, changes: WorkspaceChanges) -> None:
+        executed_ok = self._turn_exit_code == 0
+        self.last_turn_ok = None if self._turn_exit_code is None else executed_ok
+        if changes.empty and not executed_ok:
+            self.stalled_turns += 1
+        else:
+            self.stalled_turns = 0
+            self.repeated_errors = 0
+        self._turn_exit_code = None
+
+    def reset(self) -> None:
+        self.stalled_turns = 0
+        self.repeated_errors = 0
+        self.tests_passed = False
+        self.last_turn_ok = None
+        self._turn_exit_code = None
+        self._last_error = ""
+
+
+class NoProgressTermination(TerminationCondition):
+    """Para após `max_stalled_turns` turnos do tester sem alterar o workspace nem executar com sucesso."""
+
+    def __init__(self, progress: MissionProgress, max_stalled_turns: int = 3, source: str = "tester") -> None:
+        self._progress = progress
+        self._max_stalled_turns = max_stalled_turns
+        self._source = source
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    async def __call__(self, messages: Sequence) -> Optional[StopMessage]:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        if not any(getattr(m, "source", None) == self._source for m in messages):
+            return None
+        p = self._progress
+        if p.stalled_turns < self._max_stalled_turns:
+            return None
+        self._terminated = True
+        detail = f", mesmo erro repetido {p.repeated_errors + 1}x" if p.repeated_errors else ""
+        return StopMessage(
+            content=f"{NO_PROGRESS}: {p.stalled_turns} turnos sem alteração no workspace{detail}",
+            source="NoProgressTermination",
+        )
+
+    async def reset(self) -> None:
+        self._terminated = False
+        self._progress.reset()
+
+
+class TestsPassedTermination(TerminationCondition):
+    """Sucesso antecipado: encerra assim que uma execução do tester mostra a suíte de testes passando."""
+
+    def __init__(self, progress: MissionProgress, source: str = "tester") -> None:
+        self._progress = progress
+        self._source = source
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    async def __call__(self, messages: Sequence) -> Optional[StopMessage]:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        if not self._progress.tests_passed:
+            return None
+        if not any(getattr(m, "source", None) == self._source for m in messages):
+            return None
+        self._terminated = True
+        return StopMessage(content=f"{TESTS_PASSED}: testes passaram na execução do tester", source="TestsPassedTermination")
+
+    async def reset(self) -> None:
+        self._terminated = False
@@ -1,12 +1,14 @@
-import asyncio
-import threading
+import logging
 import queue
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, ttk
 from tkinter.scrolledtext import ScrolledText
 
 from dev_team_core import DevTeamRunner, DevTeamConfig
+from dev_team_runtime import DevTeamRuntime
+from mission_scheduler import MissionScheduler
 
 
 BG = "#070A12"
@@ -16,6 +18,38 @@ ACCENT = "#FF00FF"
 ACCENT2 = "#00D9FF"
 WARN = "#FF3B3B"
 
+# Limite de linhas mantidas no console (as mais antigas são descartadas)
+SCROLLBACK_LINES = 5000
+# Máximo de mensagens drenadas da fila por tick
+MAX_BATCH = 2000
+# Log completo da missão, rotacionado dentro do workspace
+MISSION_LOG_BYTES = 5 * 1024 * 1024
+MISSION_LOG_BACKUPS = 3
+# Chamadas de modelo simultâneas (divididas entre as missões em paralelo)
+MAX_MODEL_CALLS = 4
+# Separador de missões no modo batch (linha contendo apenas ---)
+BATCH_SEPARATOR = "---"
+MAIN_CHANNEL = "main"
+
+
+def open_mission_log(ws: Path) -> logging.Logger:
+    """Logger com arquivo rotativo em <workspace>/.dev_team/mission.log."""
+    log_dir = ws / ".dev_team"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    logger = logging.getLogger(f"dev_team.mission.{ws.resolve()}")
+    if not logger.handlers:
+        handler = RotatingFileHandler(
+            log_dir / "mission.log",
+            maxBytes=MISSION_LOG_BYTES,
+            backupCount=MISSION_LOG_BACKUPS,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
 
 class App(tk.Tk):
 
@@ -27,14 +61,27 @@ class App(tk.Tk):
         self.configure(bg=BG)
 
         self.log_queue = queue.Queue()
+        # Futures concluídas no thread do runtime; tratadas no thread do Tk pelo tick
+        self.done_queue = queue.Queue()
         self.workspace = tk.StringVar(value=str(Path.cwd() / "workspace"))
         self.model = tk.StringVar(value="gpt-4o")
         self.use_docker = tk.BooleanVar(value=True)
+        self.parallel = tk.IntVar(value=3)
 
         self.runner = None
+        self._mission_future = None
+        # Um scheduler por batch; STOP alcança todos os que ainda têm missões rodando
+        self.schedulers = []
+        # Futures (missão única e missões de batch) ainda não tratadas pelo _on_done
+        self._active_futures = set()
+        self.consoles = {}
+        self._mission_logs = {}
+        # Um único loop/cliente de modelo para todas as missões desta janela
+        self.runtime = DevTeamRuntime(max_model_calls=MAX_MODEL_CALLS).start()
 
         self._build_ui()
         self._tick_log_queue()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _build_ui(self):
 
@@ -57,6 +104,9 @@ class App(tk.Tk):
         tk.Entry(cfg, textvariable=self.model, bg=BG, fg=FG).grid(row=1, column=1, sticky="w")
         tk.Checkbutton(cfg, text="USE DOCKER", variable=self.use_docker, bg=PANEL, fg=FG).grid(row=1, column=2)
 
+        tk.Label(cfg, text="PARALLEL:", fg=ACCENT2, bg=PANEL).grid(row=2, column=0)
+        tk.Spinbox(cfg, from_=1, to=8, textvariable=self.parallel, width=4, bg=BG, fg=FG).grid(row=2, column=1, sticky="w")
+
         tk.Label(self, text="MISSION INPUT:", fg=ACCENT2, bg=BG).pack(anchor="w", padx=15)
 
         self.prompt = tk.Text(self, height=10, bg=BG, fg=FG, font=("Consolas", 10))
@@ -77,11 +127,28 @@ Use cat bash e escreva arquivos completos.
         self.run_btn = tk.Button(btns, text="RUN", command=self._run, bg=ACCENT2)
         self.run_btn.pack(side="left", padx=5)
 
+        self.resume_btn = tk.Button(btns, text="RESUME", command=self._resume, bg=ACCENT)
+        self.resume_btn.pack(side="left", padx=5)
+
+        # Uma missão por bloco separado por '---', executadas em paralelo
+        self.batch_btn = tk.Button(btns, text="RUN BATCH", command=self._run_batch, bg=ACCENT2)
+        self.batch_btn.pack(side="left", padx=5)
+
         self.stop_btn = tk.Button(btns, text="STOP", command=self._stop, bg=WARN, state="disabled")
         self.stop_btn.pack(side="left")
 
-        self.console = ScrolledText(self, bg=BG, fg=FG, font=("Consolas", 9))
-        self.console.pack(fill="both", expand=True, padx=15, pady=10)
+        # Uma aba de log por missão
+        self.tabs = ttk.Notebook(self)
+        self.tabs.pack(fill="both", expand=True, padx=15, pady=10)
+        self.console = self._console_for(MAIN_CHANNEL)
+
+    def _console_for(self, channel):
+        console = self.consoles.get(channel)
+        if console is None:
+            console = ScrolledText(self.tabs, bg=BG, fg=FG, font=("Consolas", 9))
+            self.tabs.add(console, text=channel.upper())
+            self.consoles[channel] = console
+        return console
 
     def _select_ws(self):
         f = filedialog.askdirectory()
@@ -89,42 +156,132 @@ Use cat bash e escreva arquivos completos.
             self.workspace.set(f)
 
     def _tick_log_queue(self):
-        while not self.log_queue.empty():
-            msg = self.log_queue.get()
-            self.console.insert(tk.END, msg + "\n")
-            self.console.see(tk.END)
+        # Junta tudo o que está pendente em um único insert/see por canal por tick
+        batches = {}
+        try:
+            for _ in range(MAX_BATCH):
+                channel, msg = self.log_queue.get_nowait()
+                batches.setdefault(channel, []).append(msg)
+        except queue.Empty:
+            pass
+        try:
+            while True:
+                self._on_done(self.done_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        for channel, batch in batches.items():
+            console = self._console_for(channel)
+            console.insert(tk.END, "\n".join(batch) + "\n")
+            self._trim_scrollback(console)
+            console.see(tk.END)
         self.after(50, self._tick_log_queue)
 
+    @staticmethod
+    def _trim_scrollback(console):
+        # Scrollback em anel: mantém só as últimas SCROLLBACK_LINES linhas
+        lines = int(console.index("end-1c").split(".")[0])
+        excess = lines - SCROLLBACK_LINES
+        if excess > 0:
+            console.delete("1.0", f"{excess + 1}.0")
+
     def _run(self):
         task = self.prompt.get("1.0", tk.END).strip()
         if not task:
             return
+        self._start_mission(lambda runner, ws: runner.run(task, ws))
 
+    def _resume(self):
+        # Retoma a última missão interrompida do workspace (estado salvo em .dev_team/)
+        self._start_mission(lambda runner, ws: runner.resume(ws))
+
+    def _start_mission(self, make_coro):
         ws = Path(self.workspace.get())
         ws.mkdir(parents=True, exist_ok=True)
 
-        cfg = DevTeamConfig(
+        cfg = self._config()
+        mission_log = open_mission_log(ws)
+
+        def on_log(m):
+            mission_log.info(m)
+            self.log_queue.put((MAIN_CHANNEL, m))
+
+        self.runner = DevTeamRunner(cfg, on_log, runtime=self.runtime)
+
+        self.run_btn.config(state="disabled")
+        self.resume_btn.config(state="disabled")
+        self.stop_btn.config(state="normal")
+
+        fut = self.runtime.submit(make_coro(self.runner, ws))
+        self._mission_future = fut
+        self._active_futures.add(fut)
+        # O callback roda no thread do runtime: só enfileira (Tk não é thread-safe)
+        fut.add_done_callback(self.done_queue.put)
+
+    def _config(self):
+        return DevTeamConfig(
             model=self.model.get(),
             use_docker=self.use_docker.get(),
         )
 
-        self.runner = DevTeamRunner(cfg, lambda m: self.log_queue.put(m))
+    def _run_batch(self):
+        text = self.prompt.get("1.0", tk.END)
+        tasks, current = [], []
+        for line in text.splitlines():
+            if line.strip() == BATCH_SEPARATOR:
+                tasks.append("\n".join(current).strip())
+                current = []
+            else:
+                current.append(line)
+        tasks.append("\n".join(current).strip())
+        tasks = [t for t in tasks if t]
+        if not tasks:
+            return
 
-        self.run_btn.config(state="disabled")
+        base = Path(self.workspace.get())
+        base.mkdir(parents=True, exist_ok=True)
+        scheduler = MissionScheduler(self.runtime, self._config(), max_concurrent=self.parallel.get())
+        self.schedulers = [s for s in self.schedulers if any(not h.future.done() for h in s.missions)]
+        self.schedulers.append(scheduler)
+
+        def on_log(mission_id, m):
+            logger = self._mission_logs.get(mission_id)
+            if logger is None:
+                logger = self._mission_logs[mission_id] = open_mission_log(base / f"mission-{mission_id}")
+            logger.info(m)
+            self.log_queue.put((mission_id, m))
+
+        for handle in scheduler.submit_batch(tasks, base, on_log):
+            self.log_queue.put((MAIN_CHANNEL, f"[BATCH] Missão {handle.id} agendada em {handle.workspace}"))
+            self._active_futures.add(handle.future)
+            handle.future.add_done_callback(
+                lambda f, mid=handle.id: self.log_queue.put((MAIN_CHANNEL, f"[BATCH] Missão {mid} encerrada."))
+            )
+            handle.future.add_done_callback(self.done_queue.put)
         self.stop_btn.config(state="normal")
 
-        threading.Thread(target=lambda: self._exec(task, ws), daemon=True).start()
-
-    def _exec(self, task, ws):
-        try:
-            asyncio.run(self.runner.run(task, ws))
-        finally:
+    def _on_done(self, fut):
+        if not fut.cancelled() and fut.exception() is not None:
+            self.log_queue.put((MAIN_CHANNEL, f"[ERRO] {fut.exception()}"))
+        self._active_futures.discard(fut)
+        if fut is self._mission_future:
+            self._mission_future = None
             self.run_btn.config(state="normal")
+            self.resume_btn.config(state="normal")
+        if not self._active_futures:
             self.stop_btn.config(state="disabled")
 
     def _stop(self):
         if self.runner:
             self.runner.stop()
+        for scheduler in self.schedulers:
+            scheduler.stop_all()
+
+    def _on_close(self):
+        self._stop()
+        # Cancela missões em andamento (devolvem o lease), fecha clientes e para todos os executores
+        self.runtime.shutdown()
+        self.destroy()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,256 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock
+from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
+from autogen_ext.code_executors.local import LocalCommandLineCodeExecutor
+
+# Imagem padrão do DockerCommandLineCodeExecutor
+DEFAULT_DOCKER_IMAGE = "python:3-slim"
+# Chave usada para executores locais (não existe imagem)
+LOCAL_IMAGE = "local"
+
+# Comando mínimo usado como health check e como "primeira execução"
+_PROBE = [CodeBlock(code="echo ok", language="sh")]
+
+
+@dataclass
+class ExecutorLease:
+    """Executor emprestado pelo pool para uma missão."""
+    executor: object
+    key: Tuple[str, str]
+    kind: str                 # docker / local
+    warm: bool                # True se veio do pool sem cold start
+    ready_s: float            # do pedido até o executor estar pronto
+    first_exec_s: Optional[float] = None  # do início do startup até a 1ª execução
+    pooled: bool = True       # False quando o pool estava cheio (executor avulso)
+
+
+@dataclass
+class _PoolEntry:
+    key: Tuple[str, str]
+    kind: str
+    executor: object
+    created_at: float
+    last_used: float
+    last_check: float
+    in_use: bool = False
+
+
+@dataclass
+class _LatencySamples:
+    cold: List[float] = field(default_factory=list)
+    warm: List[float] = field(default_factory=list)
+
+
+class ExecutorPool:
+    """
+    Pool de executores de código compartilhado entre execuções do DevTeamRunner.
+
+    Executores são indexados por (workspace, imagem). Quem pede um executor
+    recebe um já iniciado (warm) quando existe um livre para a mesma chave;
+    caso contrário paga o cold start uma única vez. O pool tem tamanho máximo,
+    descarta executores ociosos após `idle_ttl` segundos e faz health check
+    antes de reaproveitar um executor parado há mais de `health_interval`.
+    """
+
+    def __init__(self, max_size: int = 4, idle_ttl: float = 600.0, health_interval: float = 60.0) -> None:
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.health_interval = health_interval
+        self._entries: List[_PoolEntry] = []
+        # Lock de thread (e não asyncio): o pool pode ser usado a partir de event loops diferentes
+        self._lock = threading.Lock()
+        self._latency: Dict[str, _LatencySamples] = {}
+
+    # ---------------- API pública ----------------
+    async def acquire(self, workspace: Path, use_docker: bool, image: str = DEFAULT_DOCKER_IMAGE) -> ExecutorLease:
+        t0 = time.perf_counter()
+        kind = "docker" if use_docker else "local"
+        key = (str(Path(workspace).resolve()), image if use_docker else LOCAL_IMAGE)
+
+        await self.evict_idle()
+
+        # 1. Tenta reaproveitar um executor ocioso com a mesma chave
+        while True:
+            entry = self._checkout(key)
+            if entry is None:
+                break
+            if time.time() - entry.last_check < self.health_interval or await self._healthy(entry.executor):
+                entry.last_check = time.time()
+                ready = time.perf_counter() - t0
+                self._record(kind, warm=True, value=ready)
+                return ExecutorLease(entry.executor, key, kind, warm=True, ready_s=ready)
+            # Executor morto: descarta e tenta o próximo
+            self._drop(entry)
+            await self._stop(entry.executor)
+
+        # 2. Cold start (abrindo espaço no pool se necessário)
+        victim = self._reserve_slot()
+        if victim is not None:
+            await self._stop(victim.executor)
+
+        executor = self._create(key, use_docker, image)
+        try:
+            await self._start(executor)
+            ok = await self._healthy(executor)
+        except Exception:
+            await self._stop(executor)
+            raise
+        if not ok:
+            await self._stop(executor)
+            raise RuntimeError(f"Executor {kind} não respondeu ao health check ({key[0]})")
+
+        first_exec = time.perf_counter() - t0
+        self._record(kind, warm=False, value=first_exec)
+
+        now = time.time()
+        pooled = self._register(_PoolEntry(key, kind, executor, now, now, now, in_use=True))
+        return ExecutorLease(executor, key, kind, warm=False, ready_s=first_exec, first_exec_s=first_exec, pooled=pooled)
+
+    async def release(self, lease: ExecutorLease, healthy: bool = True) -> None:
+        """Devolve o executor. Executores avulsos ou com falha são parados."""
+        if not lease.pooled:
+            await self._stop(lease.executor)
+            return
+
+        with self._lock:
+            entry = next((e for e in self._entries if e.executor is lease.executor), None)
+            if entry is not None:
+                if healthy:
+                    entry.in_use = False
+                    entry.last_used = time.time()
+                else:
+                    self._entries.remove(entry)
+
+        if entry is None or not healthy:
+            await self._stop(lease.executor)
+        await self.evict_idle()
+
+    async def evict_idle(self) -> int:
+        """Para executores ociosos há mais de `idle_ttl` segundos."""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            stale = [e for e in self._entries if not e.in_use and e.last_used < cutoff]
+            for e in stale:
+                self._entries.remove(e)
+        for e in stale:
+            await self._stop(e.executor)
+        return len(stale)
+
+    async def close(self) -> None:
+        """
+        Para todos os executores do pool, inclusive os emprestados, e o esvazia.
+
+        Um lease devolvido depois disso encontra o pool vazio e só para de novo o
+        executor (sem efeito): nenhum container sobrevive ao encerramento.
+        """
+        with self._lock:
+            entries, self._entries = self._entries, []
+        for e in entries:
+            await self._stop(e.executor)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def latency_report(self) -> Dict[str, Dict[str, float]]:
+        """Latência startup→primeira execução (cold) e pedido→pronto (warm) por tipo de executor."""
+        report: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for kind, samples in self._latency.items():
+                row: Dict[str, float] = {"cold_n": len(samples.cold), "warm_n": len(samples.warm)}
+                if samples.cold:
+                    row["cold_avg_s"] = sum(samples.cold) / len(samples.cold)
+                    row["cold_max_s"] = max(samples.cold)
+                if samples.warm:
+                    row["warm_avg_s"] = sum(samples.warm) / len(samples.warm)
+                    row["warm_max_s"] = max(samples.warm)
+                report[kind] = row
+        return report
+
+    # ---------------- Internos ----------------
+    def _checkout(self, key: Tuple[str, str]) -> Optional[_PoolEntry]:
+        with self._lock:
+            for e in self._entries:
+                if e.key == key and not e.in_use:
+                    e.in_use = True
+                    return e
+        return None
+
+    def _drop(self, entry: _PoolEntry) -> None:
+        with self._lock:
+            if entry in self._entries:
+                self._entries.remove(entry)
+
+    def _reserve_slot(self) -> Optional[_PoolEntry]:
+        """Se o pool está cheio, remove o ocioso menos usado recentemente (LRU) e o retorna."""
+        with self._lock:
+            if len(self._entries) < self.max_size:
+                return None
+            idle = [e for e in self._entries if not e.in_use]
+            if not idle:
+                return None
+            victim = min(idle, key=lambda e: e.last_used)
+            self._entries.remove(victim)
+            return victim
+
+    def _register(self, entry: _PoolEntry) -> bool:
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                return False  # pool cheio com tudo em uso: executor avulso
+            self._entries.append(entry)
+            return True
+
+    def _record(self, kind: str, warm: bool, value: float) -> None:
+        with self._lock:
+            samples = self._latency.setdefault(kind, _LatencySamples())
+            (samples.warm if warm else samples.cold).append(value)
+
+    @staticmethod
+    def _create(key: Tuple[str, str], use_docker: bool, image: str):
+        workspace = key[0]
+        if use_docker:
+            return DockerCommandLineCodeExecutor(image=image, work_dir=workspace, bind_dir=workspace)
+        return LocalCommandLineCodeExecutor(work_dir=workspace)
+
+    @staticmethod
+    async def _start(executor) -> None:
+        start = getattr(executor, "start", None)
+        if start is not None:
+            await start()
+
+    @staticmethod
+    async def _stop(executor) -> None:
+        stop = getattr(executor, "stop", None)
+        if stop is None:
+            return
+        try:
+            await stop()
+        except Exception:
+            pass  # container já removido ou executor já parado
+
+    @staticmethod
+    async def _healthy(executor) -> bool:
+        try:
+            result = await executor.execute_code_blocks(_PROBE, CancellationToken())
+        except Exception:
+            return False
+        return result.exit_code == 0
+
+
+_DEFAULT_POOL: Optional[ExecutorPool] = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+def get_executor_pool() -> ExecutorPool:
+    """Pool compartilhado por todos os DevTeamRunner do processo."""
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = ExecutorPool()
+        return _DEFAULT_POOL
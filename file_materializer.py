@@ -0,0 +1,178 @@
+import os
+import re
+import shlex
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+# `mkdir -p "dir" && cat <<'EOF' > "dir/arquivo"` (formato do ENGINEERING_DIRECTIVES) e `cat > arq <<'EOF'`.
+# Diretórios e caminhos com $ ou crase (e, sem aspas, ~ e curingas) dependem de expansão do shell:
+# não casam e seguem para o executor.
+HEREDOC_RE = re.compile(
+    r"""^\s*(?:mkdir\s+-p\s+(?P<dirs>[^;&|<>`$~*?\[]+?)\s*&&\s*)?cat\s+"""
+    r"""(?:<<(?P<dash>-?)\s*(?P<q>['"]?)(?P<tag>[A-Za-z_]\w*)(?P=q)\s*>\s*(?P<path>"[^"`$]+"|'[^']+'|[^\s;&|<>`$~*?\[]+)"""
+    r"""|>\s*(?P<path2>"[^"`$]+"|'[^']+'|[^\s;&|<>`$~*?\[]+)\s*<<(?P<dash2>-?)\s*(?P<q2>['"]?)(?P<tag2>[A-Za-z_]\w*)(?P=q2))\s*$"""
+)
+MKDIR_RE = re.compile(r"^\s*mkdir\s+-p\s+(?P<dirs>[^;&|<>`$~*?\[]+?)\s*$")
+# Início de qualquer heredoc (`python3 <<EOF`, `<<-'EOF'`...), não só os de escrita
+HEREDOC_START_RE = re.compile(r"""<<(-?)\s*['"]?([A-Za-z_]\w*)['"]?""")
+# Diretório de trabalho do workspace dentro do container Docker
+CONTAINER_WORK_DIR = "/workspace"
+
+
+@dataclass
+class FileWrite:
+    path: str
+    content: str
+
+
+@dataclass
+class MaterializePlan:
+    dirs: List[str] = field(default_factory=list)
+    writes: List[FileWrite] = field(default_factory=list)
+    remaining: str = ""   # comandos reais que ainda precisam do executor
+
+    @property
+    def has_files(self) -> bool:
+        return bool(self.dirs or self.writes)
+
+
+def _unquote(token: str) -> str:
+    return shlex.split(token)[0] if token else token
+
+
+def _heredoc_end(lines: List[str], start: int, tag: str, dash: bool) -> Optional[int]:
+    """Índice da linha terminadora de um heredoc cujo corpo começa em `start`; None se faltar."""
+    for j in range(start, len(lines)):
+        current = lines[j].lstrip("\t") if dash else lines[j]
+        if current.rstrip() == tag:
+            return j
+    return None
+
+
+def command_lines(code: str) -> str:
+    """Bloco sem o corpo dos heredocs: conteúdo de arquivo não é comando."""
+    lines = code.splitlines()
+    out: List[str] = []
+    i = 0
+    while i < len(lines):
+        out.append(lines[i])
+        m = HEREDOC_START_RE.search(lines[i])
+        i += 1
+        if m:
+            end = _heredoc_end(lines, i, m.group(2), bool(m.group(1)))
+            # Sem terminador não é heredoc (ex.: `echo "cat <<EOF"`, `1<<x`): o resto continua sendo comando
+            if end is not None:
+                i = end + 1
+    return "\n".join(out)
+
+
+def split_block(code: str) -> MaterializePlan:
+    """
+    Separa o prefixo de escritas (mkdir -p + heredocs literais) dos comandos reais.
+
+    Só o prefixo é extraído: a partir do primeiro comando que não é escrita
+    (cd, python, heredoc com expansão de $VAR...) tudo segue para o shell, já
+    que esse comando pode mudar o significado das escritas seguintes.
+    """
+    plan = MaterializePlan()
+    lines = code.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            i += 1
+            continue
+
+        try:
+            m = HEREDOC_RE.match(line)
+            if m:
+                tag = m.group("tag") or m.group("tag2")
+                quoted = bool(m.group("q") or m.group("q2"))
+                dash = bool(m.group("dash") or m.group("dash2"))
+                end = _heredoc_end(lines, i + 1, tag, dash)
+                if end is None:
+                    break  # heredoc sem terminador: deixa o shell reclamar
+                body = [lines[k].lstrip("\t") if dash else lines[k] for k in range(i + 1, end)]
+                content = "\n".join(body) + ("\n" if body else "")
+                # Sem aspas na tag o shell expandiria $VAR/`cmd`: só o shell sabe o resultado
+                if not quoted and any(c in content for c in "$`\\"):
+                    break
+                if m.group("dirs"):
+                    plan.dirs.extend(shlex.split(m.group("dirs")))
+                plan.writes.append(FileWrite(_unquote(m.group("path") or m.group("path2")), content))
+                i = end + 1
+                continue
+
+            m = MKDIR_RE.match(line)
+            if m:
+                plan.dirs.extend(shlex.split(m.group("dirs")))
+                i += 1
+                continue
+        except ValueError:
+            pass  # aspas desbalanceadas: não é uma escrita que saibamos interpretar
+        break
+
+    plan.remaining = "\n".join(lines[i:]).strip()
+    return plan
+
+
+class FileMaterializer:
+    """
+    Escreve arquivos do CODER direto no workspace, sem passar pelo executor.
+
+    Cada arquivo é escrito de forma atômica (arquivo temporário no mesmo
+    diretório + os.replace) e todo caminho é confinado ao workspace: caminhos
+    absolutos fora dele, `..` e links simbólicos que escapam são recusados.
+    """
+
+    def __init__(self, workspace: Path) -> None:
+        self.root = Path(workspace).resolve()
+        self.files_written = 0
+        self.bytes_written = 0
+
+    def confine(self, path: str) -> Path:
+        candidate = Path(path)
+        # Caminhos do container (/workspace/...) apontam para o mesmo workspace no host
+        if candidate.is_absolute() and (path == CONTAINER_WORK_DIR or path.startswith(CONTAINER_WORK_DIR + "/")):
+            candidate = Path(path[len(CONTAINER_WORK_DIR):].lstrip("/"))
+        if not candidate.is_absolute():
+            candidate = self.root / candidate
+        target = candidate.resolve()  # resolve também links simbólicos
+        if target != self.root and self.root not in target.parents:
+            raise PermissionError(f"Caminho fora do workspace: {path}")
+        return target
+
+    def apply(self, plan: MaterializePlan) -> List[str]:
+        # Valida tudo antes de escrever qualquer coisa
+        dirs = [self.confine(d) for d in plan.dirs]
+        targets = [(self.confine(w.path), w) for w in plan.writes]
+
+        for d in dirs:
+            d.mkdir(parents=True, exist_ok=True)
+        written = []
+        for target, w in targets:
+            self._atomic_write(target, w.content)
+            written.append(w.path)
+        return written
+
+    def _atomic_write(self, target: Path, content: str) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        data = content.encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            if target.exists():
+                os.chmod(tmp, target.stat().st_mode & 0o777)
+            else:
+                os.chmod(tmp, 0o644)
+            os.replace(tmp, target)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self.files_written += 1
+        self.bytes_written += len(data)
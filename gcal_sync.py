@@ -2,10 +2,11 @@
 from __future__ import annotations
 
 import re
+import threading
 from dataclasses import asdict
 from datetime import datetime, date, time, timedelta
 from pathlib import Path
-from typing import Iterable, Optional, Tuple
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 
 from zoneinfo import ZoneInfo
@@ -46,10 +47,23 @@ def _strip_time_prefix(title: str) -> str:
     return PREFIX_CLEAN_RE.sub("", title).strip()
 
 
-def _get_service(vault_dir: Path):
+# Serviço já autenticado por vault: syncs seguidos (CLI/daemon) não refazem OAuth nem discovery.
+# O cliente HTTP do serviço não é thread-safe; quem sincroniza em paralelo serializa por vault.
+_SERVICES: Dict[Path, Tuple[Credentials, Any]] = {}
+_SERVICES_LOCK = threading.Lock()
+
+
+def _get_service(vault_dir: Path, interactive: bool = True):
     """
     Guarda token no vault para não pedir login toda hora.
+    Sem `interactive` (modo headless) falta de token vira erro em vez de abrir o navegador.
     """
+    key = vault_dir.resolve()
+    with _SERVICES_LOCK:
+        cached = _SERVICES.get(key)
+    if cached is not None and cached[0].valid:
+        return cached[1]
+
     vault_dir.mkdir(parents=True, exist_ok=True)
     creds_path = vault_dir / "gcal_credentials.json"
     token_path = vault_dir / "gcal_token.json"
@@ -66,6 +80,8 @@ def _get_service(vault_dir: Path):
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
+        elif not interactive:
+            raise PermissionError(f"Token do Google Calendar ausente ou inválido em {token_path}; autentique pela UI.")
         else:
             flow = InstalledAppFlow.from_client_secrets_file(str(creds_path), SCOPES)
             # abre navegador e autentica (desktop app)
@@ -73,7 +89,10 @@ def _get_service(vault_dir: Path):
         token_path.write_text(creds.to_json(), encoding="utf-8")
 
     # cache_discovery=False evita criação de arquivo cache (menos atrito em ambientes variados)
-    return build("calendar", "v3", credentials=creds, cache_discovery=False)
+    service = build("calendar", "v3", credentials=creds, cache_discovery=False)
+    with _SERVICES_LOCK:
+        _SERVICES[key] = (creds, service)
+    return service
 
 
 def _day_bounds(day: date, tz: ZoneInfo) -> Tuple[datetime, datetime]:
@@ -82,6 +101,49 @@ def _day_bounds(day: date, tz: ZoneInfo) -> Tuple[datetime, datetime]:
     return start, end
 
 
+def _clean_day(service, calendar_id: str, day_start: datetime, day_end: datetime) -> int:
+    """Deleta todos os eventos criados pelo 'ops_agent' no dia (estratégia "Clean Slate")."""
+    existing_ops_events = (
+        service.events()
+        .list(
+            calendarId=calendar_id,
+            timeMin=day_start.isoformat(),
+            timeMax=day_end.isoformat(),
+            singleEvents=True,
+            privateExtendedProperty="ops_owner=ops_agent",
+        )
+        .execute()
+    )
+
+    cleaned = 0
+    for ev in existing_ops_events.get("items", []):
+        try:
+            service.events().delete(calendarId=calendar_id, eventId=ev["id"]).execute()
+            cleaned += 1
+        except Exception:
+            pass  # Ignora se já foi deletado ou erro menor
+    return cleaned
+
+
+def _insert_event(service, calendar_id: str, summary: str, start_dt: datetime, end_dt: datetime, tz_name: str, category: str = "") -> None:
+    if end_dt <= start_dt:
+        end_dt = end_dt + timedelta(days=1)
+
+    private = {"ops_owner": "ops_agent"}  # Marca registrada para podermos deletar depois
+    if category:
+        private["ops_category"] = category
+    event_body = {
+        "summary": summary,
+        "description": f"Plano gerado pelo OPS_AGENT em {datetime.now().strftime('%H:%M')}",
+        "start": {"dateTime": start_dt.isoformat(), "timeZone": tz_name},
+        "end": {"dateTime": end_dt.isoformat(), "timeZone": tz_name},
+        "extendedProperties": {"private": private},
+        # Cor diferenciada para o plano do agente (ex: cor 5 é amarela/banana)
+        "colorId": "5"
+    }
+    service.events().insert(calendarId=calendar_id, body=event_body).execute()
+
+
 def sync_tasks_to_gcal(
     *,
     tasks: Iterable,
@@ -101,26 +163,7 @@ def sync_tasks_to_gcal(
     service = _get_service(vault_dir)
 
     # --- 1. LIMPEZA (Nuke) ---
-    # Busca e deleta todos os eventos criados pelo 'ops_agent' neste dia específico
-    existing_ops_events = (
-        service.events()
-        .list(
-            calendarId=calendar_id,
-            timeMin=day_start.isoformat(),
-            timeMax=day_end.isoformat(),
-            singleEvents=True,
-            privateExtendedProperty="ops_owner=ops_agent",
-        )
-        .execute()
-    )
-    
-    cleaned = 0
-    for ev in existing_ops_events.get("items", []):
-        try:
-            service.events().delete(calendarId=calendar_id, eventId=ev["id"]).execute()
-            cleaned += 1
-        except Exception:
-            pass  # Ignora se já foi deletado ou erro menor
+    cleaned = _clean_day(service, calendar_id, day_start, day_end)
 
     # --- 2. INSERÇÃO (Fresh Start) ---
     created = 0
@@ -139,47 +182,45 @@ def sync_tasks_to_gcal(
         start_hhmm, end_hhmm = tr
         start_dt = datetime.combine(day, _parse_hhmm(start_hhmm), tzinfo=tz)
         end_dt = datetime.combine(day, _parse_hhmm(end_hhmm), tzinfo=tz)
-
-        if end_dt <= start_dt:
-            end_dt = end_dt + timedelta(days=1)
-
-        clean_title = _strip_time_prefix(title)
-        
-        event_body = {
-            "summary": clean_title,
-            "description": f"Plano gerado pelo OPS_AGENT em {datetime.now().strftime('%H:%M')}",
-            "start": {"dateTime": start_dt.isoformat(), "timeZone": tz_name},
-            "end": {"dateTime": end_dt.isoformat(), "timeZone": tz_name},
-            "extendedProperties": {
-                "private": {
-                    "ops_owner": "ops_agent",  # Marca registrada para podermos deletar depois
-                }
-            },
-            # Cor diferenciada para o plano do agente (ex: cor 5 é amarela/banana)
-            "colorId": "5"
-        }
-
-        service.events().insert(calendarId=calendar_id, body=event_body).execute()
+        _insert_event(service, calendar_id, _strip_time_prefix(title), start_dt, end_dt, tz_name)
         created += 1
 
     return {"status": "success", "created": created, "cleaned": cleaned}
-def sync_ops_plan(raw_text: str, vault_dir):
-    from ops_plan_parser import parse_ops_plan
 
-    tz = ZoneInfo("America/Sao_Paulo")
-    today = datetime.now(tz).date()
 
-    tasks = parse_ops_plan(raw_text)
-    
-    # Criamos objetos simples para o sync
-    class PseudoTask:
-        def __init__(self, title):
-            self.title = title
+def sync_plan_tasks(
+    *,
+    tasks: Iterable,
+    vault_dir: Path,
+    day: Optional[date] = None,
+    calendar_id: str = "primary",
+    tz_name: str = DEFAULT_TZ,
+    interactive: bool = True,
+) -> dict:
+    """Mesmo "Clean Slate" de sync_tasks_to_gcal, a partir de PlanTasks já validadas (sem regex no título)."""
+    tz = ZoneInfo(tz_name)
+    day = day or datetime.now(tz).date()
+    day_start, day_end = _day_bounds(day, tz)
+
+    service = _get_service(vault_dir, interactive)
+    cleaned = _clean_day(service, calendar_id, day_start, day_end)
+
+    created = 0
+    for t in tasks:
+        start_dt = datetime.combine(day, _parse_hhmm(t.start), tzinfo=tz)
+        end_dt = datetime.combine(day, _parse_hhmm(t.end), tzinfo=tz)
+        _insert_event(service, calendar_id, t.title, start_dt, end_dt, tz_name, category=t.category)
+        created += 1
+
+    return {"status": "success", "created": created, "cleaned": cleaned}
+
 
-    pseudo_tasks = [PseudoTask(f"{t.start}–{t.end} — {t.title}") for t in tasks]
+def sync_ops_plan(raw_text: str, vault_dir, interactive: bool = True):
+    from ops_plan_parser import parse_ops_plan
 
-    return sync_tasks_to_gcal(
-        tasks=pseudo_tasks,
+    return sync_plan_tasks(
+        tasks=parse_ops_plan(raw_text),
         vault_dir=vault_dir,
         tz_name="America/Sao_Paulo",
-    )
\ No newline at end of file
+        interactive=interactive,
+    )
@@ -0,0 +1,87 @@
+import asyncio
+import concurrent.futures
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from dev_team_core import DevTeamConfig, DevTeamRunner
+from dev_team_runtime import DevTeamRuntime, current_mission
+
+
+@dataclass
+class MissionHandle:
+    id: str
+    task: str
+    workspace: Path
+    runner: DevTeamRunner
+    future: Optional["concurrent.futures.Future[None]"] = None
+    status: str = "queued"   # queued / running / finished / failed / cancelled
+    error: str = ""
+
+
+class MissionScheduler:
+    """
+    Executa várias missões do dev team em paralelo sobre um DevTeamRuntime.
+
+    Cada missão ganha um subdiretório próprio do workspace base (e portanto
+    seu próprio executor no pool) e um canal de log próprio (`on_log` recebe
+    o id da missão). `max_concurrent` limita quantas missões rodam ao mesmo
+    tempo; as chamadas de modelo são divididas pelos FairSlots do runtime.
+    """
+
+    def __init__(self, runtime: DevTeamRuntime, config: DevTeamConfig, max_concurrent: int = 3) -> None:
+        self.runtime = runtime
+        self.config = config
+        self.max_concurrent = max_concurrent
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._missions: Dict[str, MissionHandle] = {}
+        # Um executor por missão em execução precisa caber no pool
+        pool = runtime.executor_pool
+        pool.max_size = max(pool.max_size, max_concurrent)
+
+    @property
+    def missions(self) -> List[MissionHandle]:
+        return list(self._missions.values())
+
+    def submit(self, task: str, base_workspace: Path, on_log: Callable[[str, str], None]) -> MissionHandle:
+        """Agenda uma missão; `on_log(mission_id, msg)` é o canal de eventos dela."""
+        mission_id = str(uuid.uuid4())[:8]
+        workspace = Path(base_workspace) / f"mission-{mission_id}"
+        workspace.mkdir(parents=True, exist_ok=True)
+
+        runner = DevTeamRunner(self.config, lambda m: on_log(mission_id, m), runtime=self.runtime)
+        handle = MissionHandle(mission_id, task, workspace, runner)
+        self._missions[mission_id] = handle
+        handle.future = self.runtime.submit(self._run(handle))
+        return handle
+
+    def submit_batch(self, tasks: List[str], base_workspace: Path, on_log: Callable[[str, str], None]) -> List[MissionHandle]:
+        return [self.submit(t, base_workspace, on_log) for t in tasks]
+
+    def stop(self, mission_id: str) -> None:
+        handle = self._missions.get(mission_id)
+        if handle is not None:
+            handle.runner.stop()
+
+    def stop_all(self) -> None:
+        for handle in self._missions.values():
+            handle.runner.stop()
+
+    async def _run(self, handle: MissionHandle) -> None:
+        if self._semaphore is None:
+            # Criado dentro do loop do runtime
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._semaphore:
+            handle.status = "running"
+            current_mission.set(handle.id)
+            try:
+                await handle.runner.run(handle.task, handle.workspace)
+                handle.status = "finished"
+            except asyncio.CancelledError:
+                handle.status = "cancelled"
+                raise
+            except Exception as e:
+                handle.status = "failed"
+                handle.error = str(e)
+                raise
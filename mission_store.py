@@ -0,0 +1,144 @@
+import json
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Status possíveis de uma missão
+RUNNING = "running"
+STOPPED = "stopped"   # STOP, max_messages ou outro término sem sucesso
+FAILED = "failed"     # exceção durante a run
+DONE = "done"         # reviewer aprovou
+
+
+@dataclass
+class MissionRecord:
+    id: str
+    task: str
+    model: str
+    status: str
+    stop_reason: str
+    team_state: Optional[Dict[str, Any]]
+    created_at: float
+    updated_at: float
+
+
+@dataclass
+class TranscriptEntry:
+    seq: int
+    source: str
+    content: str
+    timestamp: float
+
+
+class MissionStore:
+    """Transcrições e estado do time persistidos em <workspace>/.dev_team/missions.db."""
+
+    def __init__(self, workspace: Path) -> None:
+        state_dir = Path(workspace) / ".dev_team"
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = (state_dir / "missions.db").absolute()
+        self._init_db()
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        with self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS missions (
+                    id TEXT PRIMARY KEY,
+                    task TEXT,
+                    model TEXT,
+                    status TEXT,
+                    stop_reason TEXT,
+                    team_state TEXT,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transcript (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    mission_id TEXT,
+                    seq INTEGER,
+                    source TEXT,
+                    content TEXT,
+                    timestamp REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_transcript_mission ON transcript (mission_id, seq)")
+            conn.commit()
+
+    # ---------------- Missões ----------------
+    def create(self, task: str, model: str) -> str:
+        mission_id = str(uuid.uuid4())[:8]
+        now = time.time()
+        with self._get_connection() as conn:
+            conn.execute(
+                "INSERT INTO missions (id, task, model, status, stop_reason, team_state, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, '', NULL, ?, ?)",
+                (mission_id, task, model, RUNNING, now, now),
+            )
+            conn.commit()
+        return mission_id
+
+    def finish(self, mission_id: str, status: str, stop_reason: str, team_state: Optional[Dict[str, Any]]) -> None:
+        state_json = json.dumps(team_state, default=str) if team_state is not None else None
+        with self._get_connection() as conn:
+            # Mantém o último estado salvo se este término não conseguiu capturar um novo
+            conn.execute(
+                "UPDATE missions SET status = ?, stop_reason = ?, team_state = COALESCE(?, team_state), updated_at = ? "
+                "WHERE id = ?",
+                (status, stop_reason, state_json, time.time(), mission_id),
+            )
+            conn.commit()
+
+    def get(self, mission_id: str) -> Optional[MissionRecord]:
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM missions WHERE id = ?", (mission_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def latest_resumable(self) -> Optional[MissionRecord]:
+        """Última missão que não terminou com sucesso."""
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                "SELECT * FROM missions WHERE status != ? ORDER BY updated_at DESC LIMIT 1", (DONE,)
+            ).fetchone()
+        return self._to_record(row) if row else None
+
+    @staticmethod
+    def _to_record(row) -> MissionRecord:
+        return MissionRecord(
+            id=row["id"],
+            task=row["task"],
+            model=row["model"],
+            status=row["status"],
+            stop_reason=row["stop_reason"] or "",
+            team_state=json.loads(row["team_state"]) if row["team_state"] else None,
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+    # ---------------- Transcrição ----------------
+    def append(self, mission_id: str, source: str, content: str) -> None:
+        # Gravado mensagem a mensagem: sobrevive até a um kill do processo
+        with self._get_connection() as conn:
+            conn.execute(
+                "INSERT INTO transcript (mission_id, seq, source, content, timestamp) "
+                "VALUES (?, (SELECT COUNT(*) FROM transcript WHERE mission_id = ?), ?, ?, ?)",
+                (mission_id, mission_id, source, content, time.time()),
+            )
+            conn.commit()
+
+    def transcript(self, mission_id: str) -> List[TranscriptEntry]:
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                "SELECT seq, source, content, timestamp FROM transcript WHERE mission_id = ? ORDER BY seq ASC",
+                (mission_id,),
+            )
+            return [TranscriptEntry(*row) for row in cursor.fetchall()]
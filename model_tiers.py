@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional
+
+from autogen_core.models import ChatCompletionClient
+
+from usage_meter import DelegatingChatCompletionClient, UsageMeter
+
+FAST = "fast"
+STRONG = "strong"
+
+# US$ por 1M tokens (prompt, completion) para a estimativa de custo do relatório
+MODEL_PRICES: Dict[str, tuple] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+
+class TieredClient(DelegatingChatCompletionClient):
+    """
+    Cliente de um agente com dois níveis de modelo.
+
+    As chamadas vão para o modelo rápido; escalate() manda as próximas
+    `calls` chamadas para o modelo forte (gatilhos: plano que não parseia,
+    reviewer rejeitando, erro repetido). `initial_strong_calls` reserva o
+    forte para as primeiras chamadas, como o plano inicial do planner.
+    """
+
+    def __init__(
+        self,
+        fast: ChatCompletionClient,
+        strong: ChatCompletionClient,
+        initial_strong_calls: int = 0,
+    ) -> None:
+        super().__init__(fast)
+        self._strong = strong
+        self._initial_strong_calls = initial_strong_calls
+        self._pending_strong = initial_strong_calls
+        self.last_tier = FAST
+        self.escalations = 0
+
+    @property
+    def escalated(self) -> bool:
+        return self._pending_strong > 0
+
+    def escalate(self, calls: int = 1) -> None:
+        if self._pending_strong < calls:
+            self.escalations += 1
+        self._pending_strong = max(self._pending_strong, calls)
+
+    def reset(self) -> None:
+        self._pending_strong = self._initial_strong_calls
+        self.last_tier = FAST
+
+    def _pick(self) -> ChatCompletionClient:
+        if self._pending_strong > 0:
+            self._pending_strong -= 1
+            self.last_tier = STRONG
+            return self._strong
+        self.last_tier = FAST
+        return self._inner
+
+    async def create(self, *args, **kwargs):
+        return await self._pick().create(*args, **kwargs)
+
+    async def create_stream(self, *args, **kwargs):
+        async for chunk in self._pick().create_stream(*args, **kwargs):
+            yield chunk
+
+    async def close(self) -> None:
+        await self._inner.close()
+        await self._strong.close()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+def tier_report(meter: UsageMeter, kind: Optional[str] = None, since_day: Optional[str] = None) -> str:
+    """Comparação de latência e custo por modelo (e por agente dentro de cada modelo) a partir dos logs de uso."""
+    data = meter.summary(kind, since_day)
+    by_model: Dict[str, Dict[str, float]] = {}
+    lines: List[str] = ["LATÊNCIA E CUSTO POR MODELO/AGENTE:"]
+    for a in data["by_agent"]:
+        cost = estimate_cost(a["model"], a["prompt_tokens"], a["completion_tokens"])
+        per_call = f"US$ {cost / a['calls']:.5f}/chamada" if cost is not None and a["calls"] else "custo ?"
+        lines.append(
+            f"  [{a['kind']}] {a['model']:<14} {a['agent']:<10} chamadas={a['calls']:<5} "
+            f"p50={a['p50_ms']:.0f}ms p95={a['p95_ms']:.0f}ms {per_call}"
+        )
+        m = by_model.setdefault(a["model"], {"calls": 0, "tokens": 0, "cost": 0.0})
+        m["calls"] += a["calls"]
+        m["tokens"] += a["prompt_tokens"] + a["completion_tokens"]
+        m["cost"] += cost or 0.0
+
+    lines.append("TOTAL POR MODELO:")
+    for model, m in sorted(by_model.items()):
+        lines.append(f"  {model:<14} chamadas={int(m['calls']):<6} tokens={int(m['tokens']):<10} US$ {m['cost']:.4f}")
+    return "\n".join(lines)
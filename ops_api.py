@@ -0,0 +1,497 @@
+"""
+API HTTP/JSON local sobre o vault do day ops: tarefas, distrações, chat, plano e agente.
+
+Servidor asyncio sem framework: HTTP/1.1 com keep-alive, JSON no corpo e a
+resposta do agente em Server-Sent Events (POST /ask). As rotas viram jobs do
+OpsWorkers (ops_cli) sobre uma conexão SQLite só (SharedDatabaseManager),
+usada por uma thread dedicada, e um cliente de modelo compartilhado por
+todos os clientes HTTP.
+Todo pedido leva o token da instalação (arquivo ops_api_token no vault) em
+`Authorization: Bearer ...`; Host precisa ser localhost e Origin, se vier,
+também. Assim páginas web abertas no navegador não alcançam a API.
+Uso: python ops_api.py [--vault DIR] [--port 8765] | python ops_api.py --load-test
+"""
+import argparse
+import asyncio
+import contextlib
+import hmac
+import json
+import os
+import re
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Pattern, TextIO, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from day_ops_core import DailyOpsConfig, SharedDatabaseManager, StaleTaskError, TaskItem, TaskStore
+from ops_cli import DEFAULT_VAULT, OpsWorkers, VaultSession
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_HEADER = 16 * 1024
+MAX_BODY = 1024 * 1024
+TOKEN_FILE = "ops_api_token"
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]", "::1")
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+    404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, List[str]]
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Dict[str, Any]:
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError as e:
+            raise HttpError(400, f"JSON inválido: {e}")
+        if not isinstance(data, dict):
+            raise HttpError(400, "o corpo deve ser um objeto JSON")
+        return data
+
+    def param(self, name: str, default: str = "") -> str:
+        return self.query.get(name, [default])[0]
+
+
+def api_token(vault_dir: Path) -> str:
+    """Token desta instalação, criado na primeira subida (arquivo legível só pelo dono)."""
+    path = vault_dir / TOKEN_FILE
+    if not path.exists():
+        vault_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(secrets.token_urlsafe(32))
+    return path.read_text(encoding="utf-8").strip()
+
+
+def _is_local(host: str) -> bool:
+    """`host` (com ou sem porta) aponta para esta máquina."""
+    host = host.strip().lower()
+    if host.startswith("["):
+        return host.split("]")[0] + "]" in LOCAL_HOSTS
+    return host.rsplit(":", 1)[0] in LOCAL_HOSTS
+
+
+def check_access(req: "Request", token: str) -> None:
+    """Rejeita Host/Origin de fora (DNS rebinding, páginas web) e pedidos sem o token."""
+    if not _is_local(req.headers.get("host", "")):
+        raise HttpError(403, "Host não permitido")
+    origin = req.headers.get("origin")
+    if origin is not None and not _is_local(urlsplit(origin).netloc):
+        raise HttpError(403, "Origin não permitida")
+    scheme, _, given = req.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(given.strip().encode(), token.encode()):
+        raise HttpError(401, f"token ausente ou inválido (veja {TOKEN_FILE} no vault)")
+
+
+def _update_job(req: Request, m: "re.Match[str]") -> Dict[str, Any]:
+    changes = req.json()
+    row_version = changes.pop("row_version", None)
+    return {"op": "update", "task": m["task"], "changes": changes, "row_version": row_version}
+
+
+# (método, caminho) → job do OpsWorkers; o vault é sempre o do servidor
+Route = Tuple[str, Pattern[str], Callable[[Request, "re.Match[str]"], Dict[str, Any]], int]
+ROUTES: List[Route] = [
+    ("GET", re.compile(r"/tasks"), lambda r, m: {"op": "tasks"}, 200),
+    ("POST", re.compile(r"/tasks"), lambda r, m: {**r.json(), "op": "add"}, 201),
+    ("PATCH", re.compile(r"/tasks/(?P<task>[\w-]+)"), _update_job, 200),
+    ("DELETE", re.compile(r"/tasks/(?P<task>[\w-]+)"), lambda r, m: {"op": "remove", "task": m["task"]}, 200),
+    ("GET", re.compile(r"/distractions"), lambda r, m: {"op": "distractions"}, 200),
+    ("POST", re.compile(r"/distractions"), lambda r, m: {**r.json(), "op": "distraction"}, 201),
+    ("DELETE", re.compile(r"/distractions"), lambda r, m: {"op": "clear_distractions"}, 200),
+    ("GET", re.compile(r"/chat"), lambda r, m: {"op": "chat"}, 200),
+    ("DELETE", re.compile(r"/chat"), lambda r, m: {"op": "clear_chat"}, 200),
+    ("GET", re.compile(r"/plan"), lambda r, m: {"op": "plan"}, 200),
+    ("GET", re.compile(r"/search"), lambda r, m: {"op": "search", "query": r.param("q"), "limit": r.param("limit", "50")}, 200),
+    ("POST", re.compile(r"/sync"), lambda r, m: {"op": "sync", "text": r.json().get("text")}, 200),
+]
+
+
+def _status_for(error: Exception) -> int:
+    if isinstance(error, HttpError):
+        return error.status
+    if isinstance(error, StaleTaskError):
+        return 409
+    if isinstance(error, LookupError) and not isinstance(error, KeyError):
+        return 404
+    if isinstance(error, (KeyError, ValueError, TypeError)):
+        return 400
+    return 500
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, KeyError):
+        return f"campo obrigatório: {error.args[0]}"
+    return str(error)
+
+
+def _response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class OpsApiServer:
+    """
+    Servidor HTTP de um vault.
+
+    Todas as chamadas ao SQLite passam por um executor de uma thread, dono da
+    conexão compartilhada; o loop só faz rede e JSON. Pedidos ao agente
+    (POST /ask) rodam no mesmo loop, um de cada vez no vault, e seguem até o
+    fim mesmo se o cliente desconectar, para o histórico ser gravado.
+    """
+
+    def __init__(
+        self,
+        vault_dir: Path,
+        config: Optional[DailyOpsConfig] = None,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+    ) -> None:
+        self.vault_dir = vault_dir
+        self.host = host
+        self.port = port
+        self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ops-api-db")
+        self.workers = OpsWorkers(
+            config or DailyOpsConfig(model="gpt-4o-mini", structured_plan=True),
+            db_factory=SharedDatabaseManager,
+            db_executor=self._db_thread,
+        )
+        self.session: Optional[VaultSession] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._background: set = set()
+        self._token = ""
+
+    async def start(self) -> "OpsApiServer":
+        loop = asyncio.get_running_loop()
+        # A conexão compartilhada nasce na thread que vai usá-la
+        self.session = await loop.run_in_executor(self._db_thread, self.workers.session, self.vault_dir)
+        self._token = api_token(self.vault_dir)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self.workers.close()
+        if self.session is not None:
+            await asyncio.get_running_loop().run_in_executor(self._db_thread, self.session.db.close)
+        self._db_thread.shutdown()
+
+    # ---------------- HTTP ----------------
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "cabeçalho grande demais")
+        try:
+            request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+            method, target, _version = request_line.split(" ", 2)
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(400, "requisição HTTP malformada")
+        if length > MAX_BODY:
+            raise HttpError(413, f"corpo acima de {MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return Request(method.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), headers, body)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    req = await self._read_request(reader)
+                except HttpError as e:
+                    writer.write(_response(e.status, {"error": str(e)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if req is None:
+                    break
+                try:
+                    check_access(req, self._token)
+                except HttpError as e:
+                    writer.write(_response(e.status, {"error": str(e)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if req.method == "POST" and req.path == "/ask":
+                    await self._stream_ask(req, writer)
+                    break
+                keep_alive = req.headers.get("connection", "").lower() != "close"
+                status, payload = await self._dispatch(req)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, req: Request) -> Tuple[int, Any]:
+        if req.path == "/health":
+            return 200, {"ok": True, "vault": str(self.vault_dir)}
+        allowed = []
+        for method, pattern, build, status in ROUTES:
+            m = pattern.fullmatch(req.path)
+            if m is None:
+                continue
+            if method != req.method:
+                allowed.append(method)
+                continue
+            try:
+                return status, await self.workers.run(build(req, m), self.session)
+            except Exception as e:
+                return _status_for(e), {"error": _error_message(e)}
+        if allowed:
+            return 405, {"error": f"use {', '.join(allowed)}"}
+        return 404, {"error": f"rota desconhecida: {req.path}"}
+
+    async def _stream_ask(self, req: Request, writer: asyncio.StreamWriter) -> None:
+        """POST /ask {"message": ..., "sync": false} → eventos chunk*, depois done (ou error)."""
+        try:
+            body = req.json()
+            message = str(body["message"]).strip()
+            if not message:
+                raise HttpError(400, "mensagem vazia")
+        except Exception as e:
+            writer.write(_response(_status_for(e), {"error": _error_message(e)}, keep_alive=False))
+            await writer.drain()
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        events: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+
+        async def run() -> None:
+            try:
+                result = await self.workers.ask(
+                    self.session,
+                    message,
+                    sync=bool(body.get("sync", False)),
+                    on_chunk=lambda text: events.put_nowait(_sse("chunk", {"text": text})),
+                )
+                result.pop("reply", None)  # o texto já foi em chunks
+                events.put_nowait(_sse("done", result))
+            except Exception as e:
+                events.put_nowait(_sse("error", {"error": f"{type(e).__name__}: {e}"}))
+            finally:
+                events.put_nowait(None)
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        while (event := await events.get()) is not None:
+            writer.write(event)
+            await writer.drain()
+
+
+# =========================================================
+# Teste de carga
+# =========================================================
+def _seed_vault(vault_dir: Path, tasks: int = 15) -> List[str]:
+    store = TaskStore(SharedDatabaseManager(vault_dir))
+    items = [
+        TaskItem.create(f"Tarefa {i} relatório semanal", quadrant=("Q1", "Q2", "Q3", "Q4")[i % 4])
+        for i in range(tasks)
+    ]
+    for task in items:
+        store.insert(task)
+    store.db.close()
+    return [t.id for t in items]
+
+
+def _load_mix(task_ids: List[str]) -> List[Tuple[str, str, str, Optional[dict]]]:
+    """Roteiro repetido por cada conexão: (rótulo, método, caminho, corpo). Leituras dominam."""
+    mix: List[Tuple[str, str, str, Optional[dict]]] = [("GET /tasks", "GET", "/tasks", None)] * 6
+    mix.append(("GET /plan", "GET", "/plan", None))
+    mix.append(("GET /search", "GET", "/search?q=" + quote("relatório"), None))
+    mix.append(("POST /distractions", "POST", "/distractions", {"text": "ideia solta"}))
+    mix.append(("PATCH /tasks", "PATCH", f"/tasks/{task_ids[0]}", {"status": "DOING"}))
+    return mix
+
+
+async def _load_client(
+    host: str, port: int, token: str, mix: list, offset: int, deadline: float, warmup_until: float,
+    samples: Dict[str, List[float]], errors: List[int],
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while True:
+            label, method, path, payload = mix[i % len(mix)]
+            i += 1
+            body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+            request = (
+                f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAuthorization: Bearer {token}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode("latin-1") + body
+            t0 = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(re.search(rb"content-length:\s*(\d+)", head, re.I).group(1))
+            await reader.readexactly(length)
+            t1 = time.perf_counter()
+            if t1 >= deadline:
+                break
+            if t0 >= warmup_until:
+                samples.setdefault(label, []).append((t1 - t0) * 1000)
+                if not head.startswith((b"HTTP/1.1 200", b"HTTP/1.1 201")):
+                    errors.append(int(head[9:12]))
+    finally:
+        writer.close()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    return statistics.quantiles(values, n=1000)[int(pct * 1000) - 1] if len(values) > 1 else (values or [0.0])[0]
+
+
+async def _drive(
+    host: str, port: int, token: str, mix: list, connections: int, duration: float, warmup: float
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    warmup_until, deadline = start + warmup, start + warmup + duration
+    samples: Dict[str, List[float]] = {}
+    errors: List[int] = []
+    await asyncio.gather(*(
+        _load_client(host, port, token, mix, c, deadline, warmup_until, samples, errors) for c in range(connections)
+    ))
+    every = [v for values in samples.values() for v in values]
+    return {
+        "requests": len(every),
+        "rps": len(every) / duration,
+        "p50_ms": _percentile(every, 0.50),
+        "p99_ms": _percentile(every, 0.99),
+        "errors": len(errors),
+        "routes": {label: (len(v), _percentile(v, 0.99)) for label, v in sorted(samples.items())},
+    }
+
+
+def load_test(duration: float = 10.0, connections: int = 32, warmup: float = 2.0, cpu: int = 0) -> Dict[str, Any]:
+    """
+    Sobe o servidor num processo preso a um núcleo (`cpu`) e mede req/s sustentadas e latência.
+
+    `connections` clientes keep-alive repetem o roteiro de _load_mix sem pausa;
+    o aquecimento fica fora da conta. O agente não entra (chamadas de modelo
+    dependem da rede, não do servidor).
+    """
+    with tempfile.TemporaryDirectory(prefix="ops_api_load_") as tmp:
+        vault = Path(tmp)
+        task_ids = _seed_vault(vault)
+        proc = subprocess.Popen(
+            [sys.executable, __file__, "--vault", str(vault), "--port", "0", "--cpu", str(cpu)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+        try:
+            port = 0
+            for line in proc.stdout:
+                found = re.search(r"\[API\] ouvindo em http://[\d.]+:(\d+)", line)
+                if found:
+                    port = int(found.group(1))
+                    break
+            if not port:
+                raise RuntimeError("o servidor não subiu")
+            mix = _load_mix(task_ids)
+            stats = asyncio.run(_drive(DEFAULT_HOST, port, api_token(vault), mix, connections, duration, warmup))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print(f"{stats['requests']} requisições em {duration:.0f} s, {connections} conexões, servidor na CPU {cpu}")
+    print(f"  {stats['rps']:.0f} req/s  p50 {stats['p50_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms  erros {stats['errors']}")
+    for label, (count, p99) in stats["routes"].items():
+        print(f"  {label:<20} {count:>7}  p99 {p99:.2f} ms")
+    return stats
+
+
+async def _serve(vault_dir: Path, host: str, port: int, out: TextIO) -> None:
+    server = await OpsApiServer(vault_dir, host=host, port=port).start()
+    print(f"[API] ouvindo em http://{host}:{server.port} (vault {vault_dir})", file=out, flush=True)
+    print(f"[API] token em {vault_dir / TOKEN_FILE} (Authorization: Bearer ...)", file=out, flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="ops_api", description="API HTTP/JSON local do day ops.")
+    parser.add_argument("--vault", default=str(DEFAULT_VAULT))
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cpu", type=int, help="prende o processo a este núcleo (Linux)")
+    parser.add_argument("--load-test", action="store_true", help="mede req/s e p99 num vault temporário")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--connections", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    if args.load_test:
+        load_test(args.duration, args.connections, cpu=args.cpu or 0)
+        return 0
+    if args.cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {args.cpu})
+    # Avisos das stores vão para stderr, como no ops_cli
+    out = sys.stdout
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            asyncio.run(_serve(Path(args.vault).expanduser().resolve(), args.host, args.port, out))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,569 @@
+"""
+Entrada headless do day ops: tarefas, agente, plano e Google Calendar sem a UI Tk.
+
+Os subcomandos avulsos servem para scripts e cron. Dois modos processam
+muitos vaults: `batch` planeja uma lista de vaults de uma vez e `daemon` lê
+jobs JSON da entrada padrão, um por linha, e responde um JSON por linha na
+saída. Os dois passam pela mesma fila de jobs com um número fixo de workers,
+um cliente de modelo compartilhado e o serviço do Calendar em cache por vault.
+Uso: python ops_cli.py --help
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import sys
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from day_ops_core import (
+    ChatStore,
+    DailyOpsConfig,
+    DailyOpsRunner,
+    DatabaseManager,
+    DistractionStore,
+    PlanStore,
+    SearchStore,
+    StaleTaskError,
+    TASK_COLUMNS,
+    TASK_VOCABULARY,
+    TaskItem,
+    TaskStore,
+    current_plan,
+)
+from ops_plan_parser import PlanTask, parse_ops_plan
+
+DEFAULT_VAULT = Path.home() / ".ops_agent"
+DEFAULT_WORKERS = 4
+STATUSES = TASK_VOCABULARY["status"]
+# TaskItem é plano: cópia campo a campo, sem a recursão/deepcopy do asdict (caminho quente da API)
+TASK_FIELDS = tuple(f.name for f in fields(TaskItem))
+OPS = (
+    "parse", "tasks", "add", "status", "update", "remove", "distraction", "distractions", "clear_distractions",
+    "chat", "clear_chat", "plan", "search", "ask", "sync",
+)
+
+
+@dataclass
+class VaultSession:
+    """Stores de um vault e o runner do dia (criado no primeiro pedido ao agente)."""
+
+    path: Path
+    db: DatabaseManager
+    tasks: TaskStore
+    distractions: DistractionStore
+    chat: ChatStore
+    plans: PlanStore
+    runner: Optional[DailyOpsRunner] = None
+    runner_day: str = ""
+    # Pedidos ao agente e syncs do mesmo vault rodam um de cada vez (histórico e serviço do Calendar)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @staticmethod
+    def open(path: Path, db_factory: Callable[[Path], DatabaseManager] = DatabaseManager) -> "VaultSession":
+        path.mkdir(parents=True, exist_ok=True)
+        db = db_factory(path)
+        return VaultSession(path, db, TaskStore(db), DistractionStore(db), ChatStore(db), PlanStore(db))
+
+
+def task_dict(task: TaskItem) -> Dict[str, Any]:
+    return {name: getattr(task, name) for name in TASK_FIELDS}
+
+
+def clean_task_fields(changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida e normaliza campos de tarefa vindos de fora (CLI, daemon, API); erro vira ValueError."""
+    unknown = set(changes) - set(TASK_COLUMNS)
+    if unknown:
+        raise ValueError(f"campos desconhecidos: {', '.join(sorted(unknown))}")
+    clean: Dict[str, Any] = {}
+    for name, value in changes.items():
+        if name in ("active", "is_recurring"):
+            if not isinstance(value, bool):
+                raise ValueError(f"{name} deve ser true ou false")
+            clean[name] = value
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f"{name} deve ser texto")
+        value = value.strip()
+        if name in TASK_VOCABULARY:
+            value = value.upper()
+            if value not in TASK_VOCABULARY[name]:
+                raise ValueError(f"{name} inválido: {value!r} (use {', '.join(TASK_VOCABULARY[name])})")
+        elif name == "title" and not value:
+            raise ValueError("título vazio")
+        clean[name] = value
+    return clean
+
+
+def find_task(tasks: List[TaskItem], ref: str) -> TaskItem:
+    """Tarefa de hoje pelo id ou por um prefixo único dele."""
+    matches = [t for t in tasks if t.id == ref] or [t for t in tasks if t.id.startswith(ref)]
+    if not matches:
+        raise LookupError(f"tarefa não encontrada: {ref}")
+    if len(matches) > 1:
+        raise ValueError(f"prefixo ambíguo: {ref} ({', '.join(t.id for t in matches)})")
+    return matches[0]
+
+
+class OpsWorkers:
+    """
+    Fila de jobs sobre vários vaults com `max_workers` workers asyncio.
+
+    SQLite roda em `db_executor` (padrão: o executor do loop) e o Google
+    Calendar em threads próprias; as chamadas de modelo ficam no loop e usam
+    os mesmos clientes OpenAI para todos os vaults. Cada vault tem um runner
+    próprio (o histórico do chat é por vault e por dia), recriado na virada do
+    dia. O ops_api usa a mesma classe com uma conexão só (`db_factory`).
+    """
+
+    def __init__(
+        self,
+        config: DailyOpsConfig,
+        max_workers: int = DEFAULT_WORKERS,
+        sync_interactive: bool = False,
+        db_factory: Callable[[Path], DatabaseManager] = DatabaseManager,
+        db_executor: Optional[Executor] = None,
+    ) -> None:
+        self.config = config
+        self.max_workers = max(1, max_workers)
+        self.sync_interactive = sync_interactive
+        self.db_factory = db_factory
+        self.db_executor = db_executor
+        self._sessions: Dict[Path, VaultSession] = {}
+        self._clients: Optional[tuple] = None
+        self._queue: Optional["asyncio.Queue[tuple]"] = None
+        self._workers: List["asyncio.Task[None]"] = []
+
+    # ---------------- Fila ----------------
+    def start(self) -> "OpsWorkers":
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+        return self
+
+    def submit(self, job: Dict[str, Any]) -> "asyncio.Future[Dict[str, Any]]":
+        """Enfileira um job e devolve o future do resultado ({"ok": ..., "result"/"error": ...})."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, future))
+        return future
+
+    async def _worker(self) -> None:
+        while True:
+            job, future = await self._queue.get()
+            reply: Dict[str, Any] = {"id": job["id"]} if "id" in job else {}
+            try:
+                reply.update(ok=True, result=await self.run(job))
+            except Exception as e:
+                reply.update(ok=False, error=f"{type(e).__name__}: {e}")
+            if not future.done():
+                future.set_result(reply)
+            self._queue.task_done()
+
+    async def close(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for session in self._sessions.values():
+            if session.runner is not None:
+                await session.runner.close()
+        if self._clients is not None:
+            for client in self._clients:
+                if client is not None:
+                    await client.close()
+            self._clients = None
+
+    # ---------------- Vaults e clientes ----------------
+    def session(self, vault: Any) -> VaultSession:
+        path = Path(vault or DEFAULT_VAULT).expanduser().resolve()
+        session = self._sessions.get(path)
+        if session is None:
+            session = self._sessions[path] = VaultSession.open(path, self.db_factory)
+        return session
+
+    def _db(self, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        return asyncio.get_running_loop().run_in_executor(self.db_executor, functools.partial(fn, *args))
+
+    def _shared_clients(self) -> tuple:
+        if self._clients is None:
+            from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+            strong = None
+            if self.config.strong_model and self.config.strong_model != self.config.model:
+                strong = OpenAIChatCompletionClient(model=self.config.strong_model)
+            self._clients = (OpenAIChatCompletionClient(model=self.config.model), strong)
+        return self._clients
+
+    async def _runner(self, session: VaultSession) -> DailyOpsRunner:
+        today = datetime.now().strftime("%Y-%m-%d")
+        if session.runner is None or session.runner_day != today:
+            if session.runner is not None:
+                await session.runner.close()
+            history = await self._db(session.chat.load)
+            model_client, strong_client = self._shared_clients()
+            session.runner = DailyOpsRunner(
+                self.config, history=history, model_client=model_client, strong_client=strong_client
+            )
+            session.runner_day = today
+        return session.runner
+
+    # ---------------- Operações ----------------
+    async def run(self, job: Dict[str, Any], session: Optional[VaultSession] = None) -> Any:
+        op = job.get("op", "")
+        if op not in OPS:
+            raise ValueError(f"operação desconhecida: {op!r} (use {', '.join(OPS)})")
+        if op == "parse":
+            return [asdict(t) for t in parse_ops_plan(job.get("text", ""))]
+
+        session = session or self.session(job.get("vault"))
+        if op == "tasks":
+            return [task_dict(t) for t in await self._db(session.tasks.load_today)]
+        if op == "add":
+            values = clean_task_fields({
+                "title": job.get("title"),
+                "notes": job.get("notes", ""),
+                "quadrant": job.get("quadrant", "Q2"),
+                "period": job.get("period", "FLEXÍVEL"),
+                "is_recurring": bool(job.get("recurring", False)),
+            })
+            task = TaskItem.create(values.pop("title"), **values)
+            await self._db(session.tasks.insert, task)
+            return task_dict(task)
+        if op == "status":
+            return task_dict(await self._db(self._set_status, session, job["task"], job["status"]))
+        if op == "update":
+            task = await self._db(self._update, session, job["task"], job.get("changes", {}), job.get("row_version"))
+            return task_dict(task)
+        if op == "remove":
+            return task_dict(await self._db(self._remove, session, job["task"]))
+        if op == "distraction":
+            await self._db(session.distractions.add, job["text"])
+            return {"added": job["text"]}
+        if op == "distractions":
+            return await self._db(session.distractions.load)
+        if op == "clear_distractions":
+            await self._db(session.distractions.clear)
+            return {"cleared": True}
+        if op == "chat":
+            return await self._db(session.chat.load)
+        if op == "clear_chat":
+            async with session.lock:
+                await self._db(session.chat.clear)
+                if session.runner is not None:
+                    session.runner.clear_history()
+            return {"cleared": True}
+        if op == "plan":
+            history = session.runner.history if session.runner is not None else await self._db(session.chat.load)
+            plan, text = await self._db(current_plan, session.chat, session.plans, history)
+            return {"plan": [asdict(t) for t in plan], "text": text}
+        if op == "search":
+            hits = await self._db(SearchStore(session.db).search, job["query"], int(job.get("limit", 50)))
+            return [asdict(h) for h in hits]
+        if op == "ask":
+            return await self.ask(session, job["message"], sync=bool(job.get("sync", False)))
+        return await self.sync(session, job.get("text"))
+
+    @staticmethod
+    def _apply_changes(task: TaskItem, changes: Dict[str, Any]) -> None:
+        """Aplica campos já validados com a mesma regra da UI: DONE desativa, sair de DONE reativa."""
+        status = changes.get("status", task.status)
+        if "active" not in changes and status != task.status:
+            if status == "DONE":
+                task.active = False
+            elif task.status == "DONE":
+                task.active = True
+        for name, value in changes.items():
+            setattr(task, name, value)
+
+    @staticmethod
+    def _set_status(session: VaultSession, ref: str, status: str) -> TaskItem:
+        changes = clean_task_fields({"status": status})
+        task = find_task(session.tasks.load_today(), ref)
+        OpsWorkers._apply_changes(task, changes)
+        session.tasks.update(task)
+        return task
+
+    @staticmethod
+    def _update(session: VaultSession, task_id: str, changes: Dict[str, Any], row_version: Optional[int]) -> TaskItem:
+        """Grava `changes` sobre a linha atual; com `row_version`, só se ninguém a alterou desde essa versão."""
+        changes = clean_task_fields(changes)
+        task = session.tasks.fetch([task_id]).get(task_id)
+        if task is None:
+            raise LookupError(f"tarefa não encontrada: {task_id}")
+        if row_version is not None and row_version != task.row_version:
+            raise StaleTaskError(task_id)
+        OpsWorkers._apply_changes(task, changes)
+        session.tasks.update(task)
+        return task
+
+    @staticmethod
+    def _remove(session: VaultSession, ref: str) -> TaskItem:
+        task = find_task(session.tasks.load_today(), ref)
+        session.tasks.delete(task)
+        return task
+
+    async def ask(
+        self, session: VaultSession, message: str, sync: bool = False, on_chunk: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """Pedido ao agente com o mesmo contexto da UI; a resposta vira histórico e, com plano, nova versão."""
+        async with session.lock:
+            runner = await self._runner(session)
+            tasks, (plan_tasks, last_output) = await asyncio.gather(
+                self._db(session.tasks.load_today),
+                self._db(current_plan, session.chat, session.plans, runner.history),
+            )
+            replies: List[str] = []
+            await runner.ask_stream(
+                user_message=message,
+                tasks=tasks,
+                on_chunk=on_chunk or (lambda chunk: None),
+                last_plan=last_output,
+                on_final=replies.append,
+                plan_tasks=plan_tasks,
+            )
+            plan = list(runner.last_plan_tasks)
+            result: Dict[str, Any] = {"reply": replies[-1] if replies else "", "plan": [asdict(t) for t in plan]}
+            result.update(await self._db(self._save_reply, session, runner.history, plan))
+            if sync and plan:
+                result["sync"] = await asyncio.to_thread(self._sync_plan, session, plan)
+        return result
+
+    @staticmethod
+    def _save_reply(session: VaultSession, history: List[Dict[str, str]], plan: List[PlanTask]) -> Dict[str, Any]:
+        message_ids = session.chat.save(history)
+        if not plan:
+            # Resposta sem plano (ex.: só uma dúvida) mantém a versão vigente
+            return {}
+        version = session.plans.save_version(plan, message_ids[-1] if message_ids else None)
+        diff = session.plans.diff_latest()
+        return {"plan_version": version, "diff": diff.summary() if diff is not None and not diff.empty else ""}
+
+    async def sync(self, session: VaultSession, text: Optional[str] = None) -> Dict[str, Any]:
+        """Sincroniza com o Calendar o plano em `text` ou, sem texto, o plano vigente do vault."""
+        async with session.lock:
+            plan = parse_ops_plan(text) if text else await self._db(session.plans.load_today)
+            if not plan:
+                raise ValueError("nenhum plano para sincronizar")
+            return await asyncio.to_thread(self._sync_plan, session, plan)
+
+    def _sync_plan(self, session: VaultSession, plan: List[PlanTask]) -> Dict[str, Any]:
+        from gcal_sync import sync_plan_tasks
+
+        return sync_plan_tasks(tasks=plan, vault_dir=session.path, interactive=self.sync_interactive)
+
+
+# =========================================================
+# Linha de comando
+# =========================================================
+def _print_tasks(tasks: List[Dict[str, Any]], out: TextIO) -> None:
+    for t in tasks:
+        mark = "✅" if t["status"] == "DONE" else "•"
+        recurring = " ↻" if t["is_recurring"] else ""
+        inactive = "" if t["active"] else " (fora do plano)"
+        print(f"{t['id']}  {mark} [{t['quadrant']}/{t['period']}] {t['title']}{recurring}{inactive}", file=out)
+
+
+def _print_result(op: str, result: Any, as_json: bool, out: TextIO) -> None:
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False, indent=2), file=out)
+    elif op == "tasks":
+        _print_tasks(result, out)
+    elif op in ("add", "status", "remove"):
+        _print_tasks([result], out)
+    elif op == "parse":
+        print("\n".join(PlanTask(**t).to_line() for t in result) or "Nenhum bloco de plano encontrado.", file=out)
+    elif op == "ask":
+        # O texto já saiu em streaming
+        if result.get("diff"):
+            print(f"\n[plano atualizado: {result['diff']} blocos]", file=out)
+        if "sync" in result:
+            print(f"[calendar: {result['sync']['created']} eventos, {result['sync']['cleaned']} removidos]", file=out)
+    elif op == "sync":
+        print(f"Calendar: {result['created']} eventos criados, {result['cleaned']} removidos.", file=out)
+    else:
+        print(result, file=out)
+
+
+def _read_text(source: Optional[str]) -> str:
+    if not source or source == "-":
+        return sys.stdin.read()
+    return Path(source).read_text(encoding="utf-8")
+
+
+async def _run_one(workers: OpsWorkers, job: Dict[str, Any], as_json: bool, out: TextIO) -> int:
+    try:
+        if job["op"] == "ask":
+            stream = None if as_json else (lambda chunk: print(chunk, end="", flush=True, file=out))
+            result = await workers.ask(workers.session(job["vault"]), job["message"], job["sync"], stream)
+        else:
+            result = await workers.run(job)
+    except Exception as e:
+        print(f"erro: {e}", file=sys.stderr)
+        return 1
+    _print_result(job["op"], result, as_json, out)
+    return 0
+
+
+async def run_batch(workers: OpsWorkers, vaults: List[str], message: str, sync: bool, out: TextIO) -> int:
+    """Mesmo pedido ao agente em vários vaults; uma linha JSON por vault, na ordem em que terminam."""
+    futures = [workers.submit({"id": v, "op": "ask", "vault": v, "message": message, "sync": sync}) for v in vaults]
+    failed = 0
+    for future in asyncio.as_completed(futures):
+        reply = await future
+        failed += not reply["ok"]
+        if reply["ok"]:
+            # O texto completo fica no histórico do vault; aqui só o resumo do plano
+            reply["result"].pop("reply", None)
+        print(json.dumps(reply, ensure_ascii=False), flush=True, file=out)
+    return 1 if failed else 0
+
+
+async def run_daemon(workers: OpsWorkers, out: TextIO) -> int:
+    """Lê jobs JSON da entrada padrão até EOF; cada resultado sai numa linha assim que fica pronto."""
+    loop = asyncio.get_running_loop()
+    pending = set()
+
+    def emit(future: "asyncio.Future[Dict[str, Any]]") -> None:
+        pending.discard(future)
+        print(json.dumps(future.result(), ensure_ascii=False), flush=True, file=out)
+
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("job deve ser um objeto JSON")
+        except ValueError as e:
+            print(json.dumps({"ok": False, "error": f"job inválido: {e}"}, ensure_ascii=False), flush=True, file=out)
+            continue
+        future = workers.submit(job)
+        pending.add(future)
+        future.add_done_callback(emit)
+    # EOF: termina o que já está na fila antes de sair
+    if pending:
+        await asyncio.wait(pending)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ops_cli", description="Day ops sem a UI: tarefas, agente e Calendar.")
+    parser.add_argument("--vault", default=str(DEFAULT_VAULT), help="pasta do vault (padrão: ~/.ops_agent)")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("tasks", help="lista as tarefas de hoje (faz o rollover na virada)")
+
+    p = sub.add_parser("add", help="adiciona uma tarefa")
+    p.add_argument("title")
+    p.add_argument("-q", "--quadrant", default="Q2", type=str.upper, choices=TASK_VOCABULARY["quadrant"])
+    p.add_argument("-p", "--period", default="FLEXÍVEL", type=str.upper, choices=TASK_VOCABULARY["period"])
+    p.add_argument("--notes", default="")
+    p.add_argument("--recurring", action="store_true")
+
+    p = sub.add_parser("status", help="muda o status de uma tarefa (id ou prefixo)")
+    p.add_argument("task")
+    p.add_argument("status", type=str.upper, choices=STATUSES)
+
+    p = sub.add_parser("done", help="marca uma tarefa como DONE")
+    p.add_argument("task")
+
+    p = sub.add_parser("rm", help="remove uma tarefa")
+    p.add_argument("task")
+
+    p = sub.add_parser("distraction", help="anota uma distração para o próximo planejamento")
+    p.add_argument("text")
+
+    p = sub.add_parser("ask", help="pede ao agente (resposta em streaming)")
+    p.add_argument("message")
+    p.add_argument("--sync", action="store_true", help="sincroniza o plano da resposta com o Calendar")
+
+    p = sub.add_parser("parse-plan", help="extrai o plano de um texto no formato do agente")
+    p.add_argument("file", nargs="?", help="arquivo (padrão: entrada padrão)")
+
+    p = sub.add_parser("sync", help="sincroniza com o Calendar o plano vigente ou o de um texto")
+    p.add_argument("file", nargs="?", help="texto com o plano ('-' para entrada padrão)")
+
+    p = sub.add_parser("batch", help="mesmo pedido ao agente em vários vaults")
+    p.add_argument("vaults", nargs="+")
+    p.add_argument("-m", "--message", required=True)
+    p.add_argument("--sync", action="store_true")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+
+    p = sub.add_parser("daemon", help="processa jobs JSON (um por linha) da entrada padrão")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+
+    sub.add_parser("usage", help="latência e custo por modelo do day ops")
+    return parser
+
+
+def _job(args: argparse.Namespace) -> Dict[str, Any]:
+    command = args.command
+    vault = args.vault
+    if command == "tasks":
+        return {"op": "tasks", "vault": vault}
+    if command == "add":
+        return {
+            "op": "add", "vault": vault, "title": args.title, "quadrant": args.quadrant,
+            "period": args.period, "notes": args.notes, "recurring": args.recurring,
+        }
+    if command in ("status", "done"):
+        return {"op": "status", "vault": vault, "task": args.task, "status": getattr(args, "status", "DONE")}
+    if command == "rm":
+        return {"op": "remove", "vault": vault, "task": args.task}
+    if command == "distraction":
+        return {"op": "distraction", "vault": vault, "text": args.text}
+    if command == "ask":
+        return {"op": "ask", "vault": vault, "message": args.message, "sync": args.sync}
+    if command == "parse-plan":
+        return {"op": "parse", "text": _read_text(args.file)}
+    if command == "sync":
+        return {"op": "sync", "vault": vault, "text": _read_text(args.file) if args.file else None}
+    raise ValueError(command)
+
+
+async def _main(args: argparse.Namespace, out: TextIO) -> int:
+    config = DailyOpsConfig(model=args.model, structured_plan=True)
+    if args.command in ("batch", "daemon"):
+        workers = OpsWorkers(config, max_workers=args.workers).start()
+        try:
+            if args.command == "batch":
+                return await run_batch(workers, args.vaults, args.message, args.sync, out)
+            return await run_daemon(workers, out)
+        finally:
+            await workers.close()
+
+    # Comando avulso: no terminal o OAuth do Calendar pode abrir o navegador
+    workers = OpsWorkers(config, max_workers=1, sync_interactive=sys.stdin.isatty())
+    try:
+        return await _run_one(workers, _job(args), args.json, out)
+    finally:
+        await workers.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "usage":
+        from model_tiers import tier_report
+        from usage_meter import get_usage_meter
+
+        print(tier_report(get_usage_meter(), "daily_ops"))
+        return 0
+    # Avisos das stores (abertura do banco, rollover) vão para stderr: stdout fica só com resultados
+    out = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        return asyncio.run(_main(args, out))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
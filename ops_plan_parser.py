@@ -1,6 +1,7 @@
+import json
 import re
-from dataclasses import dataclass
-from typing import List
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
 
 # Busca a ÚLTIMA ocorrência do bloco "2) Plano"
 PLAN_BLOCK_RE = re.compile(r"2\)\s*(?:Plano|Cronograma).*?\n(.*?)(?=\n\s*3\)|$)", re.S | re.I)
@@ -9,12 +10,121 @@ PLAN_BLOCK_RE = re.compile(r"2\)\s*(?:Plano|Cronograma).*?\n(.*?)(?=\n\s*3\)|$)"
 LINE_RE = re.compile(r"^\s*-\s*(\d{2}:\d{2})\s*[\-–—]\s*(\d{2}:\d{2})\s*[\-–—]?\s*(\[.*?\])?\s*(.*)", re.M)
 
 
+# Bloco JSON do modo estruturado (```json {"plan": [...]} ```), sempre o último da resposta
+PLAN_JSON_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.S | re.I)
+JSON_FENCE = "```json"
+HHMM_RE = re.compile(r"^([01]?\d|2[0-3]):[0-5]\d$")
+PRIORITY_RE = re.compile(r"^P\d$")
+
+PLAN_CATEGORIES = ("TRABALHO FOCADO", "TRABALHO SUPERFICIAL", "POWER UP", "BUFFER")
+
+
 @dataclass
 class PlanTask:
     start: str
     end: str
     title: str
     priority: str = "P2"
+    category: str = ""
+
+    def to_line(self) -> str:
+        """Linha no formato do OPS_SYSTEM (para o contexto do agente)."""
+        category = f"[{self.category}] " if self.category else ""
+        return f"- {self.start}–{self.end} — {category}{self.title} ({self.priority})"
+
+
+def format_plan(tasks: List[PlanTask]) -> str:
+    return "2) Plano\n" + "\n".join(t.to_line() for t in tasks)
+
+
+def validate_plan(data) -> List[PlanTask]:
+    """Valida o JSON do modo estruturado ({"plan": [...]}) e devolve PlanTasks tipadas."""
+    items = data.get("plan") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError("JSON sem lista 'plan'")
+    tasks: List[PlanTask] = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"item {i} não é um objeto")
+        start, end = str(item.get("start", "")).strip(), str(item.get("end", "")).strip()
+        title = str(item.get("title", "")).strip()
+        if not HHMM_RE.match(start) or not HHMM_RE.match(end):
+            raise ValueError(f"item {i}: horário inválido ({start}–{end})")
+        if not title:
+            raise ValueError(f"item {i}: título vazio")
+        priority = str(item.get("priority", "P2")).strip().upper() or "P2"
+        if not PRIORITY_RE.match(priority):
+            raise ValueError(f"item {i}: prioridade inválida ({priority})")
+        category = " ".join(str(item.get("category", "")).strip().strip("[]").upper().split())
+        if category not in PLAN_CATEGORIES:
+            raise ValueError(f"item {i}: categoria inválida ({category or 'vazia'})")
+        tasks.append(PlanTask(start=start.zfill(5), end=end.zfill(5), title=title, priority=priority, category=category))
+    return tasks
+
+
+def strip_json_plan(text: str, final: bool = True) -> str:
+    """
+    Resposta sem o bloco ```json do modo estruturado (o que vai para a tela e o histórico).
+    No meio do stream (final=False) também esconde um bloco ainda aberto e um
+    possível começo de cerca, para que o prefixo exibido nunca precise ser desfeito.
+    """
+    visible = PLAN_JSON_RE.sub("", text or "")
+    lowered = visible.lower()
+    opened = lowered.find(JSON_FENCE)
+    if opened >= 0:
+        visible = visible[:opened]
+    elif not final:
+        for k in range(len(JSON_FENCE) - 1, 0, -1):
+            if lowered.endswith(JSON_FENCE[:k]):
+                return visible[:-k]
+    return visible.rstrip() if final else visible
+
+
+def extract_json_plan(text: str) -> Optional[List[PlanTask]]:
+    """Plano do último bloco ```json da resposta; None se não houver bloco válido."""
+    blocks = PLAN_JSON_RE.findall(text or "")
+    if not blocks:
+        return None
+    try:
+        return validate_plan(json.loads(blocks[-1]))
+    except ValueError:  # inclui json.JSONDecodeError
+        return None
+
+
+@dataclass
+class PlanDiff:
+    added: List[PlanTask] = field(default_factory=list)
+    removed: List[PlanTask] = field(default_factory=list)
+    changed: List[Tuple[PlanTask, PlanTask]] = field(default_factory=list)  # (antes, depois): horário/prioridade/categoria
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return f"+{len(self.added)} -{len(self.removed)} ~{len(self.changed)}"
+
+
+def diff_plans(old: List[PlanTask], new: List[PlanTask]) -> PlanDiff:
+    """Compara dois planos casando blocos pelo título (na ordem, para títulos repetidos)."""
+    pending: Dict[str, List[PlanTask]] = {}
+    for t in old:
+        pending.setdefault(t.title.casefold(), []).append(t)
+    diff = PlanDiff()
+    for t in new:
+        same_title = pending.get(t.title.casefold())
+        if not same_title:
+            diff.added.append(t)
+            continue
+        before = same_title.pop(0)
+        if before != t:
+            diff.changed.append((before, t))
+    diff.removed = [t for remaining in pending.values() for t in remaining]
+    return diff
+
+
+def plan_to_json(tasks: List[PlanTask]) -> str:
+    return json.dumps({"plan": [asdict(t) for t in tasks]}, ensure_ascii=False)
 
 
 def parse_ops_plan(text: str) -> List[PlanTask]:
@@ -44,6 +154,9 @@ def parse_ops_plan(text: str) -> List[PlanTask]:
         
         # O título final não deve conter a categoria [TRABALHO FOCADO]
         # pois ela já vem no parâmetro 'category' da regex LINE_RE
-        tasks.append(PlanTask(start=start, end=end, title=title_clean, priority=prio))
+        tasks.append(PlanTask(
+            start=start, end=end, title=title_clean, priority=prio,
+            category=category.strip("[] ").upper(),
+        ))
 
     return tasks
\ No newline at end of file
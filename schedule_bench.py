@@ -0,0 +1,36 @@
+"""
+Benchmark do agendador local (schedule_day) com n tarefas sintéticas.
+
+Mede o tempo médio por plano e mostra quantos blocos couberam e quantas
+tarefas ficaram fora do dia. As regras do OPS_SYSTEM são conferidas pelos
+testes (test_schedule.py). Uso: python schedule_bench.py
+"""
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+from day_ops_core import TaskItem, schedule_day
+
+QUADRANTS = ("Q1", "Q2", "Q3", "Q4")
+PERIODS = ("FLEXÍVEL", "MANHÃ", "TARDE", "NOITE")
+
+
+def benchmark_schedule(sizes: Tuple[int, ...] = (10, 50, 100, 250, 500), repeats: int = 20) -> Dict[int, float]:
+    """Tempo médio (ms) de schedule_day para cada tamanho de lista."""
+    now = datetime.now().replace(hour=7, minute=3)
+    results: Dict[int, float] = {}
+    for n in sizes:
+        tasks = [
+            TaskItem(id=str(i), title=f"Tarefa {i}", quadrant=QUADRANTS[i % 4], period=PERIODS[(i // 4) % 4], created_at=float(i))
+            for i in range(n)
+        ]
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            result = schedule_day(tasks, now)
+        results[n] = (time.perf_counter() - t0) * 1000 / repeats
+        print(f"{n:>4} tarefas: {results[n]:.2f} ms ({len(result.plan)} blocos, {len(result.overflow)} fora do dia)")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_schedule()
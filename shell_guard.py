@@ -0,0 +1,194 @@
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock, CodeExecutor, CodeResult
+
+from file_materializer import FileMaterializer, MaterializePlan, command_lines, split_block
+
+if TYPE_CHECKING:
+    from dev_team_termination import MissionProgress
+
+# Veredito da análise estática de um bloco
+NOOP = "noop"     # só comentários/linhas vazias: nada a executar
+WRITE = "write"   # apenas mkdir -p + heredocs: materializado em processo, sem executor
+EXEC = "exec"     # comandos reais (após o prefixo de escritas): vão para o executor com orçamento
+DENY = "deny"     # destrutivo ou patológico: não executa
+
+SHELL_LANGUAGES = {"sh", "bash", "shell", "zsh"}
+# Rodam pelo mesmo wrapper de orçamento, via heredoc para o interpretador
+PYTHON_LANGUAGES = {"python", "python3", "py"}
+
+# Comandos destrutivos (substitui a checagem por substring do safe_approval_func)
+DENY_PATTERNS = [
+    (re.compile(r"\brm\s+(-[a-z]*r[a-z]*f[a-z]*|-[a-z]*f[a-z]*r[a-z]*)\s+(--no-preserve-root\s+)?/(\*|\s|$)", re.I), "rm -rf /"),
+    (re.compile(r"\bmkfs(\.\w+)?\b", re.I), "mkfs"),
+    (re.compile(r"(^|[;&|]\s*)format\s", re.I | re.M), "format"),
+    (re.compile(r"\bdd\b[^\n]*\bof=/dev/(sd|nvme|hd|disk)", re.I), "dd em dispositivo"),
+    (re.compile(r":\(\)\s*\{\s*:\s*\|\s*:\s*&\s*\}\s*;\s*:"), "fork bomb"),
+    # Só em posição de comando: `grep -rn halt src/` ou `echo "reboot required"` são inofensivos
+    (re.compile(r"(^\s*|[;&|(]\s*|\bsudo\s+)(shutdown|reboot|halt|poweroff)\b", re.M), "desligamento do host"),
+]
+
+# Padrões que só queimam tempo/disco do executor
+PATHOLOGICAL_PATTERNS = [
+    (re.compile(r"\bwhile\s+(true|:|\[\s*1\s*\]|\(\(\s*1\s*\)\))\s*;?\s*do\b"), "loop infinito"),
+    (re.compile(r"\bfor\s*\(\(\s*;\s*;\s*\)\)"), "loop infinito"),
+    (re.compile(r"\bsleep\s+(infinity|\d{4,})\b"), "sleep longo"),
+    (re.compile(r"(^|[|;&]\s*)yes(\s|$)"), "yes sem limite"),
+    (re.compile(r"\bdd\b[^\n]*\bif=/dev/(zero|urandom|random)\b(?![^\n]*\bcount=)"), "dd sem count"),
+    (re.compile(r"\b(fallocate\s+-l|truncate\s+-s)\s*\d+[GT]\b", re.I), "arquivo gigante"),
+]
+
+
+@dataclass(frozen=True)
+class ExecutionBudget:
+    cpu_seconds: int = 60          # ulimit -t
+    wall_seconds: int = 120        # timeout
+    max_file_bytes: int = 50 * 1024 * 1024  # ulimit -f
+    max_output_chars: int = 8000   # saída devolvida ao modelo
+
+
+@dataclass
+class ScanResult:
+    verdict: str
+    reason: str = ""
+    plan: MaterializePlan = field(default_factory=MaterializePlan)
+
+
+def scan(code: str) -> ScanResult:
+    """Análise estática rápida de um bloco de shell gerado pelo CODER."""
+    text = code or ""
+    commands = command_lines(text)
+    for pattern, reason in DENY_PATTERNS:
+        if pattern.search(commands):
+            return ScanResult(DENY, f"comando destrutivo ({reason})")
+    for pattern, reason in PATHOLOGICAL_PATTERNS:
+        if pattern.search(commands):
+            return ScanResult(DENY, f"comando patológico ({reason})")
+
+    if not any(l.strip() and not l.strip().startswith("#") for l in text.splitlines()):
+        return ScanResult(NOOP, "bloco vazio")
+
+    plan = split_block(text)
+    if plan.has_files and not plan.remaining:
+        return ScanResult(WRITE, plan=plan)
+    return ScanResult(EXEC, plan=plan)
+
+
+def wrap_with_budget(code: str, budget: ExecutionBudget) -> str:
+    """Envolve o bloco com limites de CPU, tempo de parede e tamanho de arquivo."""
+    blocks_512 = max(1, budget.max_file_bytes // 512)
+    escaped = code.replace("'", "'\\''")
+    return (
+        f"ulimit -t {budget.cpu_seconds} 2>/dev/null\n"
+        f"ulimit -f {blocks_512} 2>/dev/null\n"
+        f"if command -v timeout >/dev/null 2>&1; then\n"
+        f"  timeout {budget.wall_seconds} sh -c '{escaped}'\n"
+        f"else\n"
+        f"  sh -c '{escaped}'\n"
+        f"fi"
+    )
+
+
+def python_as_shell(code: str) -> str:
+    """Bloco python como comando sh (stdin do interpretador), para passar pelo wrap_with_budget."""
+    tag = "DEV_TEAM_PY"
+    while any(line.strip() == tag for line in code.splitlines()):
+        tag += "_"
+    return f"python3 - <<'{tag}'\n{code}\n{tag}"
+
+
+def truncate_output(output: str, limit: int) -> str:
+    if len(output) <= limit:
+        return output
+    half = limit // 2
+    return f"{output[:half]}\n... [saída truncada: {len(output) - limit} caracteres omitidos] ...\n{output[-half:]}"
+
+
+class GuardedCodeExecutor(CodeExecutor):
+    """
+    Estágio de pré-execução na frente do executor real.
+
+    Blocos destrutivos/patológicos são recusados sem custo; as escritas via
+    heredoc são materializadas em processo pelo FileMaterializer (sem ida ao
+    container) e só os comandos reais restantes rodam no executor, com
+    orçamento de CPU/tempo/saída. Blocos python passam pelo mesmo orçamento;
+    outras linguagens são recusadas.
+    """
+
+    def __init__(
+        self,
+        inner: CodeExecutor,
+        materializer: FileMaterializer,
+        budget: ExecutionBudget = ExecutionBudget(),
+        progress: Optional["MissionProgress"] = None,
+    ) -> None:
+        self._inner = inner
+        self._materializer = materializer
+        self._budget = budget
+        self._progress = progress
+        self.executor_calls = 0
+        self.skipped_calls = 0
+
+    async def execute_code_blocks(self, code_blocks: List[CodeBlock], cancellation_token: CancellationToken) -> CodeResult:
+        outputs: List[str] = []
+        exit_code = 0
+        for block in code_blocks:
+            language = block.language.lower()
+            if language in SHELL_LANGUAGES:
+                result = await self._execute_shell(block, cancellation_token)
+            elif language in PYTHON_LANGUAGES:
+                result = await self._execute_budgeted(python_as_shell(block.code), cancellation_token)
+            else:
+                # Sem como aplicar ulimit/timeout: nada roda fora do orçamento
+                result = CodeResult(exit_code=1, output=f"BLOQUEADO: linguagem '{block.language}' não suportada (use sh ou python)")
+            if result.output:
+                outputs.append(result.output)
+            exit_code = result.exit_code
+            if exit_code != 0:
+                break
+        output = "\n".join(outputs)
+        if self._progress is not None:
+            self._progress.record_execution(exit_code, output)
+        return CodeResult(exit_code=exit_code, output=truncate_output(output, self._budget.max_output_chars))
+
+    async def _execute_shell(self, block: CodeBlock, cancellation_token: CancellationToken) -> CodeResult:
+        result = scan(block.code)
+        if result.verdict == DENY:
+            return CodeResult(exit_code=1, output=f"BLOQUEADO pelo pré-scanner: {result.reason}")
+        if result.verdict == NOOP:
+            self.skipped_calls += 1
+            return CodeResult(exit_code=0, output="")
+
+        output = ""
+        if result.plan.has_files:
+            try:
+                written = self._materializer.apply(result.plan)
+            except OSError as e:
+                return CodeResult(exit_code=1, output=f"Falha ao escrever arquivos: {e}")
+            output = f"Arquivos escritos: {', '.join(written)}" if written else ""
+        if result.verdict == WRITE:
+            self.skipped_calls += 1
+            return CodeResult(exit_code=0, output=output)
+
+        # Só os comandos reais vão para o executor
+        executed = await self._execute_budgeted(result.plan.remaining or block.code, cancellation_token)
+        combined = "\n".join(part for part in (output, executed.output) if part)
+        return CodeResult(exit_code=executed.exit_code, output=combined)
+
+    async def _execute_budgeted(self, code: str, cancellation_token: CancellationToken) -> CodeResult:
+        self.executor_calls += 1
+        wrapped = CodeBlock(code=wrap_with_budget(code, self._budget), language="sh")
+        return await self._inner.execute_code_blocks([wrapped], cancellation_token)
+
+    async def restart(self) -> None:
+        await self._inner.restart()
+
+    async def start(self) -> None:
+        # O ciclo de vida do executor real é do ExecutorPool
+        pass
+
+    async def stop(self) -> None:
+        pass
@@ -0,0 +1,91 @@
+"""
+Benchmark de partida a frio do day_ops_ui: tempo de import e módulos pesados.
+
+Roda `python -X importtime -c "import day_ops_ui"` em processos novos, pega o
+tempo cumulativo do import de topo (mediana das rodadas) e falha se passar do
+orçamento ou se algum módulo pesado (autogen, OpenAI, Google, NumPy) entrar no
+caminho de partida. Uso: python startup_bench.py [orçamento_ms]
+"""
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ENTRY_MODULE = "day_ops_ui"
+DEFAULT_BUDGET_MS = 250.0
+# Prefixos que só podem ser importados depois do primeiro frame
+HEAVY_PREFIXES = (
+    "autogen_agentchat",
+    "autogen_core",
+    "autogen_ext",
+    "openai",
+    "google",
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "gcal_sync",
+    "usage_meter",
+    "model_tiers",
+    "numpy",
+    "ops_analytics",
+)
+
+
+def _import_times(module: str) -> Dict[str, int]:
+    """Módulo → tempo cumulativo (µs) de um import a frio em processo novo."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).resolve().parent,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} falhou:\n{proc.stderr[-2000:]}")
+
+    times: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+def _heavy(times: Dict[str, int]) -> List[str]:
+    return sorted(m for m in times if m.split(".")[0] in HEAVY_PREFIXES)
+
+
+def measure(module: str = ENTRY_MODULE, runs: int = 5) -> Tuple[float, List[str]]:
+    """(mediana em ms do import cumulativo de `module`, módulos pesados carregados)."""
+    samples: List[float] = []
+    heavy: List[str] = []
+    for _ in range(runs):
+        times = _import_times(module)
+        samples.append(times.get(module, 0) / 1000)
+        heavy = _heavy(times)
+    return statistics.median(samples), heavy
+
+
+def main(budget_ms: float = DEFAULT_BUDGET_MS, runs: int = 5) -> int:
+    elapsed, heavy = measure(ENTRY_MODULE, runs)
+    print(f"import {ENTRY_MODULE}: {elapsed:.1f} ms (mediana de {runs}, orçamento {budget_ms:.0f} ms)")
+
+    failed = False
+    if heavy:
+        failed = True
+        print("FALHA: módulos pesados no caminho de partida:")
+        for name in heavy:
+            print(f"  {name}")
+    if elapsed > budget_ms:
+        failed = True
+        print(f"FALHA: partida acima do orçamento ({elapsed:.1f} > {budget_ms:.0f} ms)")
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS))
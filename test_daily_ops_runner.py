@@ -0,0 +1,64 @@
+"""DailyOpsRunner no modo estruturado com um cliente de modelo roteirizado (sem rede)."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("autogen_agentchat")
+pytest.importorskip("autogen_ext.models.replay")
+
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from day_ops_core import DailyOpsConfig, DailyOpsRunner, TaskItem
+from model_tiers import FAST, STRONG
+from ops_plan_parser import PlanTask
+from usage_meter import UsageMeter
+
+ANSWER = "1) Foco\nRelatório primeiro.\n2) Plano\n- 09:00–10:30 — [TRABALHO FOCADO] Relatório (P1)\n3) Riscos\nNenhum."
+PLAN_JSON = (
+    '```json\n{"plan": [{"start": "09:00", "end": "10:30", "category": "TRABALHO FOCADO", '
+    '"title": "Relatório", "priority": "P1"}]}\n```'
+)
+
+
+def _ask(tmp_path, reply: str):
+    runner = DailyOpsRunner(
+        DailyOpsConfig(structured_plan=True, strong_model=None),
+        meter=UsageMeter(tmp_path / "usage.db"),
+        model_client=ReplayChatCompletionClient([reply]),
+    )
+    chunks, finals = [], []
+    tasks = [TaskItem(id="a", title="Relatório", quadrant="Q1")]
+    asyncio.run(runner.ask_stream("planeje meu dia", tasks, chunks.append, on_final=finals.append))
+    return runner, "".join(chunks), finals
+
+
+def test_structured_reply_reaches_chat_without_prompt_or_json(tmp_path):
+    runner, streamed, finals = _ask(tmp_path, f"{ANSWER}\n\n{PLAN_JSON}")
+    assert finals == [ANSWER]
+    assert streamed.rstrip() == ANSWER
+    assert runner.history[-1] == {"role": "assistant", "content": ANSWER}
+    assert "CONTEXTO DO SISTEMA" not in streamed
+    assert runner.last_plan_tasks == [PlanTask("09:00", "10:30", "Relatório", "P1", "TRABALHO FOCADO")]
+
+
+def test_structured_reply_without_json_falls_back_to_text_plan(tmp_path):
+    runner, streamed, finals = _ask(tmp_path, ANSWER)
+    assert finals == [ANSWER]
+    assert streamed == ANSWER
+    assert [t.title for t in runner.last_plan_tasks] == ["Relatório"]
+
+
+def test_strong_model_only_after_a_reply_without_plan(tmp_path):
+    runner = DailyOpsRunner(
+        DailyOpsConfig(model="gpt-4o-mini", strong_model="gpt-4o", structured_plan=True),
+        meter=UsageMeter(tmp_path / "usage.db"),
+        model_client=ReplayChatCompletionClient(["Sem plano por enquanto.", ANSWER]),
+        strong_client=ReplayChatCompletionClient([ANSWER]),
+    )
+    tiers = []
+    for message in ("planeje meu dia", "tente de novo", "mova o relatório"):
+        asyncio.run(runner.ask_stream(message, [], lambda chunk: None))
+        tiers.append(runner.last_tier)
+    # Primeiro plano do dia no modelo rápido; o forte só depois da resposta que não parseou
+    assert tiers == [FAST, STRONG, FAST]
+    assert [t.title for t in runner.last_plan_tasks] == ["Relatório"]
@@ -0,0 +1,36 @@
+"""Parser de heredocs do file_materializer (sem executor nem autogen)."""
+from file_materializer import command_lines, split_block
+
+
+def test_command_lines_drops_heredoc_bodies():
+    code = "cat <<'EOF' > app.py\nrm -rf /\nEOF\npython3 app.py"
+    assert command_lines(code) == "cat <<'EOF' > app.py\npython3 app.py"
+
+
+def test_command_lines_keeps_lines_after_unterminated_heredoc():
+    code = 'echo "usage: cat <<EOF"\nsleep infinity\npython3 -c "print(1<<x)"\nwhile true; do :; done'
+    assert command_lines(code) == code
+
+
+def test_split_block_takes_only_the_write_prefix():
+    plan = split_block("mkdir -p \"app\" && cat <<'EOF' > \"app/a.py\"\nprint(1)\nEOF\ncd app && python3 a.py")
+    assert plan.dirs == ["app"]
+    assert [(w.path, w.content) for w in plan.writes] == [("app/a.py", "print(1)\n")]
+    assert plan.remaining == "cd app && python3 a.py"
+
+
+def test_paths_needing_shell_expansion_are_left_to_the_shell():
+    for line in ("cat <<'EOF' > ~/x.txt", "cat <<'EOF' > *.txt", "cat > out?.txt <<'EOF'", "cat <<'EOF' > \"$OUT\""):
+        plan = split_block(f"{line}\nhi\nEOF")
+        assert not plan.writes, line
+        assert plan.remaining.startswith(line.split(" ")[0])
+
+
+def test_quoted_literal_paths_are_materialized():
+    plan = split_block("cat <<'EOF' > '~lit*.txt'\nhi\nEOF")
+    assert [w.path for w in plan.writes] == ["~lit*.txt"]
+
+
+def test_mkdir_with_tilde_is_left_to_the_shell():
+    assert not split_block("mkdir -p ~/proj").dirs
+    assert not split_block("mkdir -p ~/proj && cat <<'EOF' > a.txt\nhi\nEOF").writes
@@ -0,0 +1,91 @@
+"""Retomada de missão: interrompe a run no meio, retoma e confere estado e transcrição."""
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("autogen_agentchat")
+pytest.importorskip("autogen_ext.models.replay")
+
+from dev_team_bench import APPROVAL, MODES, PASSING_CODE, PLAN, SCENARIOS, _ScriptedRuntime
+from dev_team_core import DevTeamRunner
+from executor_pool import ExecutorPool
+from mission_store import DONE, RUNNING, STOPPED, MissionStore
+from usage_meter import UsageMeter
+
+TASK = "criar app com teste de soma"
+# Round-robin sem sucesso antecipado: a missão só termina com a aprovação do reviewer.
+# Com 4 mensagens a primeira run para logo depois do tester (task, planner, coder, tester).
+INTERRUPTED = replace(MODES["baseline"], max_messages=4)
+FULL = replace(MODES["baseline"], max_messages=20)
+
+
+def _session(tmp_path: Path, config, method: str):
+    """Uma 'vida' do processo: runtime novo, runner novo, mesmo workspace e medidor."""
+    workspace = tmp_path / "workspace"
+    workspace.mkdir(exist_ok=True)
+    meter = UsageMeter(tmp_path / "usage.db")
+    runtime = _ScriptedRuntime(SCENARIOS["testes_passam"], executor_pool=ExecutorPool(), meter=meter).start()
+    logs = []
+    runner = DevTeamRunner(config, logs.append, runtime=runtime)
+    try:
+        coro = runner.run(TASK, workspace) if method == "run" else runner.resume(workspace)
+        runtime.submit(coro).result(timeout=60)
+    finally:
+        runtime.shutdown()
+    return workspace, logs
+
+
+def _sources(entries):
+    return [e.source for e in entries]
+
+
+def test_resume_continues_from_saved_team_state(tmp_path):
+    workspace, _ = _session(tmp_path, INTERRUPTED, "run")
+    store = MissionStore(workspace)
+    record = store.latest_resumable()
+    assert record.status == STOPPED
+    assert record.team_state is not None
+    before = store.transcript(record.id)
+    assert _sources(before) == ["user", "planner", "coder", "tester"]
+    assert before[1].content == PLAN and before[2].content == PASSING_CODE
+
+    _, logs = _session(tmp_path, FULL, "resume")
+    assert any(l.startswith(f"[RESUME] Missão {record.id} retomada após 4 mensagens") for l in logs)
+    after = store.transcript(record.id)
+    # Estado restaurado: o reviewer é o próximo da rodada, nada é replanejado nem reexecutado
+    assert after[:4] == before
+    assert _sources(after[4:]) == ["reviewer"]
+    assert after[4].content == APPROVAL
+    assert [e.seq for e in after] == list(range(len(after)))
+    finished = store.get(record.id)
+    assert finished.status == DONE
+    assert store.latest_resumable() is None
+    assert (workspace / "app" / "test_soma.py").exists()
+
+
+def test_resume_after_kill_replays_transcript(tmp_path, monkeypatch):
+    # Processo morto: o finish() nunca roda, a missão fica "running" e sem estado salvo
+    with monkeypatch.context() as m:
+        m.setattr(MissionStore, "finish", lambda self, *args: None)
+        workspace, _ = _session(tmp_path, INTERRUPTED, "run")
+    store = MissionStore(workspace)
+    record = store.latest_resumable()
+    assert record.status == RUNNING
+    assert record.team_state is None
+    before = store.transcript(record.id)
+    assert _sources(before) == ["user", "planner", "coder", "tester"]
+
+    _session(tmp_path, FULL, "resume")
+    after = store.transcript(record.id)
+    assert after[:4] == before
+    # Sem estado, a tarefa é reenviada com o histórico anterior como contexto
+    continuation = after[4].content
+    assert continuation.startswith(TASK)
+    assert "CONTINUAÇÃO" in continuation
+    assert f"[coder] {PASSING_CODE}" in continuation
+    assert _sources(after[5:]) == ["planner", "coder", "tester", "reviewer"]
+    assert after[-1].content == APPROVAL
+    finished = store.get(record.id)
+    assert finished.status == DONE
+    assert finished.team_state is not None
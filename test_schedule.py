@@ -0,0 +1,95 @@
+"""Regras do OPS_SYSTEM no agendador local (schedule_day / schedule_violations)."""
+from datetime import datetime
+
+import pytest
+
+from day_ops_core import ScheduleRules, TaskItem, _to_min, schedule_day, schedule_violations
+from ops_plan_parser import PlanTask
+
+QUADRANTS = ("Q1", "Q2", "Q3", "Q4")
+PERIODS = ("FLEXÍVEL", "MANHÃ", "TARDE", "NOITE")
+
+
+def _at(hhmm: str) -> datetime:
+    h, m = hhmm.split(":")
+    return datetime(2026, 1, 5, int(h), int(m))
+
+
+def _tasks(n: int, quadrant: str = "", period: str = "FLEXÍVEL"):
+    return [
+        TaskItem(
+            id=str(i),
+            title=f"Tarefa {i}",
+            quadrant=quadrant or QUADRANTS[i % 4],
+            period=period if quadrant else PERIODS[(i // 4) % 4],
+            created_at=float(i),
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("n", [1, 10, 50, 250])
+@pytest.mark.parametrize("start", ["06:00", "07:03", "13:17", "21:40"])
+def test_plan_follows_rules(n, start):
+    result = schedule_day(_tasks(n), _at(start))
+    assert schedule_violations(result.plan) == []
+    scheduled = {t.title for t in result.plan if t.category not in ("POWER UP", "BUFFER")}
+    assert len(scheduled) + len(result.overflow) == n
+
+
+@pytest.mark.parametrize("start", ["22:00", "22:50", "23:00", "23:58"])
+def test_blocks_never_pass_day_end(start):
+    result = schedule_day(_tasks(4, quadrant="Q1"), _at(start))
+    day_end = _to_min(ScheduleRules().day_end)
+    assert all(_to_min(t.end) <= day_end for t in result.plan)
+    assert schedule_violations(result.plan) == []
+    # Bloco Q1 é de 90 min: nenhum cabe depois das 21:30
+    assert not result.plan
+    assert len(result.overflow) == 4
+
+
+def test_short_task_still_fits_after_long_one_overflows():
+    tasks = [TaskItem(id="a", title="Longa", quadrant="Q1"), TaskItem(id="b", title="Curta", quadrant="Q4", created_at=1.0)]
+    result = schedule_day(tasks, _at("22:30"))
+    assert [t.title for t in result.plan] == ["Curta"]
+    assert [t.id for t in result.overflow] == ["a"]
+
+
+def test_power_up_before_120_minutes():
+    result = schedule_day(_tasks(6, quadrant="Q2"), _at("08:00"))
+    worked = 0
+    for t in result.plan:
+        if t.category == "POWER UP":
+            worked = 0
+        elif t.category != "BUFFER":
+            worked += _to_min(t.end) - _to_min(t.start)
+        assert worked <= ScheduleRules().power_up_max_min
+    assert any(t.category == "POWER UP" for t in result.plan)
+
+
+def test_buffer_between_focused_blocks():
+    plan = schedule_day(_tasks(2, quadrant="Q2"), _at("08:00")).plan
+    assert [t.category for t in plan] == ["TRABALHO FOCADO", "BUFFER", "TRABALHO FOCADO"]
+
+
+def test_period_window_is_respected():
+    tasks = [TaskItem(id="n", title="Noite", quadrant="Q1", period="NOITE"), TaskItem(id="m", title="Manhã", quadrant="Q3", period="MANHÃ")]
+    plan = schedule_day(tasks, _at("08:00")).plan
+    starts = {t.title: _to_min(t.start) for t in plan}
+    assert starts["Manhã"] < _to_min("12:00")
+    assert starts["Noite"] >= _to_min("18:00")
+
+
+def test_done_and_inactive_tasks_are_skipped():
+    tasks = _tasks(3, quadrant="Q3")
+    tasks[0].status = "DONE"
+    tasks[1].active = False
+    plan = schedule_day(tasks, _at("08:00")).plan
+    assert [t.title for t in plan] == ["Tarefa 2"]
+
+
+def test_violations_flag_blocks_past_day_end():
+    late = [PlanTask("22:00", "23:30", "Tarde demais", "P1", "TRABALHO FOCADO")]
+    wrapped = [PlanTask("22:50", "24:20", "Virou o dia", "P1", "TRABALHO FOCADO")]
+    assert any("depois de 23:00" in p for p in schedule_violations(late))
+    assert any("24:00" in p for p in schedule_violations(wrapped))
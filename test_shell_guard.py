@@ -0,0 +1,44 @@
+"""Vereditos do pré-scanner de blocos de shell."""
+import pytest
+
+pytest.importorskip("autogen_core")
+
+from shell_guard import DENY, EXEC, NOOP, WRITE, ExecutionBudget, python_as_shell, scan, wrap_with_budget
+
+
+@pytest.mark.parametrize("code", ["sudo reboot", "sync; shutdown -h now", "  poweroff", "make && halt"])
+def test_host_shutdown_is_denied(code):
+    assert scan(code).verdict == DENY
+
+
+@pytest.mark.parametrize("code", ["grep -rn halt src/", 'echo "reboot required"', "python3 shutdown_hooks.py"])
+def test_shutdown_words_as_arguments_run(code):
+    assert scan(code).verdict == EXEC
+
+
+def test_unterminated_heredoc_marker_does_not_hide_later_commands():
+    assert scan('echo "usage: cat <<EOF"\nsleep infinity').verdict == DENY
+    assert scan('python3 -c "print(1<<x)"\nwhile true; do :; done').verdict == DENY
+
+
+def test_heredoc_body_is_not_scanned():
+    result = scan("mkdir -p app && cat <<'EOF' > app/notes.txt\nrm -rf /\nEOF")
+    assert result.verdict == WRITE
+
+
+def test_comments_only_block_is_noop():
+    assert scan("# nada\n\n").verdict == NOOP
+
+
+def test_python_block_runs_through_budget_wrapper():
+    code = "print('oi')\nx = 1 << 2"
+    script = python_as_shell(code)
+    assert script.startswith("python3 - <<'DEV_TEAM_PY'\n")
+    assert script.endswith("\nDEV_TEAM_PY")
+    assert code in script
+    wrapped = wrap_with_budget(script, ExecutionBudget(cpu_seconds=5))
+    assert "ulimit -t 5" in wrapped and "timeout" in wrapped
+
+
+def test_python_block_containing_the_tag_gets_another_one():
+    assert python_as_shell("DEV_TEAM_PY\n").startswith("python3 - <<'DEV_TEAM_PY_'")
@@ -0,0 +1,60 @@
+"""Índices e contador de Q1 do TaskRepository."""
+from day_ops_core import TaskItem, TaskRepository
+
+
+def _task(task_id: str, quadrant: str = "Q1", status: str = "TODO") -> TaskItem:
+    return TaskItem(id=task_id, title=f"Tarefa {task_id}", quadrant=quadrant, status=status)
+
+
+def test_add_same_id_replaces_without_double_counting():
+    repo = TaskRepository([_task("a")])
+    repo.add(_task("a"))
+    assert len(repo) == 1
+    assert repo.open_q1 == 1
+    assert repo.count("quadrant", "Q1") == 1
+
+    repo.add(_task("a", quadrant="Q2"))
+    assert repo.open_q1 == 0
+    assert repo.count("quadrant", "Q1") == 0
+    assert repo.where(quadrant="Q2")[0].id == "a"
+
+
+def test_load_with_duplicate_ids_keeps_the_last():
+    repo = TaskRepository([_task("a"), _task("a", status="DONE")])
+    assert len(repo) == 1
+    assert repo.open_q1 == 0
+    assert repo.get("a").status == "DONE"
+
+
+def test_update_and_remove_keep_counter_in_sync():
+    repo = TaskRepository([_task("a"), _task("b")])
+    repo.update(repo.get("a"), status="DONE")
+    assert repo.open_q1 == 1
+    repo.remove(repo.get("b"))
+    assert repo.open_q1 == 0
+    assert repo.count("status", "TODO") == 0
+
+
+def test_update_after_remote_remove_is_ignored():
+    repo = TaskRepository([_task("a")])
+    task = repo.get("a")
+    events = []
+    repo.subscribe(events.append)
+    repo.remove(task, remote=True)
+    assert repo.update(task, status="DONE") == ()
+    repo.remove(task)
+    assert len(repo) == 0
+    assert repo.open_q1 == 0
+    assert len(events) == 1
+
+
+def test_stale_reference_is_resolved_by_id():
+    repo = TaskRepository([_task("a")])
+    stale = repo.get("a")
+    repo.reset([_task("a")])
+    assert repo.update(stale, status="DONE") == ("status",)
+    assert repo.get("a").status == "DONE"
+    assert repo.open_q1 == 0
+    repo.remove(stale)
+    assert repo.count("status", "DONE") == 0
+    assert len(repo) == 0
@@ -0,0 +1,297 @@
+import contextvars
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from autogen_core.models import ChatCompletionClient
+
+# Banco compartilhado por DevTeamRunner e DailyOpsRunner
+DEFAULT_USAGE_DB = Path.home() / ".ops_agent" / "usage.db"
+
+# Run dona da chamada de modelo atual (herdado pelas tasks criadas dentro da run)
+current_run: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_run", default=None)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class UsageMeter:
+    """Tokens, latência e contagem de mensagens por agente e por run, em SQLite."""
+
+    def __init__(self, db_path: Path = DEFAULT_USAGE_DB) -> None:
+        self.db_path = Path(db_path).absolute()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        with self._get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    kind TEXT,
+                    label TEXT,
+                    started_at REAL,
+                    ended_at REAL,
+                    stop_reason TEXT,
+                    message_counts TEXT,
+                    day_date TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS model_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT,
+                    agent TEXT,
+                    model TEXT,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    latency_ms REAL,
+                    timestamp REAL,
+                    day_date TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_run ON model_calls (run_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_day ON model_calls (day_date)")
+            conn.commit()
+
+    # ---------------- Registro ----------------
+    def start_run(self, kind: str, label: str = "", run_id: Optional[str] = None) -> str:
+        """Abre (ou reabre, no caso de retomada) uma run e a torna a run atual do contexto."""
+        run_id = run_id or str(uuid.uuid4())[:8]
+        with self._lock, self._get_connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, kind, label, started_at, message_counts, day_date) "
+                "VALUES (?, ?, ?, ?, '{}', ?)",
+                (run_id, kind, label[:200], time.time(), datetime.now().strftime("%Y-%m-%d")),
+            )
+            conn.commit()
+        current_run.set(run_id)
+        return run_id
+
+    def finish_run(self, run_id: str, message_counts: Dict[str, int], stop_reason: str = "") -> None:
+        with self._lock, self._get_connection() as conn:
+            row = conn.execute("SELECT message_counts FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            counts = json.loads(row[0]) if row and row[0] else {}
+            for agent, n in message_counts.items():
+                counts[agent] = counts.get(agent, 0) + n
+            conn.execute(
+                "UPDATE runs SET ended_at = ?, stop_reason = ?, message_counts = ? WHERE run_id = ?",
+                (time.time(), stop_reason, json.dumps(counts), run_id),
+            )
+            conn.commit()
+
+    def record_call(self, agent: str, model: str, prompt_tokens: int, completion_tokens: int, latency_ms: float) -> None:
+        with self._lock, self._get_connection() as conn:
+            conn.execute(
+                "INSERT INTO model_calls (run_id, agent, model, prompt_tokens, completion_tokens, latency_ms, timestamp, day_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (current_run.get(), agent, model, prompt_tokens, completion_tokens, latency_ms,
+                 time.time(), datetime.now().strftime("%Y-%m-%d")),
+            )
+            conn.commit()
+
+    # ---------------- Relatórios ----------------
+    def summary(self, kind: Optional[str] = None, since_day: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Relatório agregado:
+          - by_agent: chamadas, tokens e latência p50/p95 por (tipo de run, agente, modelo)
+          - per_run: tokens e chamadas por missão/pedido
+          - per_day: tokens por dia
+        """
+        where, params = ["1 = 1"], []
+        if kind:
+            where.append("r.kind = ?")
+            params.append(kind)
+        if since_day:
+            where.append("c.day_date >= ?")
+            params.append(since_day)
+        sql = (
+            "SELECT COALESCE(r.kind, '?'), c.agent, c.model, c.run_id, c.day_date, "
+            "c.prompt_tokens, c.completion_tokens, c.latency_ms "
+            "FROM model_calls c LEFT JOIN runs r ON r.run_id = c.run_id "
+            f"WHERE {' AND '.join(where)}"
+        )
+        with self._get_connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        by_agent: Dict[tuple, Dict[str, Any]] = {}
+        per_run: Dict[str, Dict[str, Any]] = {}
+        per_day: Dict[str, Dict[str, int]] = {}
+        for run_kind, agent, model, run_id, day, p_tok, c_tok, lat in rows:
+            p_tok, c_tok = p_tok or 0, c_tok or 0
+            a = by_agent.setdefault((run_kind, agent, model), {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latencies": []})
+            a["calls"] += 1
+            a["prompt_tokens"] += p_tok
+            a["completion_tokens"] += c_tok
+            a["latencies"].append(lat or 0.0)
+
+            r = per_run.setdefault(run_id or "-", {"kind": run_kind, "calls": 0, "tokens": 0})
+            r["calls"] += 1
+            r["tokens"] += p_tok + c_tok
+
+            d = per_day.setdefault(day, {"prompt_tokens": 0, "completion_tokens": 0})
+            d["prompt_tokens"] += p_tok
+            d["completion_tokens"] += c_tok
+
+        agents = []
+        for (run_kind, agent, model), a in sorted(by_agent.items()):
+            lats = a.pop("latencies")
+            agents.append({
+                "kind": run_kind, "agent": agent, "model": model, **a,
+                "p50_ms": _percentile(lats, 0.50), "p95_ms": _percentile(lats, 0.95),
+            })
+        run_tokens = [r["tokens"] for r in per_run.values()]
+        return {
+            "by_agent": agents,
+            "per_run": per_run,
+            "per_day": dict(sorted(per_day.items())),
+            "tokens_per_run": {
+                "runs": len(run_tokens),
+                "avg": sum(run_tokens) / len(run_tokens) if run_tokens else 0.0,
+                "p50": _percentile(run_tokens, 0.50),
+                "p95": _percentile(run_tokens, 0.95),
+            },
+        }
+
+    def run_usage(self, run_id: str) -> Dict[str, int]:
+        with self._get_connection() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0) "
+                "FROM model_calls WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+        return {"calls": row[0], "prompt_tokens": row[1], "completion_tokens": row[2]}
+
+    def run_messages(self, run_id: str) -> Dict[str, int]:
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT message_counts FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def format_report(self, kind: Optional[str] = None, since_day: Optional[str] = None) -> str:
+        data = self.summary(kind, since_day)
+        lines = ["USO DE MODELO POR AGENTE:"]
+        for a in data["by_agent"]:
+            lines.append(
+                f"  [{a['kind']}] {a['agent']:<10} {a['model']:<14} chamadas={a['calls']:<5} "
+                f"prompt={a['prompt_tokens']:<8} completion={a['completion_tokens']:<8} "
+                f"p50={a['p50_ms']:.0f}ms p95={a['p95_ms']:.0f}ms"
+            )
+        t = data["tokens_per_run"]
+        lines.append(f"TOKENS POR RUN: n={t['runs']} média={t['avg']:.0f} p50={t['p50']:.0f} p95={t['p95']:.0f}")
+        lines.append("TOKENS POR DIA:")
+        for day, d in data["per_day"].items():
+            lines.append(f"  {day}: prompt={d['prompt_tokens']} completion={d['completion_tokens']}")
+        return "\n".join(lines)
+
+
+_DEFAULT_METER: Optional[UsageMeter] = None
+_DEFAULT_METER_LOCK = threading.Lock()
+
+
+def get_usage_meter() -> UsageMeter:
+    """Medidor compartilhado do processo (banco em DEFAULT_USAGE_DB)."""
+    global _DEFAULT_METER
+    with _DEFAULT_METER_LOCK:
+        if _DEFAULT_METER is None:
+            _DEFAULT_METER = UsageMeter()
+        return _DEFAULT_METER
+
+
+class DelegatingChatCompletionClient(ChatCompletionClient):
+    """Base para clientes que envolvem outro cliente e repassam tudo a ele."""
+
+    def __init__(self, inner: ChatCompletionClient) -> None:
+        self._inner = inner
+
+    async def create(self, *args, **kwargs):
+        return await self._inner.create(*args, **kwargs)
+
+    async def create_stream(self, *args, **kwargs):
+        async for chunk in self._inner.create_stream(*args, **kwargs):
+            yield chunk
+
+    async def close(self) -> None:
+        await self._inner.close()
+
+    def actual_usage(self):
+        return self._inner.actual_usage()
+
+    def total_usage(self):
+        return self._inner.total_usage()
+
+    def count_tokens(self, *args, **kwargs) -> int:
+        return self._inner.count_tokens(*args, **kwargs)
+
+    def remaining_tokens(self, *args, **kwargs) -> int:
+        return self._inner.remaining_tokens(*args, **kwargs)
+
+    @property
+    def capabilities(self):
+        return self._inner.capabilities
+
+    @property
+    def model_info(self):
+        return self._inner.model_info
+
+
+class MeteredChatCompletionClient(DelegatingChatCompletionClient):
+    """
+    Registra tokens e latência de cada chamada em nome de um agente.
+
+    Um wrapper por agente sobre o mesmo cliente compartilhado: a conexão é
+    única, mas o consumo fica atribuído a planner/coder/reviewer/ops_agent.
+    close() não fecha o cliente interno (ele pertence a quem o criou).
+    """
+
+    def __init__(self, inner: ChatCompletionClient, meter: UsageMeter, agent: str, model: str = "", stream_usage: bool = True) -> None:
+        super().__init__(inner)
+        self._meter = meter
+        self._agent = agent
+        self._model = model or getattr(inner, "model", "") or "?"
+        self._stream_usage = stream_usage
+
+    async def create(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        result = await self._inner.create(*args, **kwargs)
+        self._record(result, t0)
+        return result
+
+    async def create_stream(self, *args, **kwargs):
+        if self._stream_usage:
+            # Sem isso a API da OpenAI não devolve usage em respostas em streaming
+            extra = dict(kwargs.get("extra_create_args") or {})
+            extra.setdefault("stream_options", {"include_usage": True})
+            kwargs["extra_create_args"] = extra
+        t0 = time.perf_counter()
+        async for chunk in self._inner.create_stream(*args, **kwargs):
+            if not isinstance(chunk, str):
+                self._record(chunk, t0)  # CreateResult final
+            yield chunk
+
+    async def close(self) -> None:
+        pass
+
+    def _record(self, result, t0: float) -> None:
+        usage = getattr(result, "usage", None)
+        self._meter.record_call(
+            agent=self._agent,
+            model=self._model,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            latency_ms=(time.perf_counter() - t0) * 1000.0,
+        )
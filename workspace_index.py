@@ -0,0 +1,116 @@
+import hashlib
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+# Diretórios que nunca entram no índice (estado interno, VCS, caches)
+IGNORED_DIRS = {".dev_team", ".git", "__pycache__", "node_modules", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
+
+
+@dataclass(frozen=True)
+class FileState:
+    mtime_ns: int
+    size: int
+    digest: str
+
+
+@dataclass
+class WorkspaceChanges:
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    sizes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.modified or self.removed)
+
+    def summary(self, max_items: int = 30) -> str:
+        """Resumo compacto para o contexto do reviewer."""
+        if self.empty:
+            return "ALTERAÇÕES NO WORKSPACE: nenhuma."
+        lines = [
+            f"ALTERAÇÕES NO WORKSPACE: +{len(self.added)} ~{len(self.modified)} -{len(self.removed)}"
+        ]
+        entries = (
+            [("+", p) for p in self.added]
+            + [("~", p) for p in self.modified]
+            + [("-", p) for p in self.removed]
+        )
+        for mark, path in entries[:max_items]:
+            size = f" ({self.sizes[path]} bytes)" if path in self.sizes else ""
+            lines.append(f"  {mark} {path}{size}")
+        if len(entries) > max_items:
+            lines.append(f"  ... e mais {len(entries) - max_items} arquivos")
+        return "\n".join(lines)
+
+
+class WorkspaceIndex:
+    """
+    Índice de arquivos do workspace (hash de conteúdo + mtime).
+
+    refresh() compara o estado atual com o último snapshot e devolve o que
+    mudou. Só re-hasheia arquivos cujo mtime/tamanho mudou, então o custo de
+    uma verificação é um stat por arquivo em vez de cat/ls pelo executor.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self._files: Dict[str, FileState] = {}
+
+    @property
+    def files(self) -> Dict[str, FileState]:
+        return dict(self._files)
+
+    def refresh(self) -> WorkspaceChanges:
+        current = self._scan()
+        changes = WorkspaceChanges()
+        for path, st in current.items():
+            old = self._files.get(path)
+            if old is None:
+                changes.added.append(path)
+            elif old.digest != st.digest:
+                changes.modified.append(path)
+            else:
+                continue
+            changes.sizes[path] = st.size
+        changes.removed = [p for p in self._files if p not in current]
+        changes.added.sort()
+        changes.modified.sort()
+        changes.removed.sort()
+        self._files = current
+        return changes
+
+    def _scan(self) -> Dict[str, FileState]:
+        result: Dict[str, FileState] = {}
+        if not self.root.exists():
+            return result
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue  # removido durante o scan
+                rel = os.path.relpath(full, self.root).replace(os.sep, "/")
+                old = self._files.get(rel)
+                if old is not None and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+                    result[rel] = old
+                    continue
+                digest = self._hash(full)
+                if digest is not None:
+                    result[rel] = FileState(st.st_mtime_ns, st.st_size, digest)
+        return result
+
+    @staticmethod
+    def _hash(path: str):
+        h = hashlib.blake2b(digest_size=16)
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    h.update(chunk)
+        except OSError:
+            return None
+        return h.hexdigest()